@@ -22,9 +22,10 @@ from dotenv import load_dotenv
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from metta.knowledge import get_metta_instance
-from metta.defi_rag import DeFiWorkflowRAG
-from utils.asi_one_client import ASIOneClient
+from metta.knowledge_service import RemoteRAG
+from metta.records import Strategy, parse_sequence
+from utils.asi_one_client import AsyncASIOneClient
+from utils.intent_classifier import IntentClassifier
 
 load_dotenv()
 
@@ -48,14 +49,35 @@ class QuestionResponse(Model):
     """Answer to user question"""
     answer: str
 
-# Initialize MeTTa knowledge graph and RAG
-print("🧠 Initializing MeTTa Knowledge Graph...")
-metta = get_metta_instance()
-rag = DeFiWorkflowRAG(metta)
+# Initialize MeTTa knowledge graph and RAG, or share the server's
+KNOWLEDGE_SERVICE = os.getenv('KNOWLEDGE_SERVICE')
+if KNOWLEDGE_SERVICE:
+    print(f"🛰️  Using shared knowledge service at {KNOWLEDGE_SERVICE}...")
+    rag = RemoteRAG(KNOWLEDGE_SERVICE, cache_size=int(os.getenv('RAG_CACHE_SIZE', 1024)))
+else:
+    print("🧠 Initializing MeTTa Knowledge Graph...")
+    from metta.knowledge import get_metta_instance
+    from metta.defi_rag import DeFiWorkflowRAG
+    metta = get_metta_instance()
+    rag = DeFiWorkflowRAG(metta, cache_size=int(os.getenv('RAG_CACHE_SIZE', 1024)))
+    
+    # Pick up edited knowledge files without restarting the agent
+    if float(os.getenv('KNOWLEDGE_RELOAD_INTERVAL', 0)) > 0:
+        from metta.knowledge import KNOWLEDGE_CODE, knowledge_files
+        from metta.knowledge_reload import KnowledgeReloader
+        KnowledgeReloader(rag, get_metta_instance, knowledge_files, KNOWLEDGE_CODE).watch(
+            float(os.getenv('KNOWLEDGE_RELOAD_INTERVAL')))
 
-# Initialize ASI:One client
+# Initialize ASI:One client; async, so LLM calls don't stall the agent's event loop
 print("🤖 Initializing ASI:One Client...")
-asi_client = ASIOneClient()
+asi_client = AsyncASIOneClient()
+
+# Local intent classifier; only unsure classifications go to ASI:One
+intent_classifier = IntentClassifier(rag.get_all_operations(), rag.get_all_strategies())
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv('INTENT_CONFIDENCE_THRESHOLD', 0.75))
+
+# Knowledge facts less similar to a question than this are not used to answer it
+QUESTION_MIN_SIMILARITY = float(os.getenv('QUESTION_MIN_SIMILARITY', 0.3))
 
 # Create mailbox agent
 SEED = os.getenv("UAGENT_SEED", "defi-workflow-builder-v1")
@@ -100,7 +122,7 @@ async def handle_workflow_request(ctx: Context, sender: str, msg: WorkflowReques
     Handle requests to generate a new DeFi workflow.
     
     Process:
-    1. Classify user intent using ASI:One
+    1. Classify user intent (locally, or with ASI:One when unsure)
     2. Query MeTTa knowledge graph for relevant strategies/operations
     3. Generate workflow JSON structure
     4. Return workflow to user
@@ -112,8 +134,12 @@ async def handle_workflow_request(ctx: Context, sender: str, msg: WorkflowReques
     try:
         # Step 1: Classify intent
         ctx.logger.info("🔍 Classifying user intent...")
-        intent, keyword = asi_client.get_intent_and_keyword(msg.user_query)
-        ctx.logger.info(f"   Intent: {intent}, Keyword: {keyword}")
+        prediction = intent_classifier.classify(msg.user_query)
+        if prediction.confidence >= INTENT_CONFIDENCE_THRESHOLD:
+            intent, keyword = prediction.intent, prediction.keyword
+        else:
+            intent, keyword = await asi_client.get_intent_and_keyword(msg.user_query)
+        ctx.logger.info(f"   Intent: {intent}, Keyword: {keyword} (local confidence {prediction.confidence:.2f})")
         
         # Step 2: Query knowledge graph
         ctx.logger.info("📚 Querying MeTTa knowledge graph...")
@@ -148,14 +174,19 @@ async def handle_workflow_request(ctx: Context, sender: str, msg: WorkflowReques
                 "strategies": rag.query_all_strategies(),
                 "protocols": rag.query_protocols(),
                 "node_types": ["trigger", "swap", "aave", "transfer", "condition", "ai", "mcp"],
-                "token_addresses": rag.get_all_token_addresses()
+                "token_addresses": rag.get_all_token_addresses(),
+                "chains": rag.get_all_chains()
             }
             
-            workflow_json = asi_client.generate_workflow_from_intent(msg.user_query, context)
+            workflow_json = await asi_client.generate_workflow_from_intent(msg.user_query, context)
+            
+            # Replace symbols and other chains' addresses in token fields
+            for problem in rag.get_token_registry().validate_workflow(workflow_json):
+                ctx.logger.info(f"🪙 Token field: {problem}")
         
         # Step 4: Generate explanation
         ctx.logger.info("💬 Generating workflow explanation...")
-        explanation = asi_client.explain_workflow(workflow_json)
+        explanation = await asi_client.explain_workflow(workflow_json)
         
         # Send response
         response = WorkflowResponse(
@@ -188,37 +219,9 @@ async def handle_question(ctx: Context, sender: str, msg: QuestionRequest):
     ctx.logger.info(f"❓ Question from {sender}: '{msg.question}'")
     
     try:
-        # Check if question matches known topics in knowledge graph
-        question_lower = msg.question.lower()
-        
-        answer = None
-        
-        # Query considerations
-        if "gas" in question_lower:
-            result = rag.query_consideration("gas_costs")
-            if result:
-                answer = f"About gas costs: {result[0]}"
-        
-        elif "slippage" in question_lower:
-            result = rag.query_consideration("slippage")
-            if result:
-                answer = f"About slippage: {result[0]}"
-        
-        elif "liquidation" in question_lower or "risk" in question_lower:
-            result = rag.query_consideration("liquidation_risk")
-            if result:
-                answer = f"About liquidation risk: {result[0]}"
-        
-        # Query capabilities
-        elif "swap" in question_lower and "how" in question_lower:
-            result = rag.query_capability("swap")
-            if result:
-                answer = f"Swap node: {result[0]}"
-        
-        elif "aave" in question_lower:
-            result = rag.query_capability("aave")
-            if result:
-                answer = f"Aave node: {result[0]}"
+        # Find the facts most similar to the question anywhere in the knowledge graph
+        matches = rag.search_knowledge(msg.question, k=3, min_score=QUESTION_MIN_SIMILARITY)
+        answer = "\n".join(f"About {match.subject}: {match.text}" for match in matches) or None
         
         # If no match, use ASI:One
         if not answer:
@@ -239,17 +242,18 @@ async def handle_question(ctx: Context, sender: str, msg: QuestionRequest):
 
 
 def generate_workflow_from_strategy(strategy_result, user_query: str):
-    """Generate workflow JSON from MeTTa strategy result"""
+    """Generate workflow JSON from a Strategy record or a [node sequence] result"""
     
     # Parse strategy node sequence
-    # Example: "trigger -> swap_to_usdc -> aave_supply"
+    # Example: "trigger -> swap(ETH->USDC) -> aave(supply)"
     
-    if not strategy_result or not strategy_result[0]:
+    if isinstance(strategy_result, Strategy):
+        steps = strategy_result.steps
+    elif strategy_result and strategy_result[0]:
+        steps = parse_sequence(strategy_result[0])
+    else:
         return None
     
-    node_sequence = str(strategy_result[0])
-    node_types = [n.strip() for n in node_sequence.split('->')]
-    
     # Generate workflow structure
     nodes = []
     edges = []
@@ -258,11 +262,12 @@ def generate_workflow_from_strategy(strategy_result, user_query: str):
     y_pos = 100
     x_spacing = 250
     
-    for i, node_type in enumerate(node_types):
+    for i, step in enumerate(steps):
         node_id = f"node-{i+1}"
         
         # Extract actual node type (remove prefixes like "swap_to_usdc" -> "swap")
-        base_type = node_type.split('_')[0]
+        base_type = step.node_type.split('_')[0]
+        node_type = f"{step.node_type}({step.argument})".lower()
         
         # Create node
         node = {
@@ -270,7 +275,7 @@ def generate_workflow_from_strategy(strategy_result, user_query: str):
             "type": base_type,
             "data": {
                 "label": base_type.title(),
-                "config": get_default_config(base_type, node_type)
+                "config": get_default_config(base_type, node_type, step.argument)
             },
             "position": {"x": x_pos + (i * x_spacing), "y": y_pos}
         }
@@ -299,15 +304,20 @@ def generate_workflow_from_operation(operation_result, user_query: str):
     return generate_workflow_from_strategy(operation_result, user_query)
 
 
-def get_default_config(base_type: str, full_type: str):
+def get_default_config(base_type: str, full_type: str, argument: str = ""):
     """Get default configuration for a node type"""
     
+    # A swap step's argument names its direction, e.g. swap(USDC->ETH)
+    token_in, token_out = "ETH", "USDC"
+    if "->" in argument:
+        token_in, token_out = (token.strip() for token in argument.split("->", 1))
+    
     configs = {
         "trigger": {"triggerType": "manual"},
         "swap": {
             "protocol": "uniswap",
-            "tokenIn": "USDC" if "usdc" in full_type else "ETH",
-            "tokenOut": "ETH" if "usdc" in full_type else "USDC",
+            "tokenIn": token_in,
+            "tokenOut": token_out,
             "amount": "",
             "slippage": "0.5"
         },
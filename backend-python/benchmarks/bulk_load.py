@@ -0,0 +1,109 @@
+"""
+Knowledge Bulk Load Benchmark
+
+Loads synthetic token-address files of 1k, 10k and 100k rows with
+metta/knowledge_loader.py, as CSV and as JSON Lines, and reports the time
+per row, which should stay flat as the file grows. The space is then read
+back and the token facts in it compared with the rows that were added, so a
+load that corrupts the space fails the benchmark instead of reporting a
+time.
+
+hyperon limits how many symbols and grounded values a space can hold (see
+SYMBOL_LIMIT and GROUNDED_LIMIT), so rows use 200 chains and 500 token
+symbols, and only the first few hundred rows of each file fit; the loader
+rejects the rest. Larger files measure reading, validating and rejecting
+rows, not adding them.
+
+Usage:
+    python benchmarks/bulk_load.py [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import csv
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from hyperon import MeTTa
+
+from metta.knowledge_loader import load_knowledge_files
+from metta.records import TokenAddress, decode_fact
+
+
+CHAINS = 200
+SYMBOLS = 500
+
+
+def synthetic_rows(count: int):
+    """Distinct (chain, symbol) token addresses."""
+    for i in range(count):
+        yield {
+            "chain": f"chain{i // SYMBOLS % CHAINS}",
+            "symbol": f"TKN{i % SYMBOLS}",
+            "name": f"Token {i}",
+            "address": f"0x{i:040x}",
+            "decimals": "18",
+        }
+
+
+def read_back(space) -> set:
+    """The (chain, symbol, name, address, decimals) token facts in a space."""
+    facts = set()
+    for atom in space.get_atoms():
+        fact = decode_fact(atom)
+        if fact is not None and fact[0] == TokenAddress.RELATION:
+            facts.add(tuple(str(value) for value in fact[1]))
+    return facts
+
+
+def write_file(path: Path, count: int) -> None:
+    columns = ["chain", "symbol", "name", "address", "decimals"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if path.suffix == ".csv":
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(synthetic_rows(count))
+        else:
+            for row in synthetic_rows(count):
+                f.write(json.dumps(row) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='rows per file')
+    args = parser.parse_args()
+
+    print(f"{'format':<8}{'rows':>8}{'added':>7}{'rejected':>10}{'load':>9}{'per row':>10}{'read back':>11}")
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for suffix in (".csv", ".jsonl"):
+            for count in args.sizes:
+                path = Path(tmp) / f"token-address{suffix}"
+                write_file(path, count)
+
+                space = MeTTa().space()
+                start = time.perf_counter()
+                report = load_knowledge_files(space, [path])
+                elapsed = time.perf_counter() - start
+
+                start = time.perf_counter()
+                facts = read_back(space)
+                read = time.perf_counter() - start
+                # Rows are rejected once the space is full, so the first ones are the ones added
+                expected = {tuple(row.values()) for row in synthetic_rows(report.added)}
+                ok = facts == expected
+                failed = failed or not ok
+
+                print(f"{suffix[1:]:<8}{count:>8}{report.added:>7}{report.invalid:>10}{elapsed * 1000:>7.0f}ms"
+                      f"{elapsed / count * 1e6:>8.1f}µs{read * 1000:>8.1f}ms "
+                      f"{'✅' if ok else f'❌ {len(facts ^ expected)} facts differ'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
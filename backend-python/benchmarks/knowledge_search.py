@@ -0,0 +1,80 @@
+"""
+Knowledge Search Benchmark
+
+Builds metta/lexical_index.py over 1k, 10k and 50k synthetic facts and
+reports the build time, the n-gram vocabulary size, and the median and
+p99 latency of free-text questions.
+
+Facts mix token addresses (mostly hex, as in the real graph) with
+considerations and solutions written from a small vocabulary, so common
+n-grams occur in many facts, as they do in practice.
+
+Usage:
+    python benchmarks/knowledge_search.py [--sizes 1000 10000 50000] [--repeat 50]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from metta.lexical_index import LexicalIndex
+
+
+WORDS = (
+    "gas fee slippage liquidity pool swap supply borrow repay withdraw health factor "
+    "liquidation collateral yield apy bridge chain token stablecoin price oracle "
+    "volatile approve allowance deadline route aggregator position leverage risk"
+).split()
+
+QUESTIONS = [
+    "how much will gas cost me?",
+    "what slippage should I use for volatile tokens",
+    "am I at risk of liquidation",
+    "what is the USDC address on base",
+    "how do I repay my borrow position",
+]
+
+
+def synthetic_facts(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    for i in range(count):
+        if i % 2:
+            yield "token-address", (f"chain{i % 200}", f"TKN{i % 500}", f"Token {i}", f"0x{rng.getrandbits(160):040x}", 18)
+        else:
+            relation = rng.choice(["consideration", "solution"])
+            yield relation, (f"{rng.choice(WORDS)}_{i}", " ".join(rng.choices(WORDS, k=12)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000], help='facts to index')
+    parser.add_argument('--repeat', type=int, default=50, help='searches per question')
+    args = parser.parse_args()
+
+    print(f"{'facts':>8}{'build':>10}{'n-grams':>10}{'search p50':>12}{'search p99':>12}")
+    for count in args.sizes:
+        start = time.perf_counter()
+        index = LexicalIndex(synthetic_facts(count))
+        build = time.perf_counter() - start
+
+        timings = []
+        for _ in range(args.repeat):
+            for question in QUESTIONS:
+                start = time.perf_counter()
+                index.search(question, k=5)
+                timings.append(time.perf_counter() - start)
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+
+        print(f"{count:>8}{build * 1000:>8.0f}ms{len(index.vocabulary):>10}"
+              f"{statistics.median(timings) * 1000:>10.2f}ms{p99 * 1000:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
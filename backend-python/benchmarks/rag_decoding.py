@@ -0,0 +1,83 @@
+"""
+RAG Decoding Benchmark
+
+Compares three ways of answering the DeFiWorkflowRAG relation queries:
+
+- metta+str:     MeTTa match, results parsed from their printed form with
+                 str()/strip()/split(), as the RAG used to
+- metta+records: MeTTa match, atoms decoded structurally into typed records
+- index+records: typed records served from the SpaceIndex mirror (default)
+
+Usage:
+    python benchmarks/rag_decoding.py [--repeat N]
+"""
+
+import argparse
+import contextlib
+import io
+import shlex
+import sys
+import timeit
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from metta.knowledge import get_metta_instance
+from metta.defi_rag import DeFiWorkflowRAG
+from metta.records import Chain, NodeConfigField, NodeType, Operation, Strategy, TokenAddress
+
+
+# (label, record type, prefix)
+QUERIES = [
+    ("node types", NodeType, ()),
+    ("node config (swap)", NodeConfigField, ("swap",)),
+    ("strategies", Strategy, ()),
+    ("operations", Operation, ()),
+    ("token address (base USDC)", TokenAddress, ("base", "USDC")),
+    ("tokens on chain (base)", TokenAddress, ("base",)),
+    ("all token addresses", TokenAddress, ()),
+    ("chains", Chain, ()),
+]
+
+
+def parse_printed(metta, record_type, prefix):
+    """Answer a query the old way: run MeTTa and parse the printed atoms."""
+    variables = [f'$v{i}' for i in range(len(prefix), record_type.ARITY)]
+    pattern = ' '.join([record_type.RELATION, *prefix, *variables])
+    rows = []
+    for result_set in metta.run(f"!(match &self ({pattern}) (row {' '.join(variables)}))"):
+        for item in result_set:
+            values = [value.strip('"') for value in shlex.split(str(item).strip('()'), posix=False)[1:]]
+            rows.append(record_type.from_args([*prefix, *values]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=50, help='calls per query and method')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        metta = get_metta_instance()
+        # Uncached, to time the lookups themselves
+        indexed = DeFiWorkflowRAG(metta, cache_size=0)
+        unindexed = DeFiWorkflowRAG(metta, use_index=False, cache_size=0)
+
+    print(f"{'query':<28}{'metta+str':>12}{'metta+records':>15}{'index+records':>15}{'speedup':>10}")
+    for label, record_type, prefix in QUERIES:
+        methods = [
+            lambda: parse_printed(metta, record_type, prefix),
+            lambda: unindexed.records(record_type, *prefix),
+            lambda: indexed.records(record_type, *prefix),
+        ]
+        results = [method() for method in methods]
+        assert results[1] == results[2], f"{label}: index and MeTTa disagree"
+
+        timings = [timeit.timeit(method, number=args.repeat) / args.repeat * 1000 for method in methods]
+        print(f"{label:<28}" + "".join(f"{ms:>{width}.3f}ms" for ms, width in zip(timings, (10, 13, 13)))
+              + f"{timings[0] / timings[2]:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+"""
+RAG Scale Benchmark
+
+Builds synthetic knowledge graphs at 1x, 10x, 100x and 1000x the size of
+the bundled one (or as close as hyperon allows, see below) and, at each
+scale, measures:
+
+- the full initialize_defi_knowledge build (median time, atoms per second)
+- every DeFiWorkflowRAG query method, uncached (calls per second, p50, p99)
+- end to end: generate_workflow_from_strategy from server.py, on its own
+  and after find_strategy_for_intent
+- peak resident memory of the process
+
+Each scale runs in its own process, so peak memory is per scale. The
+synthetic facts are written to a temporary METTA_KNOWLEDGE_DIR and loaded
+after the bundled files in metta/data, each relation growing to scale
+times its bundled row count.
+
+hyperon 0.2.10 limits what one space can hold (see SYMBOL_LIMIT and
+GROUNDED_LIMIT in metta/knowledge_loader.py): about 1000 distinct symbols,
+and about 1000 grounded values counted per occurrence, so reusing strings
+across rows does not help. Every fact of the graph holds grounded values,
+which caps it at roughly three times the bundled size. The generator
+therefore keeps each scale within the limits: chains, strategies and
+operations stop growing at MAX_CHAINS, MAX_STRATEGIES and MAX_OPERATIONS,
+and a scale whose grounded values would not fit is generated at the
+largest size that does, every relation growing alike. Such scales are
+reported as capped, with the size actually measured; they measure the same
+graph until hyperon lifts the limit, and then grow with no change here. The fact counts per relation are printed.
+
+The token addresses read back from the RAG are checked against the
+generated ones, and a scale whose process crashes or reads back wrong
+tokens is reported as failed rather than measured.
+
+Results can be saved as a baseline (benchmarks/baselines/rag_scale.json).
+Later runs compare their medians against it and exit with status 1 when a
+measurement is slower than the baseline by more than --tolerance.
+
+Usage:
+    python benchmarks/rag_scale.py [--scales 1 10 100 1000] [--budget 0.5]
+    python benchmarks/rag_scale.py --save-baseline
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import random
+import resource
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from metta.knowledge_loader import SCHEMAS
+from metta.records import TokenAddress
+
+
+DATA_DIR = Path(__file__).parent.parent / "metta" / "data"
+BASELINE = Path(__file__).parent / "baselines" / "rag_scale.json"
+
+# Symbol-keyed relations stop growing here; with the ~120 symbols of the
+# bundled graph and TOKEN_SYMBOLS, this stays under SYMBOL_LIMIT
+MAX_CHAINS = 150
+MAX_STRATEGIES = 180
+MAX_OPERATIONS = 100
+TOKEN_SYMBOLS = 400
+
+# Differences below this are timer noise, not regressions
+NOISE_MS = 0.02
+
+INTENT = "maximize yield on my USDC"
+QUESTION = "how much will gas cost me?"
+
+
+# ============================================
+# SYNTHETIC KNOWLEDGE
+# ============================================
+
+def read_rows(relation: str):
+    with open(DATA_DIR / f"{relation}.csv", newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def write_rows(path: Path, rows) -> int:
+    rows = list(rows)
+    if rows:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return len(rows)
+
+
+def grounded_per_row(relation: str) -> int:
+    """Grounded values the loader stores for one row of a relation."""
+    schema = SCHEMAS[relation]
+    return len(schema.columns) - len(schema.symbols)
+
+
+def synthetic_knowledge(directory: Path, scale: int, grounded_room: int, seed: int = 7):
+    """
+    Write knowledge files that grow the bundled graph to scale times its size.
+
+    Args:
+        directory: Where to write the files (a METTA_KNOWLEDGE_DIR)
+        scale: Size relative to the bundled knowledge files
+        grounded_room: Grounded values the space can still take; a larger
+            graph is generated at the largest size that fits
+        seed: Random seed, so every run generates the same graph
+
+    Returns:
+        Relation -> number of facts with the bundled ones
+    """
+    rng = random.Random(seed)
+    chains, tokens = read_rows("chain"), read_rows("token-address")
+    strategies, operations = read_rows("strategy"), read_rows("operation")
+    words = [word for row in strategies + operations for word in row["description"].split()]
+
+    growth = [
+        ("chain", chains, MAX_CHAINS),
+        ("token-address", tokens, None),
+        ("strategy", strategies, MAX_STRATEGIES),
+        ("operation", operations, MAX_OPERATIONS),
+    ]
+
+    def extra_rows(size: float):
+        rows = {}
+        for relation, bundled, limit in growth:
+            count = int(len(bundled) * size)
+            rows[relation] = max(0, (min(count, limit) if limit else count) - len(bundled))
+        return rows
+
+    def grounded(size: float) -> int:
+        return sum(count * grounded_per_row(relation) for relation, count in extra_rows(size).items())
+
+    size = float(scale)
+    if grounded(size) > grounded_room:
+        low, high = 1.0, size
+        for _ in range(40):
+            middle = (low + high) / 2
+            low, high = (middle, high) if grounded(middle) <= grounded_room else (low, middle)
+        size = low
+    counts = extra_rows(size)
+
+    new_chains = [
+        {"name": f"chain{i}", "chain_id": str(900000 + i), "testnet": rng.choice(["true", "false"]),
+         "aave": rng.choice(["true", "false"])}
+        for i in range(counts["chain"])
+    ]
+    names = [row["name"] for row in chains + new_chains]
+    new_tokens = [
+        {"chain": names[i % len(names)], "symbol": f"TKN{i // len(names) % TOKEN_SYMBOLS}",
+         "name": f"Token {i}", "address": f"0x{rng.getrandbits(160):040x}", "decimals": rng.choice(["6", "8", "18"])}
+        for i in range(counts["token-address"])
+    ]
+    new_strategies = [
+        {"name": f"{row['name']}_{i}", "description": " ".join(rng.sample(words, 6)), "sequence": row["sequence"]}
+        for i, row in ((i, strategies[i % len(strategies)]) for i in range(counts["strategy"]))
+    ]
+    new_operations = [
+        {"keyword": f"{row['keyword']}_{i}", "node_type": row["node_type"], "description": " ".join(rng.sample(words, 6))}
+        for i, row in ((i, operations[i % len(operations)]) for i in range(counts["operation"]))
+    ]
+
+    return {
+        "chain": len(chains) + write_rows(directory / "chain.synthetic.csv", new_chains),
+        "token-address": len(tokens) + write_rows(directory / "token-address.synthetic.csv", new_tokens),
+        "strategy": len(strategies) + write_rows(directory / "strategy.synthetic.csv", new_strategies),
+        "operation": len(operations) + write_rows(directory / "operation.synthetic.csv", new_operations),
+    }
+
+
+# ============================================
+# MEASUREMENT
+# ============================================
+
+def measure(fn, budget: float, repeat: int):
+    """
+    Call fn up to repeat times, or until budget seconds have passed (at least 5 calls).
+
+    Returns:
+        {"calls", "perSecond", "p50", "p99"}, latencies in milliseconds
+    """
+    timings = []
+    deadline = time.perf_counter() + budget
+    while len(timings) < repeat and (len(timings) < 5 or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "calls": len(timings),
+        "perSecond": round(len(timings) / sum(timings), 1),
+        "p50": round(statistics.median(timings) * 1000, 4),
+        "p99": round(timings[max(0, int(len(timings) * 0.99) - 1)] * 1000, 4),
+    }
+
+
+def peak_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def check_tokens(rag, files) -> int:
+    """Count the tokens in files whose address the RAG returns differently."""
+    tokens = {(token.chain, token.symbol): token.address for token in rag.records(TokenAddress)}
+    wrong = 0
+    for path in files:
+        if path.exists():
+            with open(path, newline="", encoding="utf-8") as f:
+                wrong += sum(tokens.get((row["chain"], row["symbol"])) != row["address"] for row in csv.DictReader(f))
+    return wrong
+
+
+def run_scale(scale: int, budget: float, repeat: int, builds: int):
+    """Benchmark one scale in this process; prints nothing but the results."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        from hyperon import MeTTa
+
+        import server
+        from metta import knowledge
+        from metta.defi_rag import DeFiWorkflowRAG
+        from metta.knowledge_loader import KnowledgeLoader
+
+        base_mb = peak_mb()
+        # What the bundled graph leaves for synthetic facts
+        knowledge.EXTRA_KNOWLEDGE_DIR = None
+        bundled = MeTTa()
+        knowledge.initialize_defi_knowledge(bundled)
+        room = KnowledgeLoader(bundled.space()).grounded_room
+        bundled_atoms = bundled.space().atom_count()
+        del bundled
+
+        with tempfile.TemporaryDirectory() as tmp:
+            facts = synthetic_knowledge(Path(tmp), scale, room)
+            knowledge.EXTRA_KNOWLEDGE_DIR = tmp
+
+            build_times = []
+            for _ in range(builds):
+                metta = MeTTa()
+                start = time.perf_counter()
+                knowledge.initialize_defi_knowledge(metta)
+                build_times.append(time.perf_counter() - start)
+
+            atoms = metta.space().atom_count()
+            # Uncached, to time the lookups themselves
+            rag = DeFiWorkflowRAG(metta, cache_size=0)
+            server.rag = rag
+            try:
+                wrong = check_tokens(rag, [DATA_DIR / "token-address.csv", Path(tmp) / "token-address.synthetic.csv"])
+            except ValueError as e:
+                raise RuntimeError(f"token facts read back corrupted from a space of {atoms} atoms ({e})")
+            if wrong:
+                raise RuntimeError(f"{wrong} token addresses read back wrong from a space of {atoms} atoms")
+
+        chain = f"chain{MAX_CHAINS - 1}" if facts["chain"] > MAX_CHAINS else "base"
+        strategy = rag.get_all_strategies()[-1]["name"]
+        operation = rag.get_all_operations()[-1]["keyword"]
+        record = rag.get_strategy(strategy)
+
+        def intent_to_workflow():
+            return server.generate_workflow_from_strategy(rag.find_strategy_for_intent(INTENT), INTENT)
+
+        methods = [
+            ("get_all_node_types", lambda: rag.get_all_node_types()),
+            ("get_node_config", lambda: rag.get_node_config("swap")),
+            ("get_node_configs", lambda: rag.get_node_configs()),
+            ("query_node_config", lambda: rag.query_node_config("swap")),
+            ("query_capability", lambda: rag.query_capability("swap")),
+            ("query_capabilities", lambda: rag.query_capabilities()),
+            ("get_all_strategies", lambda: rag.get_all_strategies()),
+            ("query_all_strategies", lambda: rag.query_all_strategies()),
+            ("get_strategy", lambda: rag.get_strategy(strategy)),
+            ("query_strategy", lambda: rag.query_strategy(strategy)),
+            ("search_strategies", lambda: rag.search_strategies(INTENT)),
+            ("find_strategy_for_intent", lambda: rag.find_strategy_for_intent(INTENT)),
+            ("get_all_operations", lambda: rag.get_all_operations()),
+            ("query_operation", lambda: rag.query_operation(operation)),
+            ("query_protocols", lambda: rag.query_protocols()),
+            ("query_token", lambda: rag.query_token("USDC")),
+            ("get_token_address", lambda: rag.get_token_address(chain, "USDC")),
+            ("get_all_tokens_for_chain", lambda: rag.get_all_tokens_for_chain(chain)),
+            ("get_all_token_addresses", lambda: rag.get_all_token_addresses()),
+            ("get_all_tokens", lambda: rag.get_all_tokens()),
+            ("get_token_registry", lambda: rag.get_token_registry()),
+            ("records (tokens on chain)", lambda: rag.records(TokenAddress, chain)),
+            ("get_all_chains", lambda: rag.get_all_chains()),
+            ("query_chains", lambda: rag.query_chains()),
+            ("query_solution", lambda: rag.query_solution("maximize_yield")),
+            ("query_consideration", lambda: rag.query_consideration("gas_costs")),
+            ("search_knowledge", lambda: rag.search_knowledge(QUESTION)),
+            ("generate_workflow_from_strategy", lambda: server.generate_workflow_from_strategy(record, INTENT)),
+            ("intent -> workflow", intent_to_workflow),
+        ]
+
+        results = {}
+        for label, fn in methods:
+            # The first call builds the strategy and lexical indexes; time the queries
+            fn()
+            results[label] = measure(fn, budget, repeat)
+
+    build_ms = statistics.median(build_times) * 1000
+    return {
+        "scale": scale,
+        "facts": facts,
+        "atoms": atoms,
+        # Size actually measured, relative to the bundled graph
+        "size": round(atoms / bundled_atoms, 2),
+        "build": {"p50": round(build_ms, 1), "atomsPerSecond": round(atoms / build_ms * 1000)},
+        "baseMB": base_mb,
+        "peakMB": peak_mb(),
+        "methods": results,
+    }
+
+
+def run_scale_process(scale: int, args) -> dict:
+    """Run one scale in a fresh interpreter, so its peak memory is its own."""
+    env = dict(os.environ, METTA_SNAPSHOT="off")
+    # server.py creates its ASI:One client at import; the benchmark never calls it
+    env.setdefault("ASI_ONE_API_KEY", "benchmark")
+    command = [sys.executable, __file__, "--worker", str(scale), "--budget", str(args.budget),
+               "--repeat", str(args.repeat), "--builds", str(args.builds)]
+    output = subprocess.run(command, env=env, capture_output=True, text=True)
+    if output.returncode < 0:
+        return {"scale": scale, "error": f"crashed ({signal.Signals(-output.returncode).name})"}
+    if output.returncode != 0:
+        lines = output.stderr.strip().splitlines()
+        return {"scale": scale, "error": lines[-1] if lines else f"exit status {output.returncode}"}
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+# ============================================
+# REPORTING
+# ============================================
+
+def compare(current: float, baseline, tolerance: float) -> str:
+    """Ratio to the baseline, flagged with ! when it is a regression."""
+    if not baseline:
+        return ""
+    ratio = current / baseline
+    regressed = ratio > 1 + tolerance and current - baseline > NOISE_MS
+    return f"{ratio:.2f}x" + (" !" if regressed else "")
+
+
+def report(results, baseline, tolerance: float) -> int:
+    """Print the results next to the baseline; returns the number of regressions."""
+    base = {str(result["scale"]): result for result in (baseline or {}).get("results", [])}
+    flags = []
+
+    def note(label: str, current: float, previous) -> str:
+        flag = compare(current, previous, tolerance)
+        if flag.endswith("!"):
+            flags.append(label)
+        return flag
+
+    print(f"{'scale':>6}{'size':>7}{'chains':>8}{'tokens':>8}{'strats':>8}{'ops':>6}{'atoms':>8}"
+          f"{'build':>10}{'atoms/s':>10}{'peak':>9}{'vs base':>10}")
+    for result in results:
+        previous = base.get(str(result["scale"]), {})
+        if "error" in result:
+            if "error" not in previous and previous:
+                flags.append(f"{result['scale']}x failed")
+            print(f"{result['scale']:>5}x  failed: {result['error']}")
+            continue
+        facts = result["facts"]
+        flag = note(f"{result['scale']}x build", result["build"]["p50"], previous.get("build", {}).get("p50"))
+        print(f"{result['scale']:>5}x{result['size']:>6.1f}x{facts['chain']:>8}{facts['token-address']:>8}{facts['strategy']:>8}"
+              f"{facts['operation']:>6}{result['atoms']:>8}{result['build']['p50']:>8.0f}ms"
+              f"{result['build']['atomsPerSecond']:>10}{result['peakMB']:>6.0f} MB{flag:>10}")
+
+    for result in results:
+        if "error" in result:
+            continue
+        previous = base.get(str(result["scale"]), {}).get("methods", {})
+        capped = f", capped at {result['size']:.1f}x" if result["size"] < result["scale"] * 0.95 else ""
+        print(f"\n{result['scale']}x ({result['atoms']} atoms{capped})")
+        print(f"{'query':<34}{'calls/s':>10}{'p50':>12}{'p99':>12}{'vs base':>10}")
+        for label, timing in result["methods"].items():
+            flag = note(f"{result['scale']}x {label}", timing["p50"], previous.get(label, {}).get("p50"))
+            print(f"{label:<34}{timing['perSecond']:>10.0f}{timing['p50']:>10.3f}ms"
+                  f"{timing['p99']:>10.3f}ms{flag:>10}")
+
+    if baseline:
+        print(f"\nCompared with the baseline from {baseline['recorded']} ({baseline['machine']})")
+        if flags:
+            print(f"⚠️  {len(flags)} regression(s) beyond {tolerance:.0%}: {', '.join(flags)}")
+    return len(flags)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100, 1000], help='graph sizes, times the bundled one')
+    parser.add_argument('--budget', type=float, default=0.5, help='seconds per query method and scale')
+    parser.add_argument('--repeat', type=int, default=1000, help='most calls per query method and scale')
+    parser.add_argument('--builds', type=int, default=3, help='graph builds per scale')
+    parser.add_argument('--baseline', type=Path, default=BASELINE, help='baseline results file')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown against the baseline')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(run_scale(args.worker, args.budget, args.repeat, args.builds)))
+        return
+
+    results = [run_scale_process(scale, args) for scale in args.scales]
+
+    baseline = None
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())
+    regressions = report(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({
+            "recorded": time.strftime("%Y-%m-%d"),
+            "machine": f"{platform.machine()}, {platform.python_implementation()} {platform.python_version()}",
+            "results": results,
+        }, indent=2) + "\n")
+        print(f"\n💾 Saved baseline to {args.baseline}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
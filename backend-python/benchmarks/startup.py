@@ -0,0 +1,74 @@
+"""
+Knowledge Graph Startup Benchmark
+
+Compares building the knowledge graph from source (initialize_defi_knowledge,
+one add_atom per fact) against loading the persisted snapshot
+(metta/knowledge_snapshot.py, parsed straight into atoms). Creating the MeTTa
+runner itself is timed separately, since both paths pay for it.
+
+Usage:
+    python benchmarks/startup.py [--repeat N]
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from hyperon import MeTTa
+
+from metta.knowledge import initialize_defi_knowledge, knowledge_sources
+from metta.knowledge_snapshot import content_hash, load_snapshot, save_snapshot
+
+
+def measure(fn, repeat: int) -> float:
+    """Median wall time of fn in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help='runs per method')
+    args = parser.parse_args()
+
+    digest = content_hash(knowledge_sources())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "knowledge.snapshot.metta"
+        with contextlib.redirect_stdout(io.StringIO()):
+            metta = MeTTa()
+            initialize_defi_knowledge(metta)
+        atoms = save_snapshot(metta, path, digest)
+
+        def cold_build():
+            initialize_defi_knowledge(MeTTa())
+
+        def snapshot_load():
+            assert load_snapshot(path, digest) is not None
+
+        runner_ms = measure(MeTTa, args.repeat)
+        build_ms = measure(cold_build, args.repeat)
+        load_ms = measure(snapshot_load, args.repeat)
+
+    print(f"{atoms} atoms, median of {args.repeat} runs")
+    print(f"{'':<18}{'total':>10}{'knowledge':>12}")
+    print(f"{'MeTTa runner':<18}{runner_ms:>8.1f}ms")
+    print(f"{'cold build':<18}{build_ms:>8.1f}ms{build_ms - runner_ms:>10.1f}ms")
+    print(f"{'snapshot load':<18}{load_ms:>8.1f}ms{load_ms - runner_ms:>10.1f}ms")
+    print(f"knowledge load speedup: {(build_ms - runner_ms) / max(load_ms - runner_ms, 1e-3):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
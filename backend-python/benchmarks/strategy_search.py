@@ -0,0 +1,85 @@
+"""
+Strategy Search Benchmark
+
+Indexes 100, 1k and 10k synthetic strategies with metta/strategy_index.py
+and reports the build time, the time to index one more strategy, and the
+median and p99 latency of ranking the top 5 for typical intents.
+
+Synthetic strategies combine the words of the bundled strategies
+(metta/data/strategy.csv) with a unique tag each, so term frequencies
+resemble the real ones as the collection grows.
+
+Usage:
+    python benchmarks/strategy_search.py [--sizes 100 1000 10000] [--repeat 200]
+"""
+
+import argparse
+import csv
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from metta.records import Strategy
+from metta.strategy_index import StrategyIndex
+
+
+DATA = Path(__file__).parent.parent / "metta" / "data" / "strategy.csv"
+
+QUERIES = [
+    "maximize yield on my USDC",
+    "dca into eth every week",
+    "borrow stablecoins against my ETH",
+    "rebalance my portfolio when the price drops",
+    "swap eth and send it to my friend",
+]
+
+
+def synthetic_strategies(count: int, seed: int = 7):
+    with open(DATA, newline="", encoding="utf-8") as f:
+        bundled = [Strategy(**row) for row in csv.DictReader(f)]
+    words = [word for strategy in bundled for word in strategy.description.split()]
+    rng = random.Random(seed)
+    for i in range(count):
+        base = bundled[i % len(bundled)]
+        description = " ".join(rng.sample(words, 6))
+        yield Strategy(f"{base.name}_{i}", f"{description} tag{i}", base.sequence)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='strategies to index')
+    parser.add_argument('--repeat', type=int, default=200, help='searches per query')
+    args = parser.parse_args()
+
+    print(f"{'strategies':>10}{'build':>10}{'add one':>10}{'search p50':>12}{'search p99':>12}")
+    for count in args.sizes:
+        strategies = list(synthetic_strategies(count + 1))
+
+        start = time.perf_counter()
+        index = StrategyIndex(strategies[:count])
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index.sync(strategies)
+        add_one = time.perf_counter() - start
+
+        timings = []
+        for _ in range(args.repeat):
+            for query in QUERIES:
+                start = time.perf_counter()
+                index.search(query, k=5)
+                timings.append(time.perf_counter() - start)
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+
+        print(f"{count:>10}{build * 1000:>8.0f}ms{add_one * 1000:>8.2f}ms"
+              f"{statistics.median(timings) * 1e6:>10.0f}µs{p99 * 1e6:>10.0f}µs")
+
+
+if __name__ == "__main__":
+    main()
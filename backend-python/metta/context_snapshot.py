@@ -0,0 +1,141 @@
+"""
+Versioned RAG Context Snapshot
+
+The generation context (strategies, operations, protocols, token addresses,
+chains) only changes when knowledge is added to the graph, so instead of
+re-querying MeTTa on every request it is built once into an immutable
+snapshot and shared by reference. It also carries the TokenRegistry
+(metta/token_registry.py) the token addresses are looked up in.
+
+Each snapshot records the knowledge generation it was built from
+(DeFiWorkflowRAG.generation). When add_knowledge bumps the generation,
+the next request rebuilds the snapshot; requests already holding the old
+snapshot keep using it unchanged.
+"""
+
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from metta.token_registry import TokenRegistry
+from utils.immutable import FrozenDict, freeze
+
+
+CONTEXT_KEYS = ('strategies', 'operations', 'protocols', 'token_addresses', 'chains')
+
+
+@dataclass(frozen=True, eq=False)
+class ContextSnapshot(Mapping):
+    """
+    Immutable generation context built from one knowledge generation.
+
+    Behaves as a read-only mapping with the keys "strategies",
+    "operations", "protocols", "token_addresses" and "chains", so it can be
+    passed anywhere a context dict is expected. The token registry is the
+    tokens attribute.
+    """
+    version: int
+    strategies: Tuple[Any, ...]
+    operations: Tuple[Any, ...]
+    protocols: Tuple[Any, ...]
+    token_addresses: FrozenDict
+    chains: Tuple[Any, ...]
+    tokens: TokenRegistry
+    built_at: float
+    build_ms: float
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in CONTEXT_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(CONTEXT_KEYS)
+
+    def __len__(self) -> int:
+        return len(CONTEXT_KEYS)
+
+    def info(self) -> Dict[str, Any]:
+        """Summary of the snapshot for health checks and logs."""
+        return {
+            "version": self.version,
+            "strategies": len(self.strategies),
+            "operations": len(self.operations),
+            "protocols": len(self.protocols),
+            "chains": len(self.chains),
+            "tokens": len(self.tokens),
+            "buildMs": self.build_ms,
+        }
+
+
+class ContextSnapshotStore:
+    """
+    Holds the current ContextSnapshot for a DeFiWorkflowRAG.
+
+    get() is lock-free while the snapshot is current; only a rebuild
+    takes the lock, so concurrent requests never build it twice.
+    """
+
+    def __init__(self, rag):
+        """
+        Initialize the store.
+
+        Args:
+            rag: DeFiWorkflowRAG whose generation counter tracks knowledge changes
+        """
+        self.rag = rag
+        self.rebuilds = 0
+        self._snapshot: Optional[ContextSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> ContextSnapshot:
+        """
+        Get the snapshot for the current knowledge generation.
+
+        Returns:
+            The shared snapshot, rebuilt first if knowledge has changed
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self.rag.generation:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != self.rag.generation:
+                try:
+                    self._snapshot = self._build()
+                    self.rebuilds += 1
+                except Exception as e:
+                    if self._snapshot is None:
+                        raise
+                    # Keep serving the previous snapshot rather than failing requests
+                    print(f"⚠️  RAG context rebuild failed, keeping v{self._snapshot.version}: {e}")
+            return self._snapshot
+
+    def _build(self) -> ContextSnapshot:
+        # Read the generation first: if knowledge changes mid-build, the
+        # snapshot is stamped with the older version and rebuilt next time
+        version = self.rag.generation
+        start = time.perf_counter()
+
+        strategies = self.rag.get_all_strategies()
+        operations = self.rag.get_all_operations()
+        protocols = self.rag.query_protocols()
+        tokens = self.rag.get_token_registry()
+        chains = self.rag.get_all_chains()
+
+        build_ms = round((time.perf_counter() - start) * 1000, 2)
+        print(f"📸 Built RAG context snapshot v{version} in {build_ms:.0f}ms")
+
+        return ContextSnapshot(
+            version=version,
+            strategies=freeze(strategies or []),
+            operations=freeze(operations or []),
+            protocols=freeze(protocols or []),
+            token_addresses=freeze(tokens.as_table()),
+            chains=freeze(chains or []),
+            tokens=tokens,
+            built_at=time.time(),
+            build_ms=build_ms,
+        )
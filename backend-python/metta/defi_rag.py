@@ -3,25 +3,83 @@ DeFi RAG (Retrieval-Augmented Generation) System
 
 This module provides query interfaces for the MeTTa knowledge graph,
 enabling structured retrieval of DeFi workflow information.
+
+Facts are decoded into typed records (metta/records.py) by walking the
+atoms, not by parsing their printed form. Lookups of whole relations, or
+of a relation by its first argument, are served from a SpaceIndex mirror
+of the space; other patterns are precompiled QueryTemplates
+(metta/query_template.py), matched against the space with their arguments
+bound as atoms rather than interpolated into MeTTa text. Strategies
+for a user intent are ranked by a BM25 StrategyIndex
+(metta/strategy_index.py), and free-text questions are matched against
+every fact by character n-gram TF-IDF similarity (metta/lexical_index.py).
+Every public query is timed into the rag_query_duration_seconds histogram.
+
+Query results are memoized per knowledge generation (utils/query_cache.py)
+and returned frozen: dicts are FrozenDicts and lists are tuples, shared
+between callers. add_knowledge bumps the generation, dropping the cache,
+as does swap_knowledge, which replaces the whole graph on a hot reload
+(metta/knowledge_reload.py).
 """
 
 from hyperon import MeTTa
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Type
+
+from metta.lexical_index import FactMatch, LexicalIndex
+from metta.records import (
+    Chain, NodeConfigField, NodeType, Operation, Protocol, Record, Strategy, Token, TokenAddress,
+)
+from metta.query_template import QueryTemplate, relation_template
+from metta.records import decode_fact
+from metta.space_index import SpaceIndex
+from metta.strategy_index import StrategyIndex, StrategyMatch
+from metta.token_registry import TokenRegistry
+from utils.metrics import RAG_QUERY_SECONDS, time_methods
+from utils.query_cache import QueryCache, memoize_methods
+
 
+# Match patterns, parsed once; bound per call (see metta/query_template.py)
+TOKEN = QueryTemplate("(token $symbol $name $decimals)", "($name $decimals)")
+CAPABILITY = QueryTemplate("(capability $node_type $desc)", "$desc")
+NODE_REQUIREMENTS = QueryTemplate("(config $node_type $params)", "$params")
+SOLUTION = QueryTemplate("(solution $problem $desc)", "$desc")
+CONSIDERATION = QueryTemplate("(consideration $topic $desc)", "$desc")
+CHAIN_BY_TYPE = QueryTemplate("(chain $name $type)", "$name")
 
+
+@time_methods(RAG_QUERY_SECONDS)
+@memoize_methods(exclude=("add_knowledge", "swap_knowledge"))
 class DeFiWorkflowRAG:
     """
     RAG system for querying DeFi knowledge graph using MeTTa.
     """
     
-    def __init__(self, metta_instance: MeTTa):
+    def __init__(self, metta_instance: MeTTa, use_index: bool = True, cache_size: int = 1024):
         """
         Initialize RAG with MeTTa instance.
         
         Args:
             metta_instance: Initialized MeTTa knowledge graph
+            use_index: Build a SpaceIndex for fact lookups
+            cache_size: Query results kept per generation (0 disables the cache)
         """
         self.metta = metta_instance
+        # Bumped whenever knowledge is added; query results are cached per generation
+        self.generation = 0
+        self.query_cache = QueryCache(cache_size) if cache_size else None
+        self.index = None
+        if use_index:
+            try:
+                self.index = SpaceIndex(metta_instance.space())
+                print(f"🗂️  Indexed {self.index.info()['atoms']} MeTTa atoms in {self.index.build_ms:.1f}ms")
+            except Exception as e:
+                print(f"⚠️  Could not index the MeTTa space, querying MeTTa directly: {e}")
+        # Synced from the strategy facts when the generation changes
+        self.strategy_index = StrategyIndex()
+        self._strategy_generation = None
+        # Built on the first search after the generation changes
+        self._lexical_index: Optional[LexicalIndex] = None
+        self._lexical_generation = None
     
     # ============================================
     # NODE TYPE QUERIES
@@ -34,24 +92,7 @@ class DeFiWorkflowRAG:
         Returns:
             List of node type dictionaries with type, label, description, color
         """
-        query_str = '!(match &self (node-type $type $label $desc $color) ($type $label $desc $color))'
-        results = self.metta.run(query_str)
-        
-        # Parse MeTTa results - format: [[[type, label, desc, color], [type, label, desc, color], ...]]
-        node_types = []
-        if results and len(results) > 0:
-            for result_set in results:
-                if isinstance(result_set, list):
-                    for item in result_set:
-                        if isinstance(item, list) and len(item) >= 4:
-                            node_types.append({
-                                "type": str(item[0]).strip('"'),
-                                "label": str(item[1]).strip('"'),
-                                "description": str(item[2]).strip('"'),
-                                "color": str(item[3]).strip('"')
-                            })
-        
-        return node_types
+        return [record.as_dict() for record in self.records(NodeType)]
     
     def get_node_config(self, node_type: str) -> Dict[str, str]:
         """
@@ -63,118 +104,55 @@ class DeFiWorkflowRAG:
         Returns:
             Dictionary of config field -> default value
         """
-        query_str = f'!(match &self (node-config {node_type} $field $value) ($field $value))'
-        results = self.metta.run(query_str)
-        
-        config = {}
-        for result in results:
-            if result and len(result) > 0 and len(result[0]) >= 2:
-                field = str(result[0][0])
-                value = str(result[0][1])
-                config[field] = value
+        return {record.field: record.default for record in self.records(NodeConfigField, node_type)}
+    
+    def get_node_configs(self, node_types: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, str]]:
+        """
+        Get the default configuration of many node types in one pass over the config facts.
         
-        return config
+        Args:
+            node_types: Node types to include, e.g. ("trigger", "swap"); all if None
+            
+        Returns:
+            Node type -> config field -> default value, {} for a requested
+            type without config fields
+        """
+        configs = {node_type: {} for node_type in node_types} if node_types is not None else {}
+        for record in self.records(NodeConfigField):
+            if node_types is None or record.node_type in configs:
+                configs.setdefault(record.node_type, {})[record.field] = record.default
+        return configs
     
     # ============================================
     # STRATEGY QUERIES
     # ============================================
     
-    def find_strategy_for_intent(self, user_query: str) -> Optional[List[Any]]:
+    def get_all_strategies(self) -> List[Dict[str, str]]:
         """
-        Find a strategy that matches user intent.
+        Get all strategies with their descriptions and node sequences.
         
-        Args:
-            user_query: Natural language query
-            
         Returns:
-            Strategy information if found
+            List of {"name", "description", "sequence"} dictionaries
         """
-        # Extract keywords from query
-        query_lower = user_query.lower()
-        
-        # Query for strategies
-        if "yield" in query_lower or "maximize" in query_lower:
-            return self.query_strategy("maximize_yield_usdc")
-        elif "dca" in query_lower or "dollar cost" in query_lower:
-            return self.query_strategy("dollar_cost_average")
-        elif "arbitrage" in query_lower:
-            return self.query_strategy("arbitrage_dex")
-        elif "lend" in query_lower or "supply" in query_lower or "borrow" in query_lower:
-            return self.query_strategy("lending_strategy")
-        elif "rebalance" in query_lower:
-            return self.query_strategy("conditional_rebalance")
-        
-        return None
+        return [record.as_dict() for record in self.records(Strategy)]
     
-    def query_strategy(self, strategy_name: str) -> List[Any]:
+    def get_strategy(self, strategy_name: str) -> Optional[Strategy]:
         """
-        Query for a specific strategy.
+        Get one strategy by name.
         
         Args:
-            strategy_name: Name of the strategy
+            strategy_name: Name of the strategy (e.g., 'maximize_yield_usdc')
             
         Returns:
-            Strategy details (node sequence)
-        """
-        query_str = f'!(match &self (strategy {strategy_name} $desc $sequence) $sequence)'
-        results = self.metta.run(query_str)
-        return results
-    
-    def query_all_strategies(self) -> List[Dict[str, str]]:
+            The Strategy record, or None if there is no such strategy
         """
-        Get all available strategies.
-        
-        Returns:
-            List of strategy dictionaries
-        """
-        query_str = '!(match &self (strategy $name $desc $sequence) ($name $desc $sequence))'
-        results = self.metta.run(query_str)
-        
-        print(f"[RAG DEBUG] query_all_strategies raw results: {results}")
-        print(f"[RAG DEBUG] results type: {type(results)}, len: {len(results) if results else 0}")
-        
-        # MeTTa returns format: [[(name "desc"), (name "desc"), ...]]
-        # Each item is an Atom-like object with string representation like: (maximize_yield_usdc "trigger -> swap_to_usdc -> aave_supply")
-        strategies = []
-        if results and len(results) > 0:
-            for result_set in results:
-                if isinstance(result_set, list):
-                    for item in result_set:
-                        # Convert Atom to string and parse
-                        item_str = str(item)
-                        # Format: (name "description")
-                        if '(' in item_str and '"' in item_str:
-                            # Extract name (before first space) and description (in quotes)
-                            parts = item_str.strip('()').split('"')
-                            if len(parts) >= 2:
-                                name = parts[0].strip()
-                                sequence = parts[1].strip()
-                                strategies.append({
-                                    "name": name,
-                                    "description": f"Strategy: {name}",
-                                    "sequence": sequence
-                                })
-        
-        return strategies
+        strategies = self.records(Strategy, strategy_name)
+        return strategies[0] if strategies else None
     
     # ============================================
     # OPERATION QUERIES
     # ============================================
     
-    def query_operation(self, keyword: str) -> List[Any]:
-        """
-        Query for a specific operation.
-        
-        Args:
-            keyword: Operation keyword (e.g., "swap_tokens")
-            
-        Returns:
-            Operation details (node type)
-        """
-        query_str = f'!(match &self (operation {keyword} $node_type $desc) $node_type)'
-        results = self.metta.run(query_str)
-        return results
-    
     def get_all_operations(self) -> List[Dict[str, str]]:
         """
         Get all available operations.
@@ -182,49 +160,7 @@ class DeFiWorkflowRAG:
         Returns:
             List of operation dictionaries
         """
-        query_str = '!(match &self (operation $keyword $node_type $desc) ($keyword $node_type $desc))'
-        results = self.metta.run(query_str)
-        
-        # Parse MeTTa results
-        operations = []
-        if results and len(results) > 0:
-            for result_set in results:
-                if isinstance(result_set, list):
-                    for item in result_set:
-                        if isinstance(item, list) and len(item) >= 3:
-                            operations.append({
-                                "keyword": str(item[0]).strip('"'),
-                                "node_type": str(item[1]).strip('"'),
-                                "description": str(item[2]).strip('"')
-                            })
-        
-        return operations
-    
-    # ============================================
-    # PROTOCOL QUERIES
-    # ============================================
-    
-    def query_protocols(self) -> List[Dict[str, str]]:
-        """
-        Get all DeFi protocols.
-        
-        Returns:
-            List of protocol dictionaries
-        """
-        query_str = '!(match &self (protocol $name $type $chains) ($name $type $chains))'
-        results = self.metta.run(query_str)
-        
-        # MeTTa returns: [["[uniswap, 1inch, aave]"]] - just return this simplified
-        # For now, just return a simple list of protocol names
-        protocols = []
-        if results and len(results) > 0:
-            result_str = str(results[0][0]) if results[0] else ""
-            # Extract protocol names from string like "[uniswap, 1inch, aave]"
-            result_str = result_str.strip('[]"\'')
-            protocol_names = [p.strip() for p in result_str.split(',')]
-            protocols = [{"name": name, "type": "dex", "chains": "all"} for name in protocol_names if name]
-        
-        return protocols
+        return [record.as_dict() for record in self.records(Operation)]
     
     # ============================================
     # TOKEN & CHAIN QUERIES
@@ -238,11 +174,9 @@ class DeFiWorkflowRAG:
             symbol: Token symbol (e.g., "USDC")
             
         Returns:
-            Token details
+            (name, decimals) of each matching token
         """
-        query_str = f'!(match &self (token {symbol} $name $decimals) ($name $decimals))'
-        results = self.metta.run(query_str)
-        return results
+        return TOKEN.run(self.metta.space(), symbol=symbol)
     
     def get_token_address(self, chain: str, symbol: str) -> Optional[Dict[str, str]]:
         """
@@ -255,21 +189,8 @@ class DeFiWorkflowRAG:
         Returns:
             Dictionary with token details including address, or None if not found
         """
-        query_str = f'!(match &self (token-address {chain} {symbol} $name $address $decimals) ($name $address $decimals))'
-        results = self.metta.run(query_str)
-        
-        if results and len(results) > 0 and len(results[0]) > 0:
-            result = results[0]
-            if isinstance(result, list) and len(result) >= 3:
-                return {
-                    "chain": chain,
-                    "symbol": symbol,
-                    "name": str(result[0]).strip('"'),
-                    "address": str(result[1]).strip('"'),
-                    "decimals": str(result[2]).strip('"')
-                }
-        
-        return None
+        token = self.get_token_registry().get(chain, symbol)
+        return token.as_dict() if token else None
     
     def get_all_tokens_for_chain(self, chain: str) -> List[Dict[str, str]]:
         """
@@ -281,23 +202,7 @@ class DeFiWorkflowRAG:
         Returns:
             List of token dictionaries with symbol, name, address, decimals
         """
-        query_str = f'!(match &self (token-address {chain} $symbol $name $address $decimals) ($symbol $name $address $decimals))'
-        results = self.metta.run(query_str)
-        
-        tokens = []
-        if results and len(results) > 0:
-            for result_set in results:
-                if isinstance(result_set, list):
-                    for item in result_set:
-                        if isinstance(item, list) and len(item) >= 4:
-                            tokens.append({
-                                "symbol": str(item[0]).strip('"'),
-                                "name": str(item[1]).strip('"'),
-                                "address": str(item[2]).strip('"'),
-                                "decimals": str(item[3]).strip('"')
-                            })
-        
-        return tokens
+        return self.get_token_registry().as_table().get(chain, [])
     
     def get_all_token_addresses(self) -> Dict[str, List[Dict[str, str]]]:
         """
@@ -306,36 +211,16 @@ class DeFiWorkflowRAG:
         Returns:
             Dictionary mapping chain name to list of token dictionaries
         """
-        # Try simpler query first
-        query_str = '!(match &self (token-address $chain $symbol $name $address $decimals) $chain)'
-        results = self.metta.run(query_str)
-        
-        print(f"[DEBUG] Token address simple query results: {results}")
-        
-        # Full query
-        query_str = '!(match &self (token-address $chain $symbol $name $address $decimals) ($chain $symbol $name $address $decimals))'
-        results = self.metta.run(query_str)
-        
-        print(f"[DEBUG] get_all_token_addresses raw results: {results}")
-        print(f"[DEBUG] results type: {type(results)}, len: {len(results) if results else 0}")
-        if results and len(results) > 0 and len(results[0]) > 0:
-            print(f"[DEBUG] First item: {results[0][0]}, type: {type(results[0][0])}")
-            # Try string parsing like we did for strategies
-            item_str = str(results[0][0])
-            print(f"[DEBUG] First item as string: {item_str}")
-        
-        # Group by chain - parse like strategies (Atom format)
-        token_map = {}
-        if results and len(results) > 0:
-            for result_set in results:
-                if isinstance(result_set, list):
-                    for item in result_set:
-                        # Convert to string and parse: (chain symbol ValueAtom(name) ValueAtom(address) ValueAtom(decimals))
-                        item_str = str(item).strip('()')
-                        # Try to extract components
-                        print(f"[DEBUG] Parsing token: {item_str}")
-        
-        return token_map
+        return self.get_token_registry().as_table()
+    
+    def get_token_registry(self) -> TokenRegistry:
+        """
+        Get the token addresses indexed by (chain, symbol), (chain, address) and symbol.
+        
+        Returns:
+            TokenRegistry of the token-address facts, built once per knowledge generation
+        """
+        return TokenRegistry(self.records(TokenAddress))
     
     def get_all_tokens(self) -> List[Dict[str, str]]:
         """
@@ -344,23 +229,7 @@ class DeFiWorkflowRAG:
         Returns:
             List of token dictionaries
         """
-        query_str = '!(match &self (token $symbol $name $decimals) ($symbol $name $decimals))'
-        results = self.metta.run(query_str)
-        
-        # Parse MeTTa results
-        tokens = []
-        if results and len(results) > 0:
-            for result_set in results:
-                if isinstance(result_set, list):
-                    for item in result_set:
-                        if isinstance(item, list) and len(item) >= 3:
-                            tokens.append({
-                                "symbol": str(item[0]).strip('"'),
-                                "name": str(item[1]).strip('"'),
-                                "decimals": str(item[2]).strip('"')
-                            })
-        
-        return tokens
+        return [record.as_dict() for record in self.records(Token)]
     
     def get_all_chains(self) -> List[Dict[str, str]]:
         """
@@ -369,63 +238,40 @@ class DeFiWorkflowRAG:
         Returns:
             List of chain dictionaries
         """
-        query_str = '!(match &self (chain $name $chain_id $testnet) ($name $chain_id $testnet))'
-        results = self.metta.run(query_str)
-        
-        # Parse MeTTa results
-        chains = []
-        if results and len(results) > 0:
-            for result_set in results:
-                if isinstance(result_set, list):
-                    for item in result_set:
-                        if isinstance(item, list) and len(item) >= 3:
-                            chains.append({
-                                "name": str(item[0]).strip('"'),
-                                "chainId": str(item[1]).strip('"'),
-                                "testnet": str(item[2]).strip('"') == "true"
-                            })
-        
-        return chains
+        return [record.as_dict() for record in self.records(Chain)]
     
     # ============================================
-    # KNOWLEDGE EXPANSION
+    # KNOWLEDGE QUERIES
     # ============================================
     
-    def add_knowledge(self, relation_type: str, subject: str, object_value: str):
+    def query_capability(self, node_type: str):
         """
-        Add new knowledge to the graph.
+        Get the capability description for a specific node type.
         
         Args:
-            relation_type: Type of relation (e.g., "token", "strategy")
-            subject: Subject of the relation
-            object_value: Object/value of the relation
+            node_type: The type of node (e.g., 'swap', 'aave', 'transfer')
+            
+        Returns:
+            List of capability descriptions
         """
-        from hyperon import E, S, ValueAtom
-        
-        self.metta.space().add_atom(E(
-            S(relation_type),
-            S(subject),
-            ValueAtom(object_value)
-        ))
-        
-        print(f"[MeTTa] Added knowledge: ({relation_type} {subject} {object_value})")
+        return CAPABILITY.run(self.metta.space(), node_type=node_type)
     
-    def __init__(self, metta_instance: MeTTa):
-        self.metta = metta_instance
-    
-    def query_capability(self, node_type: str):
+    def query_capabilities(self, node_types: Optional[Sequence[str]] = None) -> Dict[str, List[str]]:
         """
-        Get the capability description for a specific node type.
+        Get the capability descriptions of many node types in one pass over the capability facts.
         
         Args:
-            node_type: The type of node (e.g., 'swap', 'aave', 'transfer')
+            node_types: Node types to include, e.g. ("swap", "aave"); all if None
             
         Returns:
-            List of capability descriptions
+            Node type -> capability descriptions, [] for a requested type
+            without capabilities
         """
-        query_str = f'!(match &self (capability {node_type} $desc) $desc)'
-        result = self.metta.run(query_str)
-        return self._extract_results(result)
+        capabilities = {node_type: [] for node_type in node_types} if node_types is not None else {}
+        for node_type, description in self._select("capability", 2):
+            if node_types is None or node_type in capabilities:
+                capabilities.setdefault(node_type, []).append(description)
+        return capabilities
     
     def query_strategy(self, strategy_name: str):
         """
@@ -435,36 +281,30 @@ class DeFiWorkflowRAG:
             strategy_name: Name of the strategy (e.g., 'maximize_yield_usdc')
             
         Returns:
-            Node sequence as a string
+            List with the node sequence string, empty if there is no such strategy
         """
-        query_str = f'!(match &self (strategy {strategy_name} $nodes) $nodes)'
-        result = self.metta.run(query_str)
-        return self._extract_results(result)
+        return [record.sequence for record in self.records(Strategy, strategy_name)]
     
     def query_all_strategies(self):
         """
         Get all available strategies.
         
         Returns:
-            List of (strategy_name, node_sequence) tuples
+            List of {"name", "description", "sequence"} dictionaries
         """
-        query_str = '!(match &self (strategy $name $nodes) ($name $nodes))'
-        result = self.metta.run(query_str)
-        return result
+        return self.get_all_strategies()
     
     def query_operation(self, operation_name: str):
         """
-        Get the node sequence for a specific operation.
+        Get the node type for a specific operation.
         
         Args:
             operation_name: Name of operation (e.g., 'swap_tokens', 'yield_farming')
             
         Returns:
-            Node sequence as a string
+            List with the node type string, empty if there is no such operation
         """
-        query_str = f'!(match &self (operation {operation_name} $nodes) $nodes)'
-        result = self.metta.run(query_str)
-        return self._extract_results(result)
+        return [record.node_type for record in self.records(Operation, operation_name)]
     
     def query_node_config(self, node_type: str):
         """
@@ -474,29 +314,22 @@ class DeFiWorkflowRAG:
             node_type: The type of node
             
         Returns:
-            Configuration requirements as a string
+            Configuration requirements
         """
-        query_str = f'!(match &self (config {node_type} $params) $params)'
-        result = self.metta.run(query_str)
-        return self._extract_results(result)
+        return NODE_REQUIREMENTS.run(self.metta.space(), node_type=node_type)
     
     def query_protocols(self, protocol_type: str = None):
         """
         Get available protocols, optionally filtered by type.
         
         Args:
-            protocol_type: Optional filter (e.g., 'swap', 'lending')
+            protocol_type: Optional filter (e.g., 'dex', 'lending')
             
         Returns:
             List of protocol names
         """
-        if protocol_type:
-            query_str = f'!(match &self (protocol {protocol_type} $proto) $proto)'
-        else:
-            query_str = '!(match &self (protocol $type $proto) $proto)'
-        
-        result = self.metta.run(query_str)
-        return self._extract_results(result)
+        return [record.name for record in self.records(Protocol)
+                if not protocol_type or record.type == protocol_type]
     
     def query_solution(self, problem: str):
         """
@@ -508,9 +341,7 @@ class DeFiWorkflowRAG:
         Returns:
             Solution description
         """
-        query_str = f'!(match &self (solution {problem} $desc) $desc)'
-        result = self.metta.run(query_str)
-        return self._extract_results(result)
+        return SOLUTION.run(self.metta.space(), problem=problem)
     
     def query_consideration(self, topic: str):
         """
@@ -522,9 +353,7 @@ class DeFiWorkflowRAG:
         Returns:
             Consideration description
         """
-        query_str = f'!(match &self (consideration {topic} $desc) $desc)'
-        result = self.metta.run(query_str)
-        return self._extract_results(result)
+        return CONSIDERATION.run(self.metta.space(), topic=topic)
     
     def query_chains(self, chain_type: str = None):
         """
@@ -536,43 +365,68 @@ class DeFiWorkflowRAG:
         Returns:
             List of chain names
         """
-        if chain_type:
-            query_str = f'!(match &self (chain $name {chain_type}) $name)'
-        else:
-            query_str = '!(match &self (chain $name $type) $name)'
+        return CHAIN_BY_TYPE.run(self.metta.space(), type=chain_type or None)
+    
+    def search_strategies(self, query: str, k: int = 5) -> List[StrategyMatch]:
+        """
+        Rank strategies by how well their name, description and node sequence match a query.
+        
+        Args:
+            query: Natural language query (e.g., "I want to maximize my yield")
+            k: Number of strategies to return
+            
+        Returns:
+            Up to k StrategyMatch(strategy, score), best first
+        """
+        if self._strategy_generation != self.generation:
+            generation = self.generation
+            changes = self.strategy_index.sync(self.records(Strategy))
+            self._strategy_generation = generation
+            if changes:
+                print(f"🔎 Reindexed {changes} strategies ({len(self.strategy_index)} total)")
         
-        result = self.metta.run(query_str)
-        return self._extract_results(result)
+        return self.strategy_index.search(query, k)
     
     def find_strategy_for_intent(self, intent: str):
         """
         Find the most relevant strategy based on user intent.
-        Uses fuzzy matching on strategy names and solutions.
         
         Args:
             intent: User's stated goal (e.g., "I want to maximize my yield")
             
         Returns:
-            Matching strategy name and node sequence
-        """
-        intent_lower = intent.lower()
-        
-        # Try direct strategy match
-        if "yield" in intent_lower or "maximize" in intent_lower:
-            return self.query_strategy("maximize_yield_usdc")
-        elif "dca" in intent_lower or "dollar cost" in intent_lower:
-            return self.query_strategy("dca_into_eth")
-        elif "rebalance" in intent_lower:
-            return self.query_strategy("rebalance_portfolio")
-        elif "leverage" in intent_lower:
-            return self.query_strategy("leverage_position")
-        elif "take profit" in intent_lower or "sell" in intent_lower:
-            return self.query_strategy("take_profit")
-        elif "stop loss" in intent_lower or "protect" in intent_lower:
-            return self.query_strategy("stop_loss")
-        
-        # Fallback: return all strategies
-        return self.query_all_strategies()
+            Best-ranked Strategy record, or None if no strategy matches
+        """
+        matches = self.search_strategies(intent, k=1)
+        return matches[0].strategy if matches else None
+    
+    def search_knowledge(self, question: str, k: int = 5, relations: Optional[Sequence[str]] = None,
+                         min_score: float = 0.0) -> List[FactMatch]:
+        """
+        Find the facts most similar to a free-text question.
+        
+        Args:
+            question: Free-text question (e.g., "how do I avoid paying too much gas?")
+            k: Number of facts to return
+            relations: Only consider these relations (e.g., ("consideration", "solution"))
+            min_score: Drop facts with this cosine similarity or less
+            
+        Returns:
+            Up to k FactMatch(relation, args, score), most similar first
+        """
+        if self._lexical_generation != self.generation or self._lexical_index is None:
+            generation = self.generation
+            facts = self.index.facts() if self.index is not None else [
+                fact for fact in map(decode_fact, self.metta.space().get_atoms()) if fact is not None
+            ]
+            self._lexical_index = LexicalIndex(facts)
+            self._lexical_generation = generation
+        
+        return self._lexical_index.search(question, k, relations, min_score)
+    
+    # ============================================
+    # KNOWLEDGE EXPANSION
+    # ============================================
     
     def add_knowledge(self, relation: str, subject: str, object_value):
         """
@@ -586,39 +440,75 @@ class DeFiWorkflowRAG:
         from hyperon import E, S, ValueAtom
         
         if isinstance(object_value, str):
-            self.metta.space().add_atom(E(S(relation), S(subject), ValueAtom(object_value)))
+            atom = E(S(relation), S(subject), ValueAtom(object_value))
+        else:
+            atom = E(S(relation), S(subject), S(object_value))
+        
+        if self.index is not None:
+            self.index.add_atom(atom)
         else:
-            self.metta.space().add_atom(E(S(relation), S(subject), S(object_value)))
+            self.metta.space().add_atom(atom)
+        self.generation += 1
         
         print(f"✅ Added knowledge: {relation}({subject}, {object_value})")
     
-    def _extract_results(self, metta_result):
+    def swap_knowledge(self, metta_instance: MeTTa, index: Optional[SpaceIndex] = None):
+        """
+        Replace the knowledge graph being served.
+        
+        Knowledge added with add_knowledge since the graph was loaded is
+        not carried over.
+        
+        Args:
+            metta_instance: New, fully populated MeTTa instance
+            index: SpaceIndex already built over its space; built here if
+                this RAG uses an index and none is given
+        """
+        if index is None and self.index is not None:
+            index = SpaceIndex(metta_instance.space())
+        
+        self.metta, self.index = metta_instance, index
+        self.generation += 1
+    
+    def records(self, record_type: Type[Record], *prefix: Any) -> List[Record]:
         """
-        Extract clean results from MeTTa query output.
+        Get the facts of one relation as typed records.
         
         Args:
-            metta_result: Raw result from MeTTa query
+            record_type: Record class, e.g. TokenAddress
+            *prefix: Values the leading arguments must equal, e.g. ("base", "USDC")
             
         Returns:
-            Cleaned list of results
-        """
-        if not metta_result:
-            return []
-        
-        # MeTTa returns results as nested lists/tuples
-        # Extract the actual values
-        results = []
-        for item in metta_result:
-            if hasattr(item, 'get_children'):
-                # It's an expression, extract its value
-                children = item.get_children()
-                if children:
-                    results.append(str(children[0]))
-            else:
-                results.append(str(item))
-        
-        return results if results else metta_result
-
+            One record per matching fact
+        """
+        return [
+            record_type.from_args(row)
+            for row in self._select(record_type.RELATION, record_type.ARITY, *prefix)
+        ]
+    
+    def _select(self, head: str, arity: int, *prefix: Any) -> List[Sequence[Any]]:
+        """
+        Get the facts (head arg1 ... argN) whose leading arguments equal prefix.
+        
+        Served from the index when there is one, otherwise by matching a
+        relation template against the space.
+        
+        Args:
+            head: Relation head, e.g. "token-address"
+            arity: Number of arguments after the head
+            *prefix: Values the first arguments must equal
+            
+        Returns:
+            All arity arguments of each matching fact, decoded
+        """
+        if self.index is not None:
+            rows = self.index.rows(head, arity, prefix[0] if prefix else None)
+            if len(prefix) < 2:
+                return rows
+            return [row for row in rows if row[:len(prefix)] == prefix]
+        
+        template = relation_template(head, arity)
+        return template.run(self.metta.space(), **{f"a{i}": value for i, value in enumerate(prefix)})
 
 if __name__ == "__main__":
     # Test the RAG system
@@ -639,7 +529,7 @@ if __name__ == "__main__":
     
     # Test protocols
     print("3. Swap protocols:")
-    print(f"   {rag.query_protocols('swap')}\n")
+    print(f"   {rag.query_protocols('dex')}\n")
     
     # Test solution
     print("4. Solution for maximizing yield:")
@@ -0,0 +1,451 @@
+"""
+Declarative Knowledge Loader
+
+Loads facts of the knowledge graph from data files instead of Python
+lists, so token addresses, chains, strategies, operations and protocols
+can be maintained (and grown to thousands of rows) without touching code.
+
+Each file holds rows of one relation, named by the file (token-address.csv,
+or token-address.arbitrum.csv to split a relation over several files). A
+row may name its own relation in a "relation" column instead. Columns are
+the field names of the relation's record in metta/records.py:
+
+    chain,symbol,name,address,decimals
+    base,USDC,USD Coin,0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913,6
+
+Supported formats:
+- CSV (.csv): a header row, then one row per fact
+- JSON Lines (.jsonl, .ndjson): one object per line
+- JSON (.json): an array of objects (read whole; use JSON Lines for large files)
+- YAML (.yaml, .yml): one or more documents, each a list of mappings
+  (requires PyYAML; each document is read whole)
+
+CSV and JSON Lines files are streamed. Every row is validated against the
+relation's schema and deduplicated by the relation's key (e.g. chain and
+symbol for token addresses) against earlier rows and the facts already in
+the space; the first fact for a key wins. Valid rows are converted to atoms
+encoded exactly as metta/knowledge.py encodes them and added in batches.
+
+hyperon 0.2.10 aborts the process when a space holds more than about a
+thousand distinct symbols, and crashes or returns atoms holding other
+atoms' values once it holds more than about a thousand grounded atoms.
+Grounded atoms are counted per occurrence: reusing the same string does not
+help. Rows that would push either count past SYMBOL_LIMIT or GROUNDED_LIMIT
+are rejected, so a large file loads as many rows as fit instead of crashing
+the process on the first query.
+
+Load files from the command line to check them:
+    python -m metta.knowledge_loader path/to/token-address.csv ...
+"""
+
+import csv
+import json
+import re
+import sys
+import time
+from dataclasses import dataclass, field, fields
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type
+
+from hyperon import AtomKind, E, S, SExprParser, ValueAtom
+from hyperon.base import Tokenizer
+
+from metta.records import (
+    AaveAction, Chain, NodeConfigField, NodeType, Operation, Protocol, Record,
+    Strategy, TokenAddress, decode_fact,
+)
+
+
+BATCH_SIZE = 5000
+
+# hyperon 0.2.10 panics enumerating a space with more distinct symbols than this
+SYMBOL_LIMIT = 1000
+
+# ...and crashes or corrupts facts past this many grounded atoms (occurrences)
+GROUNDED_LIMIT = 1000
+
+# Errors kept in a LoadReport; later ones are only counted
+MAX_REPORTED_ERRORS = 20
+
+SUFFIXES = ('.csv', '.jsonl', '.ndjson', '.json', '.yaml', '.yml')
+
+# Symbols must read back as one symbol in MeTTa text
+SYMBOL_PATTERN = re.compile(r'^[^\s()";]+$')
+ADDRESS_PATTERN = re.compile(r'^0x[0-9a-fA-F]{40}$')
+DIGITS_PATTERN = re.compile(r'^[0-9]+$')
+FLAG_PATTERN = re.compile(r'^(true|false)$')
+
+
+class KnowledgeLoadError(ValueError):
+    """A knowledge file that cannot be read (unknown format or malformed data)."""
+
+
+@dataclass(frozen=True)
+class RelationSchema:
+    """How the rows of one relation are validated, deduplicated and encoded."""
+    record: Type[Record]
+    # Columns stored as symbols; all others are stored as grounded strings
+    symbols: Tuple[str, ...]
+    # Columns that identify a fact
+    key: Tuple[str, ...]
+    # Regular expressions that column values must match
+    patterns: Dict[str, "re.Pattern"] = field(default_factory=dict)
+
+    @property
+    def relation(self) -> str:
+        return self.record.RELATION
+
+    @cached_property
+    def columns(self) -> Tuple[str, ...]:
+        return tuple(f.name for f in fields(self.record))
+
+    @cached_property
+    def key_positions(self) -> Tuple[int, ...]:
+        return tuple(self.columns.index(column) for column in self.key)
+
+    @cached_property
+    def symbol_positions(self) -> Tuple[int, ...]:
+        return tuple(self.columns.index(column) for column in self.symbols)
+
+    def key_of(self, values: Tuple[str, ...]) -> Tuple[str, ...]:
+        return tuple(values[position] for position in self.key_positions)
+
+
+SCHEMAS: Dict[str, RelationSchema] = {schema.relation: schema for schema in (
+    RelationSchema(NodeType, symbols=("type",), key=("type",)),
+    RelationSchema(NodeConfigField, symbols=("node_type", "field"), key=("node_type", "field")),
+    RelationSchema(AaveAction, symbols=("action",), key=("action",)),
+    RelationSchema(Strategy, symbols=("name",), key=("name",)),
+    RelationSchema(Operation, symbols=("keyword", "node_type"), key=("keyword",)),
+    RelationSchema(Protocol, symbols=("name", "type"), key=("name",)),
+    RelationSchema(
+        TokenAddress, symbols=("chain", "symbol"), key=("chain", "symbol"),
+        patterns={"address": ADDRESS_PATTERN, "decimals": DIGITS_PATTERN},
+    ),
+    RelationSchema(
+        Chain, symbols=("name",), key=("name",),
+        patterns={"chain_id": DIGITS_PATTERN, "testnet": FLAG_PATTERN, "aave": FLAG_PATTERN},
+    ),
+)}
+
+
+@dataclass
+class LoadReport:
+    """What a load did, for logs and health checks."""
+    files: int = 0
+    rows: int = 0
+    added: int = 0
+    duplicates: int = 0
+    conflicts: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    def error(self, message: str) -> None:
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+    def summary(self) -> str:
+        return (f"{self.added} facts from {self.files} files in {self.seconds * 1000:.0f}ms "
+                f"({self.duplicates} duplicates, {self.conflicts} conflicts, {self.invalid} invalid)")
+
+
+class KnowledgeLoader:
+    """Validates, deduplicates and adds rows of knowledge files to a space."""
+
+    def __init__(self, space, batch_size: int = BATCH_SIZE):
+        """
+        Initialize the loader, indexing the facts already in the space.
+
+        Args:
+            space: MeTTa space to load into (metta.space())
+            batch_size: Atoms added to the space at a time
+        """
+        self.space = space
+        self.batch_size = batch_size
+        self.report = LoadReport()
+        # relation -> key -> values of the fact that owns the key
+        self._facts: Dict[str, Dict[Tuple[str, ...], Tuple[str, ...]]] = {name: {} for name in SCHEMAS}
+        self._symbols: Set[str] = set()
+        self._grounded = 0
+        self._symbol_atoms: Dict[str, Any] = {}
+        self._batch: List[Any] = []
+
+        for atom in space.get_atoms():
+            self._symbols.update(_symbols_of(atom))
+            self._grounded += _grounded_count(atom)
+            fact = decode_fact(atom)
+            if fact is None or fact[0] not in SCHEMAS:
+                continue
+            schema = SCHEMAS[fact[0]]
+            if len(fact[1]) == len(schema.columns):
+                values = tuple(str(value) for value in fact[1])
+                self._facts[schema.relation].setdefault(schema.key_of(values), values)
+
+    @property
+    def grounded_room(self) -> int:
+        """Grounded values that can still be added before GROUNDED_LIMIT."""
+        return max(0, GROUNDED_LIMIT - self._grounded)
+
+    def load_file(self, path: Path) -> LoadReport:
+        """
+        Load one knowledge file.
+
+        Args:
+            path: CSV, JSON Lines, JSON or YAML file
+
+        Returns:
+            The loader's report, covering every file loaded so far
+
+        Raises:
+            KnowledgeLoadError: If the file cannot be read; rows before the
+                error have been added
+        """
+        path = Path(path)
+        start = time.perf_counter()
+        default_relation = path.name.split(".", 1)[0]
+        try:
+            for line, row in _read_rows(path):
+                self._add_row(str(row.pop("relation", None) or default_relation), row, f"{path.name}:{line}")
+        finally:
+            self.flush()
+            self.report.seconds += time.perf_counter() - start
+        self.report.files += 1
+        return self.report
+
+    def flush(self) -> None:
+        """Add the pending batch of atoms to the space."""
+        add_atom = self.space.add_atom
+        for atom in self._batch:
+            add_atom(atom)
+        self.report.added += len(self._batch)
+        self._batch = []
+
+    def _add_row(self, relation: str, row: Dict[str, Any], where: str) -> None:
+        self.report.rows += 1
+        schema = SCHEMAS.get(relation)
+        try:
+            if schema is None:
+                raise ValueError(f"unknown relation '{relation}'")
+            values = self._validate(schema, row)
+        except ValueError as e:
+            self.report.invalid += 1
+            self.report.error(f"{where}: {e}")
+            return
+
+        key = schema.key_of(values)
+        existing = self._facts[schema.relation].get(key)
+        if existing is not None:
+            if existing == values:
+                self.report.duplicates += 1
+            else:
+                self.report.conflicts += 1
+                self.report.error(f"{where}: {schema.relation} {' '.join(key)} already defined differently")
+            return
+
+        new_symbols = {values[position] for position in schema.symbol_positions} - self._symbols
+        if len(self._symbols) + len(new_symbols) > SYMBOL_LIMIT:
+            self.report.invalid += 1
+            self.report.error(f"{where}: would exceed {SYMBOL_LIMIT} distinct symbols in the space")
+            return
+        grounded = len(schema.columns) - len(schema.symbols)
+        if self._grounded + grounded > GROUNDED_LIMIT:
+            self.report.invalid += 1
+            self.report.error(f"{where}: would exceed {GROUNDED_LIMIT} grounded values in the space")
+            return
+
+        self._symbols.update(new_symbols)
+        self._grounded += grounded
+        self._facts[schema.relation][key] = values
+        self._batch.append(self._encode(schema, values))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def _validate(self, schema: RelationSchema, row: Dict[str, Any]) -> Tuple[str, ...]:
+        values = []
+        for column in schema.columns:
+            value = _text(row.get(column))
+            if value is None:
+                raise ValueError(f"missing {column}")
+            if column in schema.symbols and not SYMBOL_PATTERN.match(value):
+                raise ValueError(f"{column} '{value}' is not a valid symbol")
+            pattern = schema.patterns.get(column)
+            if pattern is not None and not pattern.match(value):
+                raise ValueError(f"invalid {column} '{value}'")
+            values.append(value)
+        return tuple(values)
+
+    def _encode(self, schema: RelationSchema, values: Tuple[str, ...]):
+        symbols = schema.symbol_positions
+        children = [self._symbol(schema.relation)]
+        for position, value in enumerate(values):
+            children.append(self._symbol(value) if position in symbols else ValueAtom(value))
+        return E(*children)
+
+    def _symbol(self, name: str):
+        atom = self._symbol_atoms.get(name)
+        if atom is None:
+            atom = self._symbol_atoms[name] = S(name)
+        return atom
+
+
+def load_knowledge_files(space, paths: Iterable[Path], batch_size: int = BATCH_SIZE) -> LoadReport:
+    """
+    Load knowledge files into a space.
+
+    Args:
+        space: MeTTa space to load into (metta.space())
+        paths: Knowledge files, loaded in order
+        batch_size: Atoms added to the space at a time
+
+    Returns:
+        Report of rows added, skipped as duplicates or conflicts, and rejected
+    """
+    loader = KnowledgeLoader(space, batch_size)
+    for path in paths:
+        loader.load_file(path)
+    return loader.report
+
+
+def find_knowledge_files(directory: Path) -> List[Path]:
+    """
+    List the knowledge files in a directory, sorted by name.
+
+    Args:
+        directory: Directory to search (not recursively)
+
+    Returns:
+        Files with a supported suffix; empty if the directory does not exist
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    return sorted(path for path in directory.iterdir() if path.is_file() and path.suffix.lower() in SUFFIXES)
+
+
+def parse_metta(text: str) -> Iterator[Any]:
+    """
+    Parse MeTTa text into atoms, reading string literals as grounded values.
+
+    metta.run() would parse "..." literals into the standard library's
+    string atoms; ValueAtom strings match the atoms metta/knowledge.py
+    creates. Each one counts towards GROUNDED_LIMIT like any other.
+
+    Args:
+        text: MeTTa expressions, without "!"
+
+    Returns:
+        Iterator over the parsed atoms
+    """
+    parser = SExprParser(text)
+    while True:
+        atom = parser.parse(_LITERAL_TOKENIZER)
+        if atom is None:
+            return
+        yield atom
+
+
+def _literal(token: str):
+    # The parser has already unescaped the literal; only the quotes remain
+    return ValueAtom(token[1:-1])
+
+
+_LITERAL_TOKENIZER = Tokenizer()
+_LITERAL_TOKENIZER.register_token(r'"[\s\S]*"', _literal)
+
+
+def _read_rows(path: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (line or item number, row) from a knowledge file."""
+    suffix = path.suffix.lower()
+    if suffix == '.csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+    elif suffix in ('.jsonl', '.ndjson'):
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        item = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        raise KnowledgeLoadError(f"{path}:{line_number}: {e}")
+                    yield line_number, _mapping(item, path, line_number)
+    elif suffix == '.json':
+        with open(path, encoding='utf-8') as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise KnowledgeLoadError(f"{path}: {e}")
+        if not isinstance(data, list):
+            raise KnowledgeLoadError(f"{path}: expected a JSON array of objects")
+        for number, item in enumerate(data, 1):
+            yield number, _mapping(item, path, number)
+    elif suffix in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise KnowledgeLoadError(f"{path}: loading YAML requires PyYAML (pip install pyyaml)")
+        number = 0
+        with open(path, encoding='utf-8') as f:
+            for document in yaml.safe_load_all(f):
+                for item in document or []:
+                    number += 1
+                    yield number, _mapping(item, path, number)
+    else:
+        raise KnowledgeLoadError(f"{path}: unsupported knowledge file type '{suffix}'")
+
+
+def _mapping(item: Any, path: Path, number: int) -> Dict[str, Any]:
+    if not isinstance(item, dict):
+        raise KnowledgeLoadError(f"{path}:{number}: expected an object, got {type(item).__name__}")
+    return dict(item)
+
+
+def _text(value: Any) -> Optional[str]:
+    """Normalize a cell to the string form the knowledge graph stores."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value).strip()
+
+
+def _symbols_of(atom) -> Iterator[str]:
+    kind = atom.get_metatype()
+    if kind == AtomKind.SYMBOL:
+        yield str(atom)
+    elif kind == AtomKind.EXPR:
+        for child in atom.get_children():
+            yield from _symbols_of(child)
+
+
+def _grounded_count(atom) -> int:
+    kind = atom.get_metatype()
+    if kind == AtomKind.GROUNDED:
+        return 1
+    if kind == AtomKind.EXPR:
+        return sum(_grounded_count(child) for child in atom.get_children())
+    return 0
+
+
+if __name__ == "__main__":
+    from hyperon import MeTTa
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m metta.knowledge_loader FILE [FILE ...]")
+        sys.exit(2)
+
+    try:
+        report = load_knowledge_files(MeTTa().space(), [Path(arg) for arg in sys.argv[1:]])
+    except KnowledgeLoadError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"📥 Loaded {report.summary()}")
+    for error in report.errors:
+        print(f"   ⚠️  {error}")
+    sys.exit(1 if report.invalid or report.conflicts else 0)
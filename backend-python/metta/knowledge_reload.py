@@ -0,0 +1,149 @@
+"""
+Hot Reload of the Knowledge Graph
+
+Adding a token or strategy to the knowledge files used to mean restarting
+every process. KnowledgeReloader rebuilds the graph while the old one
+keeps serving, then swaps it in under the running DeFiWorkflowRAG:
+
+1. The new space is loaded off to the side with get_metta_instance(), so
+   from the persisted snapshot when one matches the files (another process
+   may already have written it), otherwise built from the files.
+2. Its SpaceIndex is built before the swap.
+3. DeFiWorkflowRAG.swap_knowledge() replaces the space and index and bumps
+   the generation, which drops the query cache; the context snapshot,
+   token registry and strategy and lexical indexes follow the generation.
+4. Those are rebuilt right away (warm-up callbacks), so requests arriving
+   after the swap do not pay for it.
+
+Requests already running keep the ContextSnapshot and results they hold,
+which are immutable, and finish on the old version.
+
+Reloads are triggered by reload() (e.g. POST /api/knowledge/reload) or by
+watch(), which polls the knowledge files. Only the data files are
+reloaded: if metta/knowledge.py or the loader changed, the process has to
+be restarted to run the new code, and the reload is refused.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from metta.knowledge_snapshot import content_hash
+from metta.space_index import SpaceIndex
+
+
+class KnowledgeReloader:
+    """Rebuilds the knowledge graph in the background and swaps it into a DeFiWorkflowRAG."""
+
+    def __init__(self, rag, load: Callable[[], Any], data_files: Callable[[], List[Path]],
+                 code_files: Iterable[Path] = (), warm: Iterable[Callable[[], Any]] = ()):
+        """
+        Initialize the reloader.
+
+        Args:
+            rag: DeFiWorkflowRAG to swap new knowledge into
+            load: Returns a populated MeTTa instance (get_metta_instance)
+            data_files: Returns the knowledge files, re-listed on every check (knowledge_files)
+            code_files: Files whose changes need a restart rather than a reload
+            warm: Called after each swap to rebuild what depends on the knowledge
+        """
+        self.rag = rag
+        self.load = load
+        self.data_files = data_files
+        self.code_files = list(code_files)
+        self.warm = list(warm)
+        self.reloads = 0
+        self.last: Dict[str, Any] = {}
+        self._data_hash = content_hash(data_files())
+        self._code_hash = content_hash(self.code_files)
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+
+    def changed(self) -> bool:
+        """Whether the knowledge files differ from the ones last loaded."""
+        return content_hash(self.data_files()) != self._data_hash
+
+    def reload(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Load the knowledge files into a new space and swap it in.
+
+        Runs in the calling thread; other threads keep serving the current
+        knowledge until the swap. Concurrent calls wait for the running
+        reload rather than building twice.
+
+        Args:
+            force: Reload even if the knowledge files have not changed
+
+        Returns:
+            Report with "reloaded", "generation", "atoms" and timings in ms,
+            or the reason nothing was reloaded
+        """
+        with self._lock:
+            data_hash = content_hash(self.data_files())
+            if not force and data_hash == self._data_hash:
+                return {"reloaded": False, "reason": "knowledge files unchanged", "generation": self.rag.generation}
+            if content_hash(self.code_files) != self._code_hash:
+                print("⚠️  Knowledge code changed on disk; restart the process to load it")
+                return {"reloaded": False, "reason": "knowledge code changed, restart required",
+                        "generation": self.rag.generation}
+
+            start = time.perf_counter()
+            metta = self.load()
+            loaded = time.perf_counter()
+            index = SpaceIndex(metta.space()) if self.rag.index is not None else None
+            indexed = time.perf_counter()
+
+            self.rag.swap_knowledge(metta, index)
+            self._data_hash = data_hash
+            swapped = time.perf_counter()
+
+            for callback in self.warm:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"⚠️  Warm-up after knowledge reload failed: {e}")
+            warmed = time.perf_counter()
+
+            self.reloads += 1
+            self.last = {
+                "reloaded": True,
+                "generation": self.rag.generation,
+                "atoms": metta.space().atom_count(),
+                "loadMs": round((loaded - start) * 1000, 2),
+                "indexMs": round((indexed - loaded) * 1000, 2),
+                "swapMs": round((swapped - indexed) * 1000, 3),
+                "warmMs": round((warmed - swapped) * 1000, 2),
+                "at": time.time(),
+            }
+            print(f"🔁 Reloaded knowledge: {self.last['atoms']} atoms, generation {self.rag.generation}, "
+                  f"{(warmed - start) * 1000:.0f}ms")
+            return dict(self.last)
+
+    def watch(self, interval: float) -> None:
+        """
+        Reload whenever the knowledge files change, checking every interval seconds.
+
+        Args:
+            interval: Seconds between checks
+        """
+        if self._watcher is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    if self.changed():
+                        self.reload()
+                except Exception as e:
+                    # Keep serving the current knowledge; the next check retries
+                    print(f"⚠️  Knowledge reload failed: {e}")
+
+        self._watcher = threading.Thread(target=loop, name="knowledge-reload", daemon=True)
+        self._watcher.start()
+        print(f"👀 Watching knowledge files for changes every {interval:g}s")
+
+    def info(self) -> Dict[str, Any]:
+        """Reload count and the last reload, for health checks."""
+        return {"reloads": self.reloads, "watching": self._watcher is not None, "last": self.last or None}
@@ -0,0 +1,294 @@
+"""
+Shared Knowledge Service
+
+Every server worker and the mailbox agent used to build and hold its own
+MeTTa space, index and RAG. With KNOWLEDGE_SERVICE set to a socket path,
+one process hosts the knowledge graph and the others query it:
+
+    python -m metta.knowledge_service /tmp/deflow-knowledge.sock
+    KNOWLEDGE_SERVICE=/tmp/deflow-knowledge.sock python server.py
+
+Protocol: each request is one message (method, args, kwargs) calling a
+public DeFiWorkflowRAG method; each response is (generation, ok, value)
+where value is the frozen result or, on failure, the error message.
+Messages are pickled and length-prefixed by multiprocessing.connection,
+and connections are authenticated with the key in <socket>.key.
+
+The service publishes its knowledge generation in an 8-byte memory-mapped
+file, <socket>.gen. Clients (RemoteRAG) cache results locally per
+generation and read the counter before each lookup, so a cached result is
+served without a round trip, and add_knowledge from any worker is seen by
+every worker on its next lookup. With KNOWLEDGE_RELOAD_INTERVAL set, the
+service reloads changed knowledge files (metta/knowledge_reload.py) and
+publishes the new generation the same way.
+"""
+
+import mmap
+import os
+import secrets
+import struct
+import sys
+import threading
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from utils.query_cache import QueryCache, _MISSING, _key
+
+
+GENERATION = struct.Struct("<Q")
+
+
+class KnowledgeServiceError(RuntimeError):
+    """Raised when the knowledge service cannot answer a request."""
+
+
+def _key_path(address: str) -> Path:
+    return Path(address + ".key")
+
+
+def _generation_path(address: str) -> Path:
+    return Path(address + ".gen")
+
+
+def _allowed_methods(rag) -> frozenset:
+    return frozenset(
+        name for name in dir(type(rag))
+        if not name.startswith("_") and callable(getattr(type(rag), name))
+    )
+
+
+class KnowledgeServer:
+    """Serves one DeFiWorkflowRAG to other processes over a Unix socket."""
+
+    def __init__(self, rag, address: str):
+        """
+        Initialize the server.
+
+        Args:
+            rag: DeFiWorkflowRAG to serve
+            address: Unix socket path; the key and generation files are created next to it
+        """
+        self.rag = rag
+        self.address = address
+        self.requests = 0
+        self.connections = 0
+        self._methods = _allowed_methods(rag)
+        self._lock = threading.Lock()
+        self._listener: Optional[Listener] = None
+        self._generation: Optional[mmap.mmap] = None
+        self._base = 0
+
+    def serve_forever(self) -> None:
+        """Accept connections until the process is stopped, one thread per client."""
+        authkey = self._write_key()
+        self._open_generation()
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        self._listener = Listener(self.address, family="AF_UNIX", authkey=authkey)
+        print(f"🛰️  Knowledge service listening on {self.address} (generation {self.generation})")
+
+        try:
+            while True:
+                try:
+                    conn = self._listener.accept()
+                except (OSError, EOFError) as e:
+                    # Failed handshakes (wrong key, client gone) only drop that client
+                    print(f"⚠️  Knowledge service rejected a connection: {e}")
+                    continue
+                self.connections += 1
+                threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+        finally:
+            self._listener.close()
+
+    @property
+    def generation(self) -> int:
+        """Generation published to clients: the RAG's, offset past any previous run's."""
+        return self._base + self.rag.generation
+
+    def _serve(self, conn) -> None:
+        with conn:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                try:
+                    if method not in self._methods:
+                        raise AttributeError(f"unknown knowledge method {method!r}")
+                    value = getattr(self.rag, method)(*args, **kwargs)
+                    response = (True, value)
+                except Exception as e:
+                    response = (False, f"{type(e).__name__}: {e}")
+
+                # Publish before replying, so the caller sees its own update
+                generation = self.publish()
+                self.requests += 1
+                try:
+                    conn.send((generation, *response))
+                except (EOFError, OSError):
+                    return
+
+    def _write_key(self) -> bytes:
+        configured = os.getenv('KNOWLEDGE_SERVICE_KEY')
+        if configured:
+            return configured.encode()
+        authkey = secrets.token_hex(32).encode()
+        path = _key_path(self.address)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(authkey)
+        return authkey
+
+    def _open_generation(self) -> None:
+        path = _generation_path(self.address)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < GENERATION.size:
+                os.ftruncate(fd, GENERATION.size)
+            self._generation = mmap.mmap(fd, GENERATION.size)
+        finally:
+            os.close(fd)
+        # Keep counting up from the last run, so clients never mistake the
+        # restarted service's results for ones they cached earlier
+        self._base = GENERATION.unpack_from(self._generation)[0] + 1
+        self.publish()
+
+    def publish(self) -> int:
+        """Write the current generation to the counter clients read."""
+        generation = self.generation
+        if self._generation is None:
+            return generation
+        with self._lock:
+            GENERATION.pack_into(self._generation, 0, generation)
+        return generation
+
+
+class RemoteRAG:
+    """
+    DeFiWorkflowRAG stand-in that queries a shared knowledge service.
+
+    Any public DeFiWorkflowRAG method can be called on it. Results are
+    cached locally for the service's current knowledge generation; each
+    thread uses its own connection.
+    """
+
+    index = None
+
+    def __init__(self, address: str, cache_size: int = 1024):
+        """
+        Connect to a knowledge service.
+
+        Args:
+            address: Unix socket path the service listens on
+            cache_size: Local cache entries, 0 to disable
+        """
+        self.address = address
+        self.query_cache = QueryCache(cache_size) if cache_size > 0 else None
+        self.round_trips = 0
+        self._local = threading.local()
+        self._generation = self._open_generation()
+        # Fail at startup, not on the first request, if the service is down
+        self._connection()
+
+    @property
+    def generation(self) -> int:
+        """The service's current knowledge generation."""
+        return GENERATION.unpack_from(self._generation)[0]
+
+    def info(self) -> Dict[str, Any]:
+        """Connection details for health checks."""
+        return {"address": self.address, "generation": self.generation, "roundTrips": self.round_trips}
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            return self._call(name, args, kwargs)
+
+        method.__name__ = name
+        return method
+
+    def _call(self, method: str, args, kwargs) -> Any:
+        cache = self.query_cache
+        key = _key(method, args, kwargs) if method != "add_knowledge" else None
+        if cache is not None and key is not None:
+            value = cache.get(key, self.generation)
+            if value is not _MISSING:
+                return value
+
+        generation, ok, value = self._request((method, args, kwargs))
+        if not ok:
+            raise KnowledgeServiceError(f"{method}: {value}")
+        if cache is not None and key is not None:
+            cache.put(key, generation, value)
+        return value
+
+    def _request(self, message) -> Any:
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.send(message)
+                response = conn.recv()
+                self.round_trips += 1
+                return response
+            except (EOFError, OSError) as e:
+                # The service restarted or dropped us; reconnect once
+                self._local.conn = None
+                if attempt:
+                    raise KnowledgeServiceError(f"knowledge service at {self.address} unavailable: {e}") from e
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                conn = Client(self.address, family="AF_UNIX", authkey=self._read_key())
+            except (OSError, EOFError) as e:
+                raise KnowledgeServiceError(f"cannot connect to knowledge service at {self.address}: {e}") from e
+            self._local.conn = conn
+        return conn
+
+    def _read_key(self) -> bytes:
+        configured = os.getenv('KNOWLEDGE_SERVICE_KEY')
+        if configured:
+            return configured.encode()
+        try:
+            return _key_path(self.address).read_bytes()
+        except OSError as e:
+            raise KnowledgeServiceError(f"cannot read knowledge service key: {e}") from e
+
+    def _open_generation(self) -> mmap.mmap:
+        try:
+            with open(_generation_path(self.address), "rb") as f:
+                return mmap.mmap(f.fileno(), GENERATION.size, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise KnowledgeServiceError(f"cannot open knowledge service generation file: {e}") from e
+
+
+if __name__ == "__main__":
+    # Host the knowledge graph for every worker on this machine
+    from metta.defi_rag import DeFiWorkflowRAG
+    from metta.knowledge import get_metta_instance
+
+    socket_path = sys.argv[1] if len(sys.argv) > 1 else os.getenv('KNOWLEDGE_SERVICE', '/tmp/deflow-knowledge.sock')
+    server = KnowledgeServer(
+        DeFiWorkflowRAG(get_metta_instance(), cache_size=int(os.getenv('RAG_CACHE_SIZE', 1024))),
+        socket_path,
+    )
+
+    # Reload changed knowledge files and publish the new generation to every worker
+    reload_interval = float(os.getenv('KNOWLEDGE_RELOAD_INTERVAL', 0))
+    if reload_interval > 0:
+        from metta.knowledge import KNOWLEDGE_CODE, knowledge_files
+        from metta.knowledge_reload import KnowledgeReloader
+
+        KnowledgeReloader(
+            server.rag, get_metta_instance, knowledge_files, KNOWLEDGE_CODE,
+            warm=[server.publish, lambda: server.rag.search_strategies("")],
+        ).watch(reload_interval)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"👋 Knowledge service stopped after {server.requests} requests")
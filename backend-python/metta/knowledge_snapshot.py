@@ -0,0 +1,191 @@
+"""
+Persisted Knowledge Snapshot
+
+initialize_defi_knowledge builds the knowledge graph in every server worker
+and agent process, reading, validating and deduplicating the knowledge
+files each time. Instead, the populated space is written once to a MeTTa
+text file, and later processes parse it straight back into atoms.
+
+The snapshot starts with a header recording a content hash of the files
+that define the knowledge (metta/knowledge.py, the loader and the data
+files it loads) and the number of atoms:
+
+    ; knowledge-snapshot format=2 sha256=<hex> atoms=153
+
+A snapshot whose hash no longer matches those files, or that does not
+load back to the recorded number of atoms, is stale: the graph is rebuilt
+from source and the snapshot rewritten.
+
+Build the snapshot ahead of time (e.g. in a deploy step) with:
+    python -m metta.knowledge_snapshot
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from hyperon import MeTTa
+
+from metta.knowledge_loader import parse_metta
+
+
+SNAPSHOT_FORMAT = 2
+
+DEFAULT_SNAPSHOT_PATH = Path(__file__).parent / "knowledge.snapshot.metta"
+
+
+def snapshot_path() -> Optional[Path]:
+    """
+    Where the snapshot lives, from METTA_SNAPSHOT.
+
+    Returns:
+        The snapshot path, or None if snapshots are disabled (METTA_SNAPSHOT=off)
+    """
+    value = os.getenv('METTA_SNAPSHOT', str(DEFAULT_SNAPSHOT_PATH))
+    if value.strip().lower() in ('', 'off', 'false', '0'):
+        return None
+    return Path(value)
+
+
+def content_hash(sources: Iterable[Path]) -> str:
+    """
+    Hash the files that define the knowledge graph.
+
+    Args:
+        sources: Knowledge source files
+
+    Returns:
+        Hex SHA-256 of the snapshot format and the files' contents
+    """
+    digest = hashlib.sha256(f"format={SNAPSHOT_FORMAT}".encode())
+    for source in sources:
+        digest.update(Path(source).read_bytes())
+    return digest.hexdigest()
+
+
+def save_snapshot(metta: MeTTa, path: Path, digest: str) -> int:
+    """
+    Write every atom of the space to a snapshot file.
+
+    The file is written to a temporary name and renamed into place, so
+    processes starting at the same time never read a partial snapshot.
+
+    Args:
+        metta: Populated MeTTa instance
+        path: Snapshot file to write
+        digest: content_hash() of the knowledge sources
+
+    Returns:
+        Number of atoms written
+    """
+    atoms = metta.space().get_atoms()
+    lines = [f"; knowledge-snapshot format={SNAPSHOT_FORMAT} sha256={digest} atoms={len(atoms)}"]
+    lines.extend(str(atom) for atom in atoms)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(atoms)
+
+
+def load_snapshot(path: Path, digest: str) -> Optional[MeTTa]:
+    """
+    Load a snapshot if it is current.
+
+    Args:
+        path: Snapshot file
+        digest: content_hash() of the knowledge sources
+
+    Returns:
+        MeTTa instance with the snapshot loaded, or None if the snapshot is
+        missing, stale or does not load completely
+    """
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+
+    header = _parse_header(text.split("\n", 1)[0])
+    if header.get("format") != str(SNAPSHOT_FORMAT) or header.get("sha256") != digest:
+        print(f"📸 Knowledge snapshot {path.name} is stale")
+        return None
+
+    metta = MeTTa()
+    space = metta.space()
+    for atom in parse_metta(text):
+        space.add_atom(atom)
+
+    count = space.atom_count()
+    if str(count) != header.get("atoms"):
+        print(f"⚠️  Knowledge snapshot loaded {count} atoms, expected {header.get('atoms')}")
+        return None
+    return metta
+
+
+def load_or_build(build: Callable[[MeTTa], None], sources: Iterable[Path],
+                  path: Optional[Path] = None) -> MeTTa:
+    """
+    Load the knowledge snapshot, or build the graph and write the snapshot.
+
+    Args:
+        build: Function that populates a fresh MeTTa instance
+        sources: Files that define the knowledge, hashed to detect stale snapshots
+        path: Snapshot file, defaults to snapshot_path()
+
+    Returns:
+        Populated MeTTa instance
+    """
+    path = path if path is not None else snapshot_path()
+    if path is None:
+        metta = MeTTa()
+        build(metta)
+        return metta
+
+    start = time.perf_counter()
+    digest = content_hash(sources)
+    try:
+        metta = load_snapshot(path, digest)
+    except Exception as e:
+        print(f"⚠️  Could not load knowledge snapshot {path}: {e}")
+        metta = None
+
+    if metta is not None:
+        print(f"📸 Loaded knowledge snapshot ({metta.space().atom_count()} atoms) in "
+              f"{(time.perf_counter() - start) * 1000:.0f}ms")
+        return metta
+
+    metta = MeTTa()
+    build(metta)
+    try:
+        count = save_snapshot(metta, path, digest)
+        print(f"📸 Wrote knowledge snapshot {path} ({count} atoms)")
+    except OSError as e:
+        # Read-only deployments still start, they just build every time
+        print(f"⚠️  Could not write knowledge snapshot {path}: {e}")
+    return metta
+
+
+def _parse_header(line: str) -> dict:
+    if not line.startswith("; knowledge-snapshot"):
+        return {}
+    return dict(field.split("=", 1) for field in line.split()[2:] if "=" in field)
+
+
+if __name__ == "__main__":
+    # Build the snapshot from source, replacing any existing one
+    from metta.knowledge import initialize_defi_knowledge, knowledge_sources
+
+    target = snapshot_path() or DEFAULT_SNAPSHOT_PATH
+    metta = MeTTa()
+    initialize_defi_knowledge(metta)
+    count = save_snapshot(metta, target, content_hash(knowledge_sources()))
+    print(f"✅ Wrote {count} atoms to {target}")
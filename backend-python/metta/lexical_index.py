@@ -0,0 +1,199 @@
+"""
+Lexical Similarity Search over Knowledge Facts
+
+Facts such as (consideration gas_costs "...") could only be found by exact
+symbol match, e.g. query_consideration("gas_costs"), so a free-text
+question like "how much will gas cost me?" found nothing. LexicalIndex
+turns every fact into a character n-gram TF-IDF vector and ranks facts by
+cosine similarity to the question:
+
+    index = LexicalIndex(rag_facts)
+    index.search("how much will gas cost me?", k=3)
+    # [FactMatch(relation='consideration', args=('gas_costs', '...'), score=0.41), ...]
+
+Character n-grams (of each word padded with spaces, like "gas" ->
+" ga", "gas", "as ") match across inflections and typos ("swaping",
+"liquidations") without a stemmer or vocabulary.
+
+The vectors are rows of a sparse matrix held as NumPy arrays in
+compressed-column form: for each n-gram, the facts it occurs in and their
+weights. A query gathers the columns of its own n-grams and sums them with
+np.bincount, which computes the cosine similarity to every fact in one
+vectorized pass; np.argpartition picks the top k. Querying tens of
+thousands of facts takes a few milliseconds.
+
+The index is immutable; DeFiWorkflowRAG builds a new one when the
+knowledge generation changes.
+"""
+
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from metta.strategy_index import STOPWORDS
+
+
+NGRAM = 3
+
+# Question words carry no topic; they would match every fact that contains "how"
+QUESTION_WORDS = frozenset("about am does how should tell what when where which who why will".split())
+
+Fact = Tuple[str, Tuple[Any, ...]]
+
+
+@dataclass(frozen=True)
+class FactMatch:
+    """A fact and its cosine similarity to a query."""
+    relation: str
+    args: Tuple[Any, ...]
+    score: float
+
+    @property
+    def subject(self) -> str:
+        """The first argument, readable: "gas_costs" -> "gas costs"."""
+        return str(self.args[0]).replace("_", " ") if self.args else self.relation
+
+    @property
+    def text(self) -> str:
+        """The remaining arguments, joined."""
+        return ", ".join(str(arg) for arg in self.args[1:])
+
+
+def ngrams(text: str) -> Counter:
+    """
+    Count the character n-grams of the words of a text.
+
+    Args:
+        text: Question or fact text
+
+    Returns:
+        N-gram -> count
+    """
+    counts: Counter = Counter()
+    for word in _words(text):
+        padded = f" {word} "
+        counts.update(padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1))
+    return counts
+
+
+def fact_text(relation: str, args: Sequence[Any]) -> str:
+    """The searchable text of a fact: its relation and arguments."""
+    return " ".join([relation, *(str(arg) for arg in args)])
+
+
+class LexicalIndex:
+    """Character n-gram TF-IDF vectors of facts, searched by cosine similarity."""
+
+    def __init__(self, facts: Iterable[Fact]):
+        """
+        Vectorize the facts.
+
+        Args:
+            facts: (relation, arguments) pairs, e.g. from SpaceIndex.facts()
+        """
+        self.facts: List[Fact] = list(facts)
+        self.vocabulary: Dict[str, int] = {}
+        self.relations: Dict[str, int] = {}
+        self._relation_ids = np.fromiter(
+            (self.relations.setdefault(relation, len(self.relations)) for relation, _ in self.facts),
+            dtype=np.int32, count=len(self.facts),
+        )
+
+        rows, columns, counts = [], [], []
+        for row, (relation, args) in enumerate(self.facts):
+            for gram, count in ngrams(fact_text(relation, args)).items():
+                rows.append(row)
+                columns.append(self.vocabulary.setdefault(gram, len(self.vocabulary)))
+                counts.append(count)
+
+        rows = np.asarray(rows, dtype=np.int32)
+        columns = np.asarray(columns, dtype=np.int32)
+        weights = 1.0 + np.log(np.asarray(counts, dtype=np.float32))
+
+        # Smoothed idf, as if one more fact contained every n-gram
+        document_frequency = np.bincount(columns, minlength=len(self.vocabulary))
+        self.idf = (np.log((1 + len(self.facts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        weights *= self.idf[columns]
+
+        # L2-normalize each fact's vector, so a dot product is a cosine
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=len(self.facts)))
+        weights /= norms[rows].astype(np.float32)
+
+        # Compressed columns: the facts and weights of n-gram c are
+        # self._rows[self._starts[c]:self._starts[c + 1]]
+        order = np.argsort(columns, kind="stable")
+        self._rows = rows[order]
+        self._weights = weights[order]
+        self._starts = np.concatenate(([0], np.cumsum(document_frequency))).astype(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.facts)
+
+    def search(self, query: str, k: int = 5, relations: Optional[Iterable[str]] = None,
+               min_score: float = 0.0) -> List[FactMatch]:
+        """
+        Rank facts by cosine similarity to a query.
+
+        Args:
+            query: Free-text question
+            k: Number of facts to return
+            relations: Only return facts of these relations, e.g. {"consideration", "solution"}
+            min_score: Drop facts scoring at or below this similarity
+
+        Returns:
+            Up to k matches, most similar first
+        """
+        scores = self.scores(query)
+        if scores is None:
+            return []
+        if relations is not None:
+            wanted = [self.relations[relation] for relation in relations if relation in self.relations]
+            scores[~np.isin(self._relation_ids, wanted)] = 0.0
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            FactMatch(*self.facts[i], score=round(float(scores[i]), 4))
+            for i in top if scores[i] > min_score
+        ]
+
+    def scores(self, query: str) -> Optional[np.ndarray]:
+        """
+        Cosine similarity of the query to every fact.
+
+        Args:
+            query: Free-text question
+
+        Returns:
+            One score per fact, in self.facts order, or None if no n-gram
+            of the query occurs in any fact
+        """
+        grams = [(self.vocabulary[gram], count) for gram, count in ngrams(query).items() if gram in self.vocabulary]
+        if not grams or not self.facts:
+            return None
+
+        columns = np.fromiter((column for column, _ in grams), dtype=np.int64, count=len(grams))
+        query_weights = (1.0 + np.log([count for _, count in grams])) * self.idf[columns]
+        query_weights /= math.sqrt(float(np.dot(query_weights, query_weights)))
+
+        starts, ends = self._starts[columns], self._starts[columns + 1]
+        positions = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+        repeats = ends - starts
+        return np.bincount(
+            self._rows[positions],
+            weights=self._weights[positions] * np.repeat(query_weights, repeats),
+            minlength=len(self.facts),
+        )
+
+
+def _words(text: str) -> List[str]:
+    words = []
+    for raw in text.lower().replace("_", " ").replace("-", " ").split():
+        word = "".join(char for char in raw if char.isalnum())
+        if word and word not in STOPWORDS and word not in QUESTION_WORDS:
+            words.append(word)
+    return words
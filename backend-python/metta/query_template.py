@@ -0,0 +1,148 @@
+"""
+Parameterized MeTTa Query Templates
+
+RAG queries used to be built by interpolating user input into MeTTa text,
+f'!(match &self (capability {node_type} $desc) $desc)', which the runner
+tokenized, parsed and interpreted again on every call. Input containing
+spaces or parentheses changed the shape of the query.
+
+A QueryTemplate parses its pattern once. Arguments are bound by replacing
+the pattern's variables with atoms: a string becomes a single symbol, so
+"swap) (x" is looked up as that symbol rather than parsed. The bound
+pattern is run with space.subst(), which matches it against the space
+directly, without the text parser or the interpreter:
+
+    CAPABILITY = QueryTemplate("(capability $node_type $desc)", "$desc")
+    CAPABILITY.run(space, node_type="swap")   # ["Swaps tokens"]
+
+Variables that are not bound stay variables, so one template serves both
+filtered and unfiltered lookups.
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, List
+
+from hyperon import AtomKind, E, S, ValueAtom
+
+from metta.knowledge_loader import parse_metta
+from metta.records import decode_atom
+
+
+Builder = Callable[[Dict[str, Any]], Any]
+
+
+class QueryTemplate:
+    """A match pattern parsed once, run with its variables bound to atoms."""
+
+    def __init__(self, pattern: str, result: str):
+        """
+        Parse the pattern and result templates.
+
+        Args:
+            pattern: Pattern to match, e.g. "(operation $keyword $node_type $desc)".
+                String literals are grounded values, as in metta/knowledge.py.
+            result: What to return per match, e.g. "$node_type" or "($keyword $desc)"
+        """
+        self.pattern = _parse_one(pattern)
+        self.result = _parse_one(result)
+        self.variables = frozenset(_variables(self.pattern))
+        self._build_pattern = _compile(self.pattern)
+        self._build_result = _compile(self.result)
+
+    def bind(self, **arguments: Any):
+        """
+        Substitute arguments for the pattern's variables.
+
+        Args:
+            **arguments: Variable name (without "$") -> value. Strings become
+                symbols, other values grounded atoms; atoms are used as given.
+                None leaves the variable unbound.
+
+        Returns:
+            The bound pattern atom
+
+        Raises:
+            TypeError: If an argument names a variable the pattern does not have
+        """
+        return self._build_pattern(self._bindings(arguments))
+
+    def run(self, space, **arguments: Any) -> List[Any]:
+        """
+        Match the bound pattern against a space.
+
+        Args:
+            space: MeTTa space (metta.space())
+            **arguments: Values for the pattern's variables, as for bind()
+
+        Returns:
+            The result template for each match, decoded with decode_atom
+        """
+        bindings = self._bindings(arguments)
+        matches = space.subst(self._build_pattern(bindings), self._build_result(bindings))
+        return [decode_atom(atom) for atom in matches]
+
+    def _bindings(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        unknown = set(arguments) - self.variables
+        if unknown:
+            raise TypeError(f"query template has no variable(s) {', '.join(sorted(unknown))}")
+        return {name: _to_atom(value) for name, value in arguments.items() if value is not None}
+
+    def __repr__(self) -> str:
+        return f"QueryTemplate({self.pattern} -> {self.result})"
+
+
+@lru_cache(maxsize=None)
+def relation_template(head: str, arity: int) -> QueryTemplate:
+    """
+    Template returning every argument of the facts (head $a0 ... $aN).
+
+    Args:
+        head: Relation head, e.g. "token-address"
+        arity: Number of arguments after the head
+
+    Returns:
+        Template with variables a0..a{arity-1}, shared between callers
+    """
+    variables = " ".join(f"$a{i}" for i in range(arity))
+    return QueryTemplate(f"({head} {variables})", f"({variables})")
+
+
+def _parse_one(text: str):
+    atoms = list(parse_metta(text))
+    if len(atoms) != 1:
+        raise ValueError(f"expected one MeTTa expression, got {len(atoms)}: {text!r}")
+    return atoms[0]
+
+
+def _variables(atom):
+    kind = atom.get_metatype()
+    if kind == AtomKind.VARIABLE:
+        yield atom.get_name()
+    elif kind == AtomKind.EXPR:
+        for child in atom.get_children():
+            yield from _variables(child)
+
+
+def _compile(atom) -> Builder:
+    """
+    Turn a pattern into a function that rebuilds it with variables substituted.
+
+    Subexpressions without variables are reused as they are, so binding
+    only rebuilds the path from the root to each variable.
+    """
+    kind = atom.get_metatype()
+    if kind == AtomKind.VARIABLE:
+        name = atom.get_name()
+        return lambda bindings: bindings.get(name, atom)
+    if kind == AtomKind.EXPR and any(True for _ in _variables(atom)):
+        parts = [_compile(child) for child in atom.get_children()]
+        return lambda bindings: E(*[part(bindings) for part in parts])
+    return lambda bindings: atom
+
+
+def _to_atom(value: Any):
+    if hasattr(value, 'get_metatype'):
+        return value
+    if isinstance(value, str):
+        return S(value)
+    return ValueAtom(value)
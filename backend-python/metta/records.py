@@ -0,0 +1,265 @@
+"""
+Typed Records for Knowledge Graph Facts
+
+MeTTa atoms are decoded structurally, in one pass: grounded atoms
+(ValueAtom) give their Python payload, symbols give their name and
+expressions give a tuple of their decoded children. Nothing is
+round-tripped through str() and stripped of quotes or brackets.
+
+Each relation of the knowledge graph (see metta/knowledge.py) has a
+record type built from the decoded arguments of one fact:
+
+    (token-address base USDC "USD Coin" "0x..." "6")
+        -> TokenAddress(chain="base", symbol="USDC", name="USD Coin",
+                        address="0x...", decimals=6)
+
+Records are what DeFiWorkflowRAG.records() returns; its dict-returning
+methods are built from them.
+"""
+
+from dataclasses import dataclass
+from typing import Any, ClassVar, Dict, Optional, Sequence, Tuple
+
+
+def decode_atom(atom) -> Any:
+    """
+    Decode an atom into plain Python data.
+
+    Args:
+        atom: MeTTa atom
+
+    Returns:
+        The payload of a grounded atom, the name of a symbol or variable,
+        or a tuple of decoded children for an expression
+    """
+    if hasattr(atom, 'get_object'):
+        try:
+            return atom.get_object().value
+        except TypeError:
+            # Grounded operations such as == parsed from MeTTa text have no
+            # Python payload; they read as their name
+            return str(atom)
+    if hasattr(atom, 'get_children'):
+        return tuple(decode_atom(child) for child in atom.get_children())
+    return str(atom)
+
+
+def decode_fact(atom) -> Optional[Tuple[str, Tuple[Any, ...]]]:
+    """
+    Split a fact such as (token-address base USDC ...) into its relation and arguments.
+
+    Args:
+        atom: MeTTa atom
+
+    Returns:
+        (relation, decoded arguments), or None if the atom is not an
+        expression headed by a symbol
+    """
+    children = atom.get_children() if hasattr(atom, 'get_children') else []
+    if not children or hasattr(children[0], 'get_children') or hasattr(children[0], 'get_object'):
+        return None
+    return str(children[0]), tuple(decode_atom(child) for child in children[1:])
+
+
+def parse_sequence(sequence: str) -> Tuple["Step", ...]:
+    """
+    Parse a strategy node sequence such as "trigger -> swap(ETH->USDC) -> aave(supply)".
+
+    Arrows inside parentheses belong to the step's argument, not the sequence.
+
+    Args:
+        sequence: Node sequence from a strategy fact
+
+    Returns:
+        The steps in order
+    """
+    parts, depth, current = [], 0, ""
+    index = 0
+    while index < len(sequence):
+        char = sequence[index]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0 and sequence.startswith("->", index):
+            parts.append(current)
+            current = ""
+            index += 2
+            continue
+        current += char
+        index += 1
+    parts.append(current)
+
+    steps = []
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        node_type, _, argument = part.partition("(")
+        steps.append(Step(node_type=node_type.strip().lower(), argument=argument.rstrip(")").strip()))
+    return tuple(steps)
+
+
+def _flag(value: Any) -> bool:
+    return str(value).lower() == "true"
+
+
+@dataclass(frozen=True)
+class Step:
+    """One node of a strategy sequence, e.g. aave(supply)."""
+    node_type: str
+    argument: str = ""
+
+
+@dataclass(frozen=True)
+class Record:
+    """A fact of one relation. RELATION and ARITY say which facts it is built from."""
+    RELATION: ClassVar[str] = ""
+    ARITY: ClassVar[int] = 0
+
+    @classmethod
+    def from_args(cls, args: Sequence[Any]) -> "Record":
+        """Build the record from the decoded arguments of a fact."""
+        return cls(*args)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The record in the dict shape DeFiWorkflowRAG has always returned."""
+        return dict(self.__dict__)
+
+
+@dataclass(frozen=True)
+class NodeType(Record):
+    """(node-type <type> <label> <description> <color>)"""
+    RELATION: ClassVar[str] = "node-type"
+    ARITY: ClassVar[int] = 4
+
+    type: str
+    label: str
+    description: str
+    color: str
+
+
+@dataclass(frozen=True)
+class NodeConfigField(Record):
+    """(node-config <type> <field> <default-value>)"""
+    RELATION: ClassVar[str] = "node-config"
+    ARITY: ClassVar[int] = 3
+
+    node_type: str
+    field: str
+    default: str
+
+
+@dataclass(frozen=True)
+class AaveAction(Record):
+    """(aave-action <action> <description>)"""
+    RELATION: ClassVar[str] = "aave-action"
+    ARITY: ClassVar[int] = 2
+
+    action: str
+    description: str
+
+
+@dataclass(frozen=True)
+class Strategy(Record):
+    """(strategy <name> <description> <node-sequence>)"""
+    RELATION: ClassVar[str] = "strategy"
+    ARITY: ClassVar[int] = 3
+
+    name: str
+    description: str
+    sequence: str
+
+    @property
+    def steps(self) -> Tuple[Step, ...]:
+        """The node sequence, parsed."""
+        return parse_sequence(self.sequence)
+
+
+@dataclass(frozen=True)
+class Operation(Record):
+    """(operation <keyword> <node-type> <description>)"""
+    RELATION: ClassVar[str] = "operation"
+    ARITY: ClassVar[int] = 3
+
+    keyword: str
+    node_type: str
+    description: str
+
+
+@dataclass(frozen=True)
+class Protocol(Record):
+    """(protocol <name> <type> <supported-chains>)"""
+    RELATION: ClassVar[str] = "protocol"
+    ARITY: ClassVar[int] = 3
+
+    name: str
+    type: str
+    chains: Tuple[str, ...]
+
+    @classmethod
+    def from_args(cls, args: Sequence[Any]) -> "Protocol":
+        name, protocol_type, chains = args
+        return cls(name, protocol_type, tuple(chain.strip() for chain in str(chains).split(",") if chain.strip()))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "type": self.type, "chains": ",".join(self.chains)}
+
+
+@dataclass(frozen=True)
+class Token(Record):
+    """(token <symbol> <name> <decimals>)"""
+    RELATION: ClassVar[str] = "token"
+    ARITY: ClassVar[int] = 3
+
+    symbol: str
+    name: str
+    decimals: str
+
+
+@dataclass(frozen=True)
+class TokenAddress(Record):
+    """(token-address <chain> <symbol> <name> <address> <decimals>)"""
+    RELATION: ClassVar[str] = "token-address"
+    ARITY: ClassVar[int] = 5
+
+    chain: str
+    symbol: str
+    name: str
+    address: str
+    decimals: int
+
+    @classmethod
+    def from_args(cls, args: Sequence[Any]) -> "TokenAddress":
+        chain, symbol, name, address, decimals = args
+        return cls(chain, symbol, name, address, int(decimals))
+
+    def as_dict(self) -> Dict[str, Any]:
+        # Decimals stay a string in the dicts, as the prompts and API expect
+        return {
+            "chain": self.chain,
+            "symbol": self.symbol,
+            "name": self.name,
+            "address": self.address,
+            "decimals": str(self.decimals),
+        }
+
+
+@dataclass(frozen=True)
+class Chain(Record):
+    """(chain <name> <chain-id> <testnet?> <aave-support?>)"""
+    RELATION: ClassVar[str] = "chain"
+    ARITY: ClassVar[int] = 4
+
+    name: str
+    chain_id: str
+    testnet: bool
+    aave: bool
+
+    @classmethod
+    def from_args(cls, args: Sequence[Any]) -> "Chain":
+        name, chain_id, testnet, aave = args
+        return cls(name, str(chain_id), _flag(testnet), _flag(aave))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "chainId": self.chain_id, "testnet": self.testnet, "aave": self.aave}
@@ -0,0 +1,158 @@
+"""
+Indexed Mirror of the MeTTa Space
+
+DeFiWorkflowRAG answers most lookups by building a "!(match &self ...)"
+query, running it through the MeTTa interpreter and decoding the printed
+atoms, even for lookups like the config of one node type or the address
+of one token. SpaceIndex keeps the facts of the space as plain Python
+tuples, indexed by relation head and by (head, first argument), so those
+lookups become dictionary reads.
+
+A fact (token-address base USDC "USD Coin" "0x..." "6") is decoded with
+decode_fact and stored as the row ("base", "USDC", "USD Coin", "0x...", "6")
+under the key ("token-address", 5), and under ("token-address", 5, "base").
+
+The mirror stays in sync with the space as long as atoms are added through
+add_atom(). Atoms added to or removed from the space directly are picked
+up by comparing the space's atom count, which reads check at most once
+per check_interval seconds since counting costs about as much as a small
+MeTTa query (replacing an atom in place is not detected).
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from metta.records import decode_fact
+
+
+Row = Tuple[Any, ...]
+
+
+class SpaceIndex:
+    """Read model of a MeTTa space, indexed by relation head and first argument."""
+
+    def __init__(self, space, check_interval: Optional[float] = 1.0):
+        """
+        Build the index from the current contents of the space.
+
+        Args:
+            space: MeTTa space to mirror (metta.space())
+            check_interval: Seconds between checks for atoms changed outside
+                the index (0 checks on every read, None never checks)
+        """
+        self.space = space
+        self.check_interval = check_interval
+        self._checked_at = time.monotonic()
+        self.rebuilds = 0
+        self.build_ms = 0.0
+        self._by_head: Dict[Tuple[str, int], List[Row]] = {}
+        self._by_first: Dict[Tuple[str, int, Any], List[Row]] = {}
+        self._atom_count = 0
+        self._lock = threading.Lock()
+        with self._lock:
+            self._rebuild()
+
+    def rows(self, head: str, arity: int, first: Any = None) -> List[Row]:
+        """
+        Get the facts (head arg1 ... argN) with N == arity.
+
+        Args:
+            head: Relation head, e.g. "node-config"
+            arity: Number of arguments after the head
+            first: Only facts whose first argument is this value
+
+        Returns:
+            Argument tuples, in the order the facts were added. The list is
+            shared and must not be modified.
+        """
+        if self.check_interval is not None and time.monotonic() - self._checked_at >= self.check_interval:
+            self.refresh()
+        if first is None:
+            return self._by_head.get((head, arity), [])
+        return self._by_first.get((head, arity, first), [])
+
+    def facts(self) -> List[Tuple[str, Row]]:
+        """
+        Get every fact in the index.
+
+        Returns:
+            (relation head, arguments) pairs, grouped by relation
+        """
+        if self.check_interval is not None and time.monotonic() - self._checked_at >= self.check_interval:
+            self.refresh()
+        return [(head, row) for (head, _), rows in list(self._by_head.items()) for row in rows]
+
+    def add_atom(self, atom) -> None:
+        """
+        Add an atom to the space and to the index.
+
+        Args:
+            atom: Atom to add
+        """
+        with self._lock:
+            self._sync()
+            self.space.add_atom(atom)
+            self._atom_count += 1
+            self._index(atom)
+
+    def refresh(self) -> bool:
+        """
+        Rebuild the index if the space was changed without going through it.
+
+        Returns:
+            True if the index was rebuilt
+        """
+        self._checked_at = time.monotonic()
+        if self.space.atom_count() == self._atom_count:
+            return False
+        with self._lock:
+            return self._sync()
+
+    def info(self) -> Dict[str, Any]:
+        """Summary of the index for health checks and logs."""
+        return {
+            "atoms": self._atom_count,
+            "relations": len(self._by_head),
+            "rebuilds": self.rebuilds,
+            "buildMs": self.build_ms,
+        }
+
+    def _sync(self) -> bool:
+        # Caller holds the lock
+        if self.space.atom_count() == self._atom_count:
+            return False
+        print("🔄 MeTTa space changed outside the index, rebuilding...")
+        self._rebuild()
+        return True
+
+    def _rebuild(self) -> None:
+        start = time.perf_counter()
+        by_head, by_first = {}, {}
+        atoms = self.space.get_atoms()
+        for atom in atoms:
+            fact = decode_fact(atom)
+            if fact is not None:
+                head, row = fact
+                by_head.setdefault((head, len(row)), []).append(row)
+                if row:
+                    by_first.setdefault((head, len(row), row[0]), []).append(row)
+
+        # Swap in whole dictionaries so readers never see a partial index
+        self._by_head, self._by_first = by_head, by_first
+        self._atom_count = len(atoms)
+        self.rebuilds += 1
+        self.build_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    def _index(self, atom) -> None:
+        fact = decode_fact(atom)
+        if fact is None:
+            return
+        head, row = fact
+        # Copy on write, so lock-free readers keep a consistent list
+        key = (head, len(row))
+        self._by_head[key] = [*self._by_head.get(key, []), row]
+        if row:
+            key = (head, len(row), row[0])
+            self._by_first[key] = [*self._by_first.get(key, []), row]
+
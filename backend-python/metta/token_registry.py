@@ -0,0 +1,215 @@
+"""
+Token Registry
+
+Token data used to live in several tables that drifted apart: the
+token-address facts of the knowledge graph, server.TOKEN_ADDRESSES, the
+default table of the prompt builder and example addresses in the ASI:One
+system prompt (which gave a different Sepolia USDC address from the
+graph). TokenRegistry is built from the token-address facts alone and
+indexes them three ways, each a dictionary lookup:
+
+    tokens = TokenRegistry(rag.records(TokenAddress))
+    tokens.get("base", "usdc")                       # TokenAddress(..., decimals=6)
+    tokens.by_address("base", "0x8335...2913")       # the same record, any letter case
+    tokens.chains_for("USDC")                        # every chain USDC is on
+
+Symbols match case-insensitively and addresses are compared lowercased.
+Decimals are ints on the records.
+
+The registry also checks the token fields of generated workflows
+(validate_node / validate_workflow): a symbol where an address belongs, or
+the address of the same token on a different chain, is replaced with the
+right address for the node's chain.
+"""
+
+import csv
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from metta.records import TokenAddress
+
+
+DATA_FILE = Path(__file__).parent / "data" / "token-address.csv"
+
+# Node config fields holding a token address, by node type
+TOKEN_FIELDS = {
+    "swap": ("fromToken", "toToken"),
+    "transfer": ("token",),
+}
+
+
+class TokenRegistry:
+    """Token addresses indexed by (chain, symbol), (chain, address) and symbol."""
+
+    def __init__(self, tokens: Iterable[TokenAddress]):
+        """
+        Index the tokens.
+
+        Args:
+            tokens: TokenAddress records; the first record of a (chain, symbol) wins
+        """
+        self._by_chain_symbol: Dict[Tuple[str, str], TokenAddress] = {}
+        self._by_chain_address: Dict[Tuple[str, str], TokenAddress] = {}
+        self._by_address: Dict[str, Tuple[TokenAddress, ...]] = {}
+        self._by_symbol: Dict[str, Tuple[TokenAddress, ...]] = {}
+        self._by_chain: Dict[str, Tuple[TokenAddress, ...]] = {}
+
+        for token in tokens:
+            key = (token.chain, token.symbol.upper())
+            if key in self._by_chain_symbol:
+                continue
+            self._by_chain_symbol[key] = token
+            address = token.address.lower()
+            self._by_chain_address.setdefault((token.chain, address), token)
+            self._by_address[address] = self._by_address.get(address, ()) + (token,)
+            self._by_symbol[token.symbol.upper()] = self._by_symbol.get(token.symbol.upper(), ()) + (token,)
+            self._by_chain[token.chain] = self._by_chain.get(token.chain, ()) + (token,)
+
+        self.symbols = frozenset(token.symbol for token in self._by_chain_symbol.values())
+
+    @classmethod
+    def from_table(cls, table: Mapping[str, Iterable[Mapping[str, Any]]]) -> "TokenRegistry":
+        """
+        Build a registry from {chain: [{"symbol", "address", "decimals", ...}]},
+        the shape of rag.get_all_token_addresses().
+        """
+        return cls(
+            TokenAddress(chain, token["symbol"], token.get("name", token["symbol"]),
+                         token["address"], int(token["decimals"]))
+            for chain, tokens in table.items()
+            for token in tokens
+        )
+
+    def __len__(self) -> int:
+        return len(self._by_chain_symbol)
+
+    @property
+    def chains(self) -> Tuple[str, ...]:
+        """Chains with at least one token, in the order they were added."""
+        return tuple(self._by_chain)
+
+    def get(self, chain: str, symbol: str) -> Optional[TokenAddress]:
+        """The token with this symbol on a chain, or None."""
+        return self._by_chain_symbol.get((chain, symbol.upper()))
+
+    def address(self, chain: str, symbol: str) -> str:
+        """The address of a token on a chain, or "" if unknown."""
+        token = self.get(chain, symbol)
+        return token.address if token else ""
+
+    def by_address(self, chain: str, address: str) -> Optional[TokenAddress]:
+        """The token at an address on a chain, or None."""
+        return self._by_chain_address.get((chain, address.lower()))
+
+    def chains_for(self, symbol: str) -> Tuple[TokenAddress, ...]:
+        """The token with this symbol on every chain that has it."""
+        return self._by_symbol.get(symbol.upper(), ())
+
+    def tokens_on(self, chain: str) -> Tuple[TokenAddress, ...]:
+        """Every token on a chain."""
+        return self._by_chain.get(chain, ())
+
+    def as_table(self) -> Dict[str, List[Dict[str, str]]]:
+        """The registry as {chain: [token dict]}, the shape of rag.get_all_token_addresses()."""
+        return {
+            chain: [{key: value for key, value in token.as_dict().items() if key != "chain"} for token in tokens]
+            for chain, tokens in self._by_chain.items()
+        }
+
+    def resolve(self, chain: str, value: str) -> Tuple[Optional[TokenAddress], str]:
+        """
+        Find the token a workflow field refers to on a chain.
+
+        Args:
+            chain: The node's chain
+            value: An address or a symbol
+
+        Returns:
+            (token, problem): the token or None, and a description of what
+            was wrong with the value ("" if it was the token's address)
+        """
+        if not value.startswith("0x"):
+            token = self.get(chain, value)
+            return token, f"symbol {value} instead of its address" if token else f"unknown token {value}"
+
+        token = self.by_address(chain, value)
+        if token is not None:
+            return token, ""
+        for other in self._by_address.get(value.lower(), ()):
+            token = self.get(chain, other.symbol)
+            if token is not None:
+                return token, f"{other.symbol} address from {other.chain}"
+        return None, f"address {value} is not a known token on {chain}"
+
+    def validate_node(self, node: Dict[str, Any], repair: bool = True) -> List[str]:
+        """
+        Check the token fields of a workflow node against its chain.
+
+        Args:
+            node: Workflow node ({"type", "data": {"config": {...}}})
+            repair: Replace symbols and other chains' addresses with the
+                right address, and fix fromTokenDecimals, in place
+
+        Returns:
+            One message per problem found
+        """
+        fields = TOKEN_FIELDS.get(node.get("type"))
+        config = (node.get("data") or {}).get("config") or {}
+        chain = config.get("chain")
+        if not fields or chain not in self._by_chain:
+            return []
+
+        problems = []
+        for field in fields:
+            value = config.get(field)
+            if not isinstance(value, str) or not value:
+                continue
+            token, problem = self.resolve(chain, value)
+            if problem:
+                fixed = repair and token is not None
+                problems.append(
+                    f"{node.get('id', node['type'])}.{field}: {problem}"
+                    + (f", replaced with {token.symbol} on {chain}" if fixed else "")
+                )
+                if fixed:
+                    config[field] = token.address
+
+            if field == "fromToken" and token is not None and "fromTokenDecimals" in config:
+                if str(config["fromTokenDecimals"]) != str(token.decimals):
+                    problems.append(f"{node.get('id', node['type'])}.fromTokenDecimals: "
+                                    f"{config['fromTokenDecimals']} instead of {token.decimals}")
+                    if repair:
+                        config["fromTokenDecimals"] = str(token.decimals)
+        return problems
+
+    def validate_workflow(self, workflow: Dict[str, Any], repair: bool = True) -> List[str]:
+        """
+        Check the token fields of every node of a workflow.
+
+        Args:
+            workflow: Workflow JSON with a "nodes" list
+            repair: Fix what can be fixed in place, as in validate_node
+
+        Returns:
+            One message per problem found
+        """
+        problems = []
+        for node in workflow.get("nodes") or []:
+            if isinstance(node, dict):
+                problems.extend(self.validate_node(node, repair))
+        return problems
+
+
+@lru_cache(maxsize=1)
+def default_registry() -> TokenRegistry:
+    """
+    Registry read straight from metta/data/token-address.csv.
+
+    For callers without a knowledge graph context; it holds the same
+    tokens the graph is loaded with.
+    """
+    with open(DATA_FILE, newline="", encoding="utf-8") as f:
+        return TokenRegistry(TokenAddress.from_args(
+            (row["chain"], row["symbol"], row["name"], row["address"], row["decimals"])
+        ) for row in csv.DictReader(f))
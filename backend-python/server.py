@@ -9,7 +9,9 @@ Version: 2.0 (Port 8000, Token Addresses in MeTTa, Enhanced Prompts)
 
 import os
 import json
-from flask import Flask, request, jsonify
+import queue
+import time
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 import sys
@@ -19,13 +21,22 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
 
 # Import our modules
-from metta.knowledge import get_metta_instance
-import metta.knowledge as knowledge_module
-print(f"[SERVER] Knowledge module file: {knowledge_module.__file__}")
-from metta.defi_rag import DeFiWorkflowRAG
+from metta.context_snapshot import ContextSnapshot, ContextSnapshotStore
+from metta.knowledge_reload import KnowledgeReloader
+from metta.knowledge_service import RemoteRAG
+from metta.records import AaveAction, Strategy, parse_sequence
 from utils.asi_one_client import ASIOneClient
 from utils.mcp_client import MCPClientSync
+from utils.pipeline import StagedPipeline
+from utils.stream_parser import WorkflowNodeStreamParser
+from utils.prompt_builder import PromptBuild
+from utils.response_cache import ResponseCache, DEFAULT_TOKENS
+from utils.fast_path import FastPathPlan, explain_fast_path, plan_fast_path
+from utils.intent_classifier import IntentClassifier, IntentPrediction
+from utils.metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, current_endpoint, render_metrics
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import asyncio
+import contextvars
 
 # Load environment variables
 load_dotenv()
@@ -35,52 +46,89 @@ SERVER_VERSION = "2.0"
 print(f"🚀 DeFi Workflow Python Backend v{SERVER_VERSION} starting...")
 print(f"📍 Expected port: {os.getenv('FLASK_PORT', '8000')}")
 
-# Token address mappings for Base network
-TOKEN_ADDRESSES = {
-    "base": {
-        "ETH": "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE",  # Native ETH
-        "WETH": "0x4200000000000000000000000000000000000006",
-        "USDC": "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913",
-        "USDT": "0xfde4C96c8593536E31F229EA8f37b2ADa2699bb2",
-        "DAI": "0x50c5725949A6F0c72E6C4a641F24049A917DB0Cb",
-        "WBTC": "0x",  # Add if needed
-    },
-    "ethereum": {
-        "ETH": "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE",
-        "WETH": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",
-        "USDC": "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48",
-        "USDT": "0xdAC17F958D2ee523a2206206994597C13D831ec7",
-        "DAI": "0x6B175474E89094C44Da98b954EedeAC495271d0F",
-    },
-    "sepolia": {
-        "ETH": "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE",
-        "WETH": "0x7b79995e5f793A07Bc00c21412e50Ecae098E7f9",
-        "USDC": "0x94a9D9AC8a22534E3FaCa9F4e7F2E2cf85d5E4C8",
-    },
-    "basesepolia": {
-        "ETH": "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE",
-        "WETH": "0x4200000000000000000000000000000000000006",
-        "USDC": "0x036CbD53842c5426634e7929541eC2318f3dCF7e",
-    }
-}
-
 def get_token_address(symbol: str, chain: str = "base") -> str:
-    """Convert token symbol to address for the given chain"""
-    chain_tokens = TOKEN_ADDRESSES.get(chain, TOKEN_ADDRESSES["base"])
-    return chain_tokens.get(symbol.upper(), "")
+    """Convert token symbol to address for the given chain (base if the chain has no tokens)"""
+    tokens = build_rag_context().tokens
+    return tokens.address(chain if chain in tokens.chains else "base", symbol)
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for Node.js backend
 
 # Initialize MeTTa and ASI:One
-print("🧠 Initializing MeTTa Knowledge Graph...")
-metta = get_metta_instance()
-rag = DeFiWorkflowRAG(metta)
+KNOWLEDGE_SERVICE = os.getenv('KNOWLEDGE_SERVICE')
+if KNOWLEDGE_SERVICE:
+    # Query the knowledge graph hosted by python -m metta.knowledge_service
+    # instead of loading a copy into every worker
+    print(f"🛰️  Using shared knowledge service at {KNOWLEDGE_SERVICE}...")
+    metta = None
+    rag = RemoteRAG(KNOWLEDGE_SERVICE, cache_size=int(os.getenv('RAG_CACHE_SIZE', 1024)))
+else:
+    print("🧠 Initializing MeTTa Knowledge Graph...")
+    import metta.knowledge as knowledge_module
+    print(f"[SERVER] Knowledge module file: {knowledge_module.__file__}")
+    from metta.defi_rag import DeFiWorkflowRAG
+    metta = knowledge_module.get_metta_instance()
+    rag = DeFiWorkflowRAG(metta, cache_size=int(os.getenv('RAG_CACHE_SIZE', 1024)))
+
+# Generation context is built once here and only rebuilt when knowledge changes
+context_store = ContextSnapshotStore(rag)
+context_store.get()
+
+# Hot reload of the knowledge files; with a knowledge service, the service reloads
+reloader = None
+if not KNOWLEDGE_SERVICE:
+    reloader = KnowledgeReloader(
+        rag,
+        knowledge_module.get_metta_instance,
+        knowledge_module.knowledge_files,
+        knowledge_module.KNOWLEDGE_CODE,
+        warm=[
+            context_store.get,
+            lambda: sync_response_cache(),
+            lambda: local_intent_classifier(),
+            lambda: rag.search_strategies(""),
+            lambda: rag.search_knowledge(""),
+        ],
+    )
+    if float(os.getenv('KNOWLEDGE_RELOAD_INTERVAL', 0)) > 0:
+        reloader.watch(float(os.getenv('KNOWLEDGE_RELOAD_INTERVAL')))
 
 print("🤖 Initializing ASI:One Client...")
 asi_client = ASIOneClient()
 
+# Cache of generation responses keyed on the normalized query
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', 512)),
+    ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL', 3600)),
+    known_tokens=DEFAULT_TOKENS | context_store.get().tokens.symbols
+)
+response_cache.set_knowledge(context_store.get().version, response_cache.known_tokens)
+
+# Shared thread pool for running independent request stages in parallel
+stage_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('PIPELINE_WORKERS', 16)),
+    thread_name_prefix='stage'
+)
+
+# Separate bounded pool for batch generation - caps how many batch queries
+# call ASI:One at once across all batch requests
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 4))
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 100))
+
+# Rule-based workflows at or above this confidence skip ASI:One entirely
+FAST_PATH_THRESHOLD = float(os.getenv('FAST_PATH_THRESHOLD', 0.8))
+
+# Local intent classifications below this confidence are escalated to ASI:One
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv('INTENT_CONFIDENCE_THRESHOLD', 0.75))
+
+# (context snapshot, IntentClassifier) for the current knowledge generation
+_intent_classifier = None
+batch_executor = ThreadPoolExecutor(
+    max_workers=BATCH_CONCURRENCY,
+    thread_name_prefix='batch'
+)
+
 # Don't initialize MCP client on startup - it will be lazy-loaded when needed
 print("🔌 MCP Client ready (will connect on first use)...")
 mcp_client = None  # Lazy initialization
@@ -101,14 +149,44 @@ print(f"""
 """)
 
 
+@app.before_request
+def start_request_timer():
+    """Label everything this request does with its route, and start timing it."""
+    g.request_started = time.perf_counter()
+    current_endpoint.set(request.url_rule.rule if request.url_rule else "unmatched")
+
+
+@app.after_request
+def record_request_duration(response):
+    """Record how long the request took to produce its response headers."""
+    started = g.get('request_started')
+    if started is not None:
+        outcome = "ok" if response.status_code < 400 else "error"
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, "request", outcome)
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Latency histograms in the Prometheus text format"""
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy",
         "service": "DeFi Workflow Python Backend",
-        "metta_loaded": metta is not None,
-        "asi_one_connected": asi_client is not None
+        "metta_loaded": metta is not None or bool(KNOWLEDGE_SERVICE),
+        "asi_one_connected": asi_client is not None,
+        "response_cache": response_cache.stats(),
+        "rag_context": context_store.get().info(),
+        "rag_index": rag.index.info() if rag.index is not None else None,
+        "rag_cache": rag.query_cache.stats() if rag.query_cache is not None else None,
+        "knowledge_service": rag.info() if KNOWLEDGE_SERVICE else None,
+        "knowledge_reload": reloader.info() if reloader is not None else None,
+        "asi_one_pool": asi_client.pool_info()
     })
 
 
@@ -128,8 +206,19 @@ def generate_workflow():
         "success": true,
         "workflow": { nodes: [...], edges: [...] },
         "explanation": "This workflow...",
-        "strategy": "maximize_yield_usdc"
+        "strategy": "maximize_yield_usdc",
+        "timings": {
+            "stages": {"intent": {"startMs": 0.1, "durationMs": 812.4}, ...},
+            "totalMs": 4210.7
+        }
     }
+    
+    ASI:One generation starts straight away against the prebuilt RAG
+    context snapshot, in parallel with intent classification.
+    
+    Near-identical queries are served from the response cache, with the
+    cached workflow re-parameterized for the request's amounts and addresses
+    ("cached": true in the response).
     """
     
     try:
@@ -143,108 +232,592 @@ def generate_workflow():
                 "error": "Query is required"
             }), 400
         
-        print(f"📝 [v{SERVER_VERSION}] Workflow generation request: '{user_query}'")
-        
-        # Step 1: Classify intent
-        print("🔍 Classifying intent...")
-        intent, keyword = asi_client.get_intent_and_keyword(user_query)
-        print(f"   Intent: {intent}, Keyword: {keyword}")
+        payload, status = run_generation(user_query, user_address)
+        return jsonify(payload), status
         
-        # Step 2: Try ASI:One first for AI-powered generation
-        print("🤖 Generating with ASI:One AI...")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
         
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+def run_generation(user_query: str, user_address: str = "", context: ContextSnapshot = None):
+    """
+    Generate a workflow for one query.
+    
+    Args:
+        user_query: Natural language workflow description
+        user_address: Address of the requesting user
+        context: RAG context snapshot to generate against. Defaults to the
+                 current snapshot.
+        
+    Returns:
+        Tuple of (response payload, HTTP status)
+    """
+    print(f"📝 [v{SERVER_VERSION}] Workflow generation request: '{user_query}'")
+    
+    pipeline = StagedPipeline(stage_executor)
+    
+    # Serve near-identical queries from the response cache
+    cached = pipeline.run('cache', cached_response, user_query, user_address)
+    if cached:
+        print("⚡ Serving workflow from response cache")
+        return {
+            "success": True,
+            **cached,
+            "cached": True,
+            "path": "cache",
+            "timings": pipeline.report()
+        }, 200
+    
+    # Simple requests the rule-based generator fully understood skip all
+    # three ASI:One calls
+    plan = pipeline.run('plan', plan_query, user_query)
+    if plan.confidence >= FAST_PATH_THRESHOLD:
+        print(f"🏎️  Serving rule-based workflow (confidence {plan.confidence:.2f})")
+        return {
+            "success": True,
+            **fast_path_result(plan),
+            "cached": False,
+            "path": "fast",
+            "fastPath": plan.info(),
+            "timings": pipeline.report()
+        }, 200
+    print(f"🧭 Fast path confidence {plan.confidence:.2f} below {FAST_PATH_THRESHOLD}: {'; '.join(plan.reasons)}")
+    
+    # Step 1: Classify intent in the background
+    print("🔍 Classifying intent...")
+    pipeline.submit('intent', classify_query_intent, user_query)
+    
+    # Step 2: Start ASI:One generation speculatively - the generation prompt
+    # does not depend on intent, and the RAG context is a prebuilt snapshot.
+    # Batch requests pass in one snapshot shared by all their queries.
+    print("🤖 Generating with ASI:One AI...")
+    if context is None:
+        context = build_rag_context()
+    prompt = pipeline.run('prompt', asi_client.build_workflow_prompt, user_query, context)
+    pipeline.submit('generate', generate_with_asi, context, user_query, prompt)
+    
+    classification = pipeline.result('intent')
+    intent, keyword = classification.intent, classification.keyword
+    print(f"   Intent: {intent}, Keyword: {keyword} ({classification.source}, {classification.confidence:.2f})")
+    
+    try:
+        workflow_json = pipeline.result('generate')
+    except Exception as e:
+        print(f"[ASI] Skipping ASI:One generation: {e}")
         workflow_json = None
-        strategy_used = ""
-        
+    
+    # Step 3: Fallback to rule-based generation and knowledge graph lookups
+    strategy_used = ""
+    used_fallback = not workflow_json
+    if used_fallback:
+        workflow_json, strategy_used = pipeline.run(
+            'fallback', generate_workflow_fallback, user_query, intent, keyword
+        )
+    
+    if not workflow_json:
+        return {
+            "error": "Failed to generate workflow",
+            "message": "Could not generate a valid workflow from your request. Please try rephrasing.",
+            "timings": pipeline.report()
+        }, 400
+    
+    # Step 4: Generate explanation
+    print("💬 Generating explanation...")
+    explanation = pipeline.run('explain', asi_client.explain_workflow, workflow_json)
+    
+    result = {
+        "workflow": workflow_json,
+        "explanation": explanation,
+        "strategy": strategy_used,
+        "intent": intent,
+        "keyword": keyword
+    }
+    
+    # Only cache ASI:One results - rule-based fallbacks are cheap and
+    # caching them would mask a transient ASI:One outage
+    if not used_fallback:
+        response_cache.put(user_query, user_address, result)
+    
+    timings = pipeline.report()
+    print(f"✅ Workflow generated successfully in {timings['totalMs']:.0f}ms!")
+    
+    return {
+        "success": True,
+        **result,
+        "cached": False,
+        "path": "fallback" if used_fallback else "asi",
+        "fastPath": plan.info(),
+        "classification": classification.info(),
+        "prompt": prompt.info(),
+        "timings": timings
+    }, 200
+
+
+@app.route('/api/workflow/generate/batch', methods=['POST'])
+def generate_workflow_batch():
+    """
+    Generate workflows for many queries in one request.
+    
+    Request body:
+    {
+        "queries": ["Swap 0.1 ETH to USDC", "Supply USDC to Aave", ...],
+        "userAddress": "0x..."  // optional, shared by all queries
+    }
+    
+    Response (application/x-ndjson) - one line per unique query, in the
+    order they complete, followed by a summary line:
+    {"indices": [0, 2], "query": "...", "status": 200, "success": true, "workflow": {...}, ...}
+    {"indices": [1], "query": "...", "status": 200, "success": true, "workflow": {...}, ...}
+    {"done": true, "total": 3, "unique": 2, "timings": {...}}
+    
+    Identical queries are generated once and reported with all of their
+    positions in "indices". The RAG context is built once and shared by
+    every query, and at most BATCH_CONCURRENCY queries are generated at a
+    time across all batch requests.
+    """
+    
+    data = request.get_json() or {}
+    queries = data.get('queries', [])
+    user_address = data.get('userAddress', '')
+    
+    if not isinstance(queries, list) or not queries or \
+            not all(isinstance(query, str) and query.strip() for query in queries):
+        return jsonify({
+            "success": False,
+            "error": "queries must be a non-empty list of strings"
+        }), 400
+    
+    if len(queries) > MAX_BATCH_SIZE:
+        return jsonify({
+            "success": False,
+            "error": f"At most {MAX_BATCH_SIZE} queries per batch"
+        }), 400
+    
+    # Dedupe identical queries, remembering every position they appear at
+    positions = {}
+    for index, query in enumerate(queries):
+        positions.setdefault(query.strip(), []).append(index)
+    
+    print(f"📦 [v{SERVER_VERSION}] Batch workflow generation: {len(queries)} queries ({len(positions)} unique)")
+    
+    pipeline = StagedPipeline(stage_executor)
+    
+    def lines():
+        # One RAG context snapshot for the whole batch, pinned even if
+        # knowledge changes while the batch is running
         try:
-            # Build context from RAG including token addresses
-            strategies = rag.query_all_strategies()
-            protocols = rag.query_protocols()
-            token_addresses = rag.get_all_token_addresses()
+            context = pipeline.run('context', build_rag_context)
+        except Exception as e:
+            print(f"[RAG] Error building batch context, building per query: {e}")
+            context = None
+        
+        # Each query runs in a copy of this request's context so its
+        # stages are labelled with the batch endpoint
+        futures = {
+            batch_executor.submit(contextvars.copy_context().run, run_batch_item, query, user_address, context): query
+            for query in positions
+        }
+        try:
+            with pipeline.stage('generate'):
+                for future in as_completed(futures):
+                    query = futures[future]
+                    payload, status = future.result()
+                    yield json.dumps({
+                        "indices": positions[query],
+                        "query": query,
+                        "status": status,
+                        **payload
+                    }) + "\n"
+        finally:
+            # Drop queries that have not started if the client went away
+            for future in futures:
+                future.cancel()
+        
+        print(f"✅ Batch of {len(positions)} workflows generated")
+        yield json.dumps({
+            "done": True,
+            "total": len(queries),
+            "unique": len(positions),
+            "timings": pipeline.report()
+        }) + "\n"
+    
+    return Response(
+        stream_with_context(lines()),
+        mimetype='application/x-ndjson',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+def run_batch_item(user_query: str, user_address: str, context: ContextSnapshot):
+    """Generate one query of a batch, turning errors into an error payload."""
+    try:
+        return run_generation(user_query, user_address, context)
+    except Exception as e:
+        print(f"❌ Batch query '{user_query}' failed: {e}")
+        return {
+            "success": False,
+            "error": str(e)
+        }, 500
+
+
+@app.route('/api/workflow/generate/stream', methods=['POST'])
+def generate_workflow_stream():
+    """
+    Stream workflow generation as Server-Sent Events.
+    
+    Takes the same request body as /api/workflow/generate and runs the same
+    stages, but emits results as soon as each one is available:
+    
+    - intent:      {"intent": "operation", "keyword": "swap_tokens"}
+    - context:     {"version": 0, "strategies": 12, "protocols": 3, "chains": [...]}
+    - node:        one workflow node, as soon as its JSON has been parsed
+    - workflow:    {"workflow": {...}, "strategy": "", "source": "asi" | "fallback" | "cache" | "fast"}
+    - explanation: {"token": "..."} for each explanation token
+    - done:        {"timings": {...}, "prompt": {"tokens": 2714, ...}}
+    - error:       {"error": "..."}
+    
+    Node events are provisional - if ASI:One fails part-way, the fallback
+    workflow is streamed again and the workflow event is authoritative.
+    """
+    
+    data = request.get_json() or {}
+    user_query = data.get('query', '')
+    user_address = data.get('userAddress', '')
+    
+    if not user_query:
+        return jsonify({
+            "success": False,
+            "error": "Query is required"
+        }), 400
+    
+    print(f"📝 [v{SERVER_VERSION}] Streaming workflow generation request: '{user_query}'")
+    
+    pipeline = StagedPipeline(stage_executor)
+    
+    cached = pipeline.run('cache', cached_response, user_query, user_address)
+    if cached:
+        print("⚡ Streaming workflow from response cache")
+        return Response(
+            stream_with_context(cached_events(cached, pipeline)),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+    
+    plan = pipeline.run('plan', plan_query, user_query)
+    if plan.confidence >= FAST_PATH_THRESHOLD:
+        print(f"🏎️  Streaming rule-based workflow (confidence {plan.confidence:.2f})")
+        return Response(
+            stream_with_context(cached_events(fast_path_result(plan), pipeline, source="fast")),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+    
+    node_queue = queue.Queue()
+    
+    context = build_rag_context()
+    pipeline.submit('intent', classify_query_intent, user_query)
+    prompt = pipeline.run('prompt', asi_client.build_workflow_prompt, user_query, context)
+    pipeline.submit('generate', stream_with_asi, context, user_query, node_queue, prompt)
+    pipeline.futures['generate'].add_done_callback(lambda _: node_queue.put(None))
+    
+    def events():
+        try:
+            classification = pipeline.result('intent')
+            intent, keyword = classification.intent, classification.keyword
+            yield sse_event('intent', {"intent": intent, "keyword": keyword})
+            
+            yield sse_event('context', {
+                "version": context.version,
+                "strategies": len(context['strategies']),
+                "protocols": len(context['protocols']),
+                "chains": list(context['token_addresses'].keys())
+            })
             
-            print(f"📋 [DEBUG] Strategies type: {type(strategies)}, content: {strategies}")
-            print(f"📋 [DEBUG] Protocols type: {type(protocols)}, content: {protocols}")
-            print(f"📋 [DEBUG] Token addresses type: {type(token_addresses)}, keys: {list(token_addresses.keys()) if isinstance(token_addresses, dict) else 'NOT A DICT'}")
+            # Forward nodes as the generation stage parses them
+            while True:
+                node = node_queue.get()
+                if node is None:
+                    break
+                yield sse_event('node', node)
             
-            context = {
-                'intent': intent,
-                'keyword': keyword,
-                'strategies': strategies,
-                'protocols': protocols,
-                'token_addresses': token_addresses
-            }
+            try:
+                workflow_json = pipeline.result('generate')
+            except Exception as e:
+                print(f"[ASI] Skipping ASI:One generation: {e}")
+                workflow_json = None
             
-            asi_result = asi_client.generate_workflow_from_intent(user_query, context)
+            source = "asi"
+            strategy_used = ""
+            if not workflow_json:
+                source = "fallback"
+                workflow_json, strategy_used = pipeline.run(
+                    'fallback', generate_workflow_fallback, user_query, intent, keyword
+                )
+                if not workflow_json:
+                    yield sse_event('error', {
+                        "error": "Failed to generate workflow",
+                        "message": "Could not generate a valid workflow from your request. Please try rephrasing."
+                    })
+                    return
+                for node in workflow_json.get('nodes', []):
+                    yield sse_event('node', node)
             
-            if asi_result and asi_result.get('nodes'):
-                workflow_json = asi_result
-                print(f"✅ Generated workflow with {len(workflow_json.get('nodes', []))} nodes from ASI:One")
-        except Exception as e:
-            import traceback
-            print(f"[ASI] Error generating with ASI:One: {e}")
-            print(f"[ASI] Traceback: {traceback.format_exc()}")
-            workflow_json = None
-        
-        # Step 3: Fallback to rule-based generation
-        if not workflow_json:
-            print("📚 Falling back to rule-based generation...")
-            workflow_json = generate_workflow_from_query(user_query, intent, keyword)
+            yield sse_event('workflow', {
+                "workflow": workflow_json,
+                "strategy": strategy_used,
+                "source": source
+            })
             
-            if workflow_json and workflow_json.get('nodes'):
-                print(f"✅ Generated workflow with {len(workflow_json.get('nodes', []))} nodes from rules")
-            else:
-                workflow_json = None  # Reset if empty
-        
-        # Step 4: Try knowledge graph strategies if still no workflow
-        if not workflow_json and intent == "strategy":
-            print("📚 Querying knowledge graph for strategy...")
-            strategy_result = rag.find_strategy_for_intent(user_query)
-            print(f"   Strategy result: {strategy_result}")
+            explanation = ""
+            with pipeline.stage('explain'):
+                try:
+                    for token in asi_client.explain_workflow_stream(workflow_json):
+                        explanation += token
+                        yield sse_event('explanation', {"token": token})
+                except Exception as e:
+                    print(f"Error streaming explanation: {e}")
+                if not explanation:
+                    explanation = asi_client.explain_workflow(workflow_json)
+                    yield sse_event('explanation', {"token": explanation})
             
-            if strategy_result:
-                strategy_used = keyword
-                workflow_json = generate_workflow_from_strategy(strategy_result, user_query)
-        
-        # Try operation lookup if still no workflow
-        if not workflow_json and intent == "operation":
-            print("📚 Querying knowledge graph for operation...")
-            operation_result = rag.query_operation(keyword)
-            print(f"   Operation result: {operation_result}")
+            if source == "asi":
+                response_cache.put(user_query, user_address, {
+                    "workflow": workflow_json,
+                    "explanation": explanation,
+                    "strategy": strategy_used,
+                    "intent": intent,
+                    "keyword": keyword
+                })
             
-            if operation_result:
-                workflow_json = generate_workflow_from_operation(operation_result, user_query)
-        
-        # Step 6: Generate explanation
-        print("💬 Generating explanation...")
-        
-        if not workflow_json:
-            return jsonify({
-                "error": "Failed to generate workflow",
-                "message": "Could not generate a valid workflow from your request. Please try rephrasing."
-            }), 400
-        
-        explanation = asi_client.explain_workflow(workflow_json)
-        
-        print("✅ Workflow generated successfully!")
-        
-        return jsonify({
-            "success": True,
-            "workflow": workflow_json,
-            "explanation": explanation,
-            "strategy": strategy_used,
-            "intent": intent,
-            "keyword": keyword
-        })
+            yield sse_event('done', {"timings": pipeline.report(), "prompt": prompt.info()})
+            
+        except Exception as e:
+            print(f"❌ Streaming error: {e}")
+            yield sse_event('error', {"error": str(e)})
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+def cached_events(cached: dict, pipeline: StagedPipeline, source: str = "cache"):
+    """Replay a cached or fast-path response as the same event sequence as a live generation."""
+    yield sse_event('intent', {"intent": cached.get('intent'), "keyword": cached.get('keyword')})
+    for node in cached['workflow'].get('nodes', []):
+        yield sse_event('node', node)
+    yield sse_event('workflow', {
+        "workflow": cached['workflow'],
+        "strategy": cached.get('strategy', ""),
+        "source": source
+    })
+    yield sse_event('explanation', {"token": cached.get('explanation', "")})
+    yield sse_event('done', {"timings": pipeline.report()})
+
+
+def sse_event(event: str, data) -> str:
+    """Format a Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def build_rag_context() -> ContextSnapshot:
+    """
+    Get the generation context (strategies, protocols, token addresses).
+    
+    Returns the shared immutable snapshot for the current knowledge
+    generation - it is only rebuilt after knowledge has been added.
+    """
+    return context_store.get()
+
+
+def sync_response_cache() -> None:
+    """
+    Drop cached responses generated from older knowledge.
+    
+    Called after a reload and before every cache lookup, so knowledge
+    added with add_knowledge or reloaded by a knowledge service is
+    picked up too.
+    """
+    context = build_rag_context()
+    if response_cache.set_knowledge(context.version, DEFAULT_TOKENS | context.tokens.symbols):
+        print(f"🧹 Cleared response cache for knowledge v{context.version}")
+
+
+def cached_response(user_query: str, user_address: str = ""):
+    """Look a query up in the response cache, if it was cached from the current knowledge."""
+    sync_response_cache()
+    return response_cache.get(user_query, user_address)
+
+
+def check_token_fields(context: ContextSnapshot, workflow_json: dict) -> dict:
+    """
+    Check a generated workflow's token addresses against the token registry.
+    
+    Symbols and addresses from the wrong chain are replaced with the right
+    address in place; every problem found is logged.
+    """
+    for problem in context.tokens.validate_workflow(workflow_json):
+        print(f"🪙 Token field: {problem}")
+    return workflow_json
+
+
+def has_actions(workflow_json) -> bool:
+    """
+    Whether a generated workflow has a node besides its trigger.
+    
+    The ASI:One client returns a trigger-only workflow when a call fails;
+    that must not be served or cached as an ASI:One result.
+    """
+    nodes = (workflow_json or {}).get('nodes') or []
+    return any(isinstance(node, dict) and node.get('type') != 'trigger' for node in nodes)
+
+
+def generate_with_asi(context: ContextSnapshot, user_query: str, prompt: PromptBuild = None):
+    """Generate a workflow with ASI:One. Returns None if nothing usable came back."""
+    try:
+        asi_result = asi_client.generate_workflow_from_intent(user_query, context, prompt)
         
+        if has_actions(asi_result):
+            check_token_fields(context, asi_result)
+            print(f"✅ Generated workflow with {len(asi_result.get('nodes', []))} nodes from ASI:One")
+            return asi_result
     except Exception as e:
-        print(f"❌ Error: {e}")
         import traceback
-        traceback.print_exc()
-        
-        return jsonify({
-            "success": False,
-            "error": str(e)
-        }), 500
+        print(f"[ASI] Error generating with ASI:One: {e}")
+        print(f"[ASI] Traceback: {traceback.format_exc()}")
+    
+    return None
+
+
+def stream_with_asi(context: ContextSnapshot, user_query: str, node_queue: queue.Queue,
+                    prompt: PromptBuild = None):
+    """
+    Generate a workflow with ASI:One in streaming mode.
+    
+    Each node is pushed onto node_queue as soon as it has been parsed.
+    Returns the complete workflow, or None if nothing usable came back.
+    """
+    parser = WorkflowNodeStreamParser()
+    try:
+        for chunk in asi_client.generate_workflow_stream(user_query, context, prompt):
+            for node in parser.feed(chunk):
+                for problem in context.tokens.validate_node(node):
+                    print(f"🪙 Token field: {problem}")
+                node_queue.put(node)
+    except Exception as e:
+        print(f"[ASI] Error streaming from ASI:One: {e}")
+    
+    workflow_json = parser.result()
+    if has_actions(workflow_json):
+        print(f"✅ Streamed workflow with {len(workflow_json['nodes'])} nodes from ASI:One")
+        return workflow_json
+    
+    return None
+
+
+def local_intent_classifier() -> IntentClassifier:
+    """Get the intent classifier built from the current context snapshot."""
+    global _intent_classifier
+    context = build_rag_context()
+    cached = _intent_classifier
+    if cached is None or cached[0] is not context:
+        start = time.perf_counter()
+        cached = (context, IntentClassifier.from_context(context))
+        _intent_classifier = cached
+        print(f"🧭 Built intent classifier for context v{context.version} in {(time.perf_counter() - start) * 1000:.0f}ms")
+    return cached[1]
+
+
+def classify_query_intent(user_query: str) -> IntentPrediction:
+    """
+    Classify a query's intent locally, escalating to ASI:One when unsure.
+    
+    Returns:
+        IntentPrediction whose source is "local" or "asi"
+    """
+    prediction = local_intent_classifier().classify(user_query)
+    if prediction.confidence >= INTENT_CONFIDENCE_THRESHOLD:
+        return prediction
+    
+    print(f"🔍 Local intent confidence {prediction.confidence:.2f}, asking ASI:One...")
+    prediction.intent, prediction.keyword = asi_client.get_intent_and_keyword(user_query)
+    prediction.source = "asi"
+    return prediction
+
+
+def plan_query(user_query: str) -> FastPathPlan:
+    """Run the rule-based generator and score how well it understood the query."""
+    workflow_json = generate_workflow_from_query(user_query, "", "")
+    return plan_fast_path(user_query, workflow_json, response_cache.known_tokens)
+
+
+def fast_path_result(plan: FastPathPlan) -> dict:
+    """Build the response fields for a fast-path workflow."""
+    return {
+        "workflow": plan.workflow,
+        "explanation": explain_fast_path(plan),
+        "strategy": "",
+        "intent": plan.intent,
+        "keyword": plan.keyword
+    }
+
+
+def generate_workflow_fallback(user_query: str, intent: str, keyword: str):
+    """
+    Generate a workflow without ASI:One.
+    
+    Tries rule-based generation first, then knowledge graph strategies
+    and operations depending on the classified intent.
+    
+    Returns:
+        Tuple of (workflow_json or None, strategy_used)
+    """
+    print("📚 Falling back to rule-based generation...")
+    workflow_json = generate_workflow_from_query(user_query, intent, keyword)
+    
+    if workflow_json and workflow_json.get('nodes'):
+        print(f"✅ Generated workflow with {len(workflow_json.get('nodes', []))} nodes from rules")
+        return workflow_json, ""
+    
+    # Try knowledge graph strategies if still no workflow
+    if intent == "strategy":
+        print("📚 Querying knowledge graph for strategy...")
+        strategy_result = rag.find_strategy_for_intent(user_query)
+        print(f"   Strategy result: {strategy_result}")
+        
+        if strategy_result:
+            return generate_workflow_from_strategy(strategy_result, user_query), keyword
+    
+    # Try operation lookup if still no workflow
+    if intent == "operation":
+        print("📚 Querying knowledge graph for operation...")
+        operation_result = rag.query_operation(keyword)
+        print(f"   Operation result: {operation_result}")
+        
+        if operation_result:
+            return generate_workflow_from_operation(operation_result, user_query), ""
+    
+    return None, ""
 
 
 @app.route('/api/knowledge/query', methods=['POST'])
@@ -270,26 +843,12 @@ def query_knowledge():
                 "error": "Both type and query are required"
             }), 400
         
-        result = None
-        
-        if query_type == "capability":
-            result = rag.query_capability(query)
-        elif query_type == "strategy" or query_type == "strategies":
-            # Support both singular and plural
-            if query:
-                result = rag.query_strategy(query)
-            else:
-                result = rag.query_all_strategies()
-        elif query_type == "protocol" or query_type == "protocols":
-            result = rag.query_protocols(query if query else None)
-        elif query_type == "solution":
-            result = rag.query_solution(query)
-        elif query_type == "consideration":
-            result = rag.query_consideration(query)
-        else:
+        try:
+            result = run_knowledge_query(query_type, query)
+        except ValueError as e:
             return jsonify({
                 "success": False,
-                "error": f"Unknown query type: {query_type}. Valid types: capability, strategy/strategies, protocol/protocols, solution, consideration"
+                "error": str(e)
             }), 400
         
         return jsonify({
@@ -304,6 +863,67 @@ def query_knowledge():
         }), 500
 
 
+@app.route('/api/knowledge/reload', methods=['POST'])
+def reload_knowledge():
+    """
+    Reload the knowledge files and swap the new graph in.
+    
+    Requests keep being served from the current graph while the new one
+    is built. Knowledge added with rag.add_knowledge() is not kept.
+    
+    Request body (optional):
+    {
+        "force": false  // reload even if the files have not changed
+    }
+    """
+    
+    if reloader is None:
+        return jsonify({
+            "success": False,
+            "error": "Knowledge is served by the knowledge service; it reloads its own files"
+        }), 409
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        report = reloader.reload(force=bool(data.get('force', False)))
+        return jsonify({
+            "success": True,
+            **report
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+def run_knowledge_query(query_type: str, query: str):
+    """
+    Dispatch a knowledge graph query by type.
+    
+    Raises:
+        ValueError: If the query type is unknown
+    """
+    if query_type == "capability":
+        return rag.query_capability(query)
+    elif query_type == "strategy" or query_type == "strategies":
+        # Support both singular and plural
+        if query:
+            return rag.query_strategy(query)
+        return rag.query_all_strategies()
+    elif query_type == "protocol" or query_type == "protocols":
+        return rag.query_protocols(query if query else None)
+    elif query_type == "solution":
+        return rag.query_solution(query)
+    elif query_type == "consideration":
+        return rag.query_consideration(query)
+    
+    raise ValueError(
+        f"Unknown query type: {query_type}. Valid types: capability, strategy/strategies, protocol/protocols, solution, consideration"
+    )
+
+
 @app.route('/api/agents/search', methods=['POST'])
 def search_agents():
     """
@@ -317,29 +937,9 @@ def search_agents():
         search_query = data.get('query', '')
         semantic = data.get('semantic', False)
         
-        # TODO: Implement Agentverse search using API
-        # For now, return mock data
-        
-        mock_agents = [
-            {
-                "address": "agent1qf7aggz...",
-                "name": "Price Oracle Agent",
-                "description": "Provides real-time cryptocurrency price data",
-                "tags": ["price", "oracle", "data"],
-                "interactions": 1250
-            },
-            {
-                "address": "agent1xyz123...",
-                "name": "Risk Assessment Agent",
-                "description": "Analyzes DeFi protocol risks and provides safety scores",
-                "tags": ["risk", "analysis", "defi"],
-                "interactions": 890
-            }
-        ]
-        
         return jsonify({
             "success": True,
-            "agents": mock_agents
+            "agents": search_agentverse(search_query, semantic)
         })
         
     except Exception as e:
@@ -349,10 +949,33 @@ def search_agents():
         }), 500
 
 
+def search_agentverse(search_query: str, semantic: bool = False) -> list:
+    """Search Agentverse for agents matching a query."""
+    # TODO: Implement Agentverse search using API
+    # For now, return mock data
+    return [
+        {
+            "address": "agent1qf7aggz...",
+            "name": "Price Oracle Agent",
+            "description": "Provides real-time cryptocurrency price data",
+            "tags": ["price", "oracle", "data"],
+            "interactions": 1250
+        },
+        {
+            "address": "agent1xyz123...",
+            "name": "Risk Assessment Agent",
+            "description": "Analyzes DeFi protocol risks and provides safety scores",
+            "tags": ["risk", "analysis", "defi"],
+            "interactions": 890
+        }
+    ]
+
+
 @app.route('/api/asi/classify', methods=['POST'])
 def classify_intent():
     """
-    Classify user intent using ASI:One.
+    Classify user intent, locally or with ASI:One when the local
+    classifier is not confident.
     
     Request body:
     {
@@ -363,8 +986,10 @@ def classify_intent():
     {
         "success": true,
         "intent": "strategy",
+        "keyword": "swap_and_lend",
         "keywords": ["swap", "yield"],
-        "confidence": 0.95
+        "confidence": 0.95,
+        "source": "local"
     }
     """
     
@@ -378,12 +1003,11 @@ def classify_intent():
                 "error": "Text is required"
             }), 400
         
-        # Use ASI:One client for intent classification
-        result = asi_client.classify_intent(text)
+        prediction = classify_query_intent(text)
         
         return jsonify({
             "success": True,
-            **result
+            **prediction.info()
         })
         
     except Exception as e:
@@ -420,6 +1044,21 @@ def get_strategies():
         }), 500
 
 
+def detect_chain(query_lower: str) -> str:
+    """Chain named in a lowercased query, defaulting to the base sepolia testnet."""
+    # Check multi-word chains first
+    if "base sepolia" in query_lower or "basesepolia" in query_lower or "base-sepolia" in query_lower:
+        return "basesepolia"
+    if "sepolia" in query_lower and "base" not in query_lower:
+        # Only use plain sepolia if "base" is NOT mentioned
+        return "sepolia"
+    if "ethereum" in query_lower or ("eth" in query_lower and "mainnet" in query_lower):
+        return "ethereum"
+    if "base" in query_lower and "sepolia" not in query_lower:
+        return "base"
+    return "basesepolia"
+
+
 def generate_workflow_from_query(user_query: str, intent: str, keyword: str) -> dict:
     """
     Generate workflow from user query using simple pattern matching.
@@ -466,21 +1105,12 @@ def generate_workflow_from_query(user_query: str, intent: str, keyword: str) ->
         elif "usdt" in query_lower:
             token_out = "USDT"
         
-        # Extract chain if mentioned - CHECK FOR MULTI-WORD CHAINS FIRST
-        chain = "basesepolia"  # Default to base sepolia testnet
-        if "base sepolia" in query_lower or "basesepolia" in query_lower or "base-sepolia" in query_lower:
-            chain = "basesepolia"
-        elif "sepolia" in query_lower and "base" not in query_lower:
-            # Only use plain sepolia if "base" is NOT mentioned
-            chain = "sepolia"
-        elif "ethereum" in query_lower or ("eth" in query_lower and "mainnet" in query_lower):
-            chain = "ethereum"
-        elif "base" in query_lower and "sepolia" not in query_lower:
-            chain = "base"
+        chain = detect_chain(query_lower)
         
         # Get token addresses
         from_token_address = get_token_address(token_in, chain)
         to_token_address = get_token_address(token_out, chain)
+        from_token = build_rag_context().tokens.get(chain, token_in)
         
         swap_node = {
             "id": f"node-{node_counter}",
@@ -491,7 +1121,7 @@ def generate_workflow_from_query(user_query: str, intent: str, keyword: str) ->
                     "protocol": "uniswap",
                     "fromToken": from_token_address,
                     "toToken": to_token_address,
-                    "fromTokenDecimals": "18" if token_in == "ETH" else "6",
+                    "fromTokenDecimals": str(from_token.decimals if from_token else 18),
                     "amount": "",
                     "slippage": "0.5",
                     "chain": chain,
@@ -612,15 +1242,25 @@ def generate_workflow_from_query(user_query: str, intent: str, keyword: str) ->
         elif "usdt" in query_lower:
             token = "USDT"
         
+        # The executor needs the chain, and the token as an address
+        chain = detect_chain(query_lower)
+        
+        # Send what the swap before it received
+        if nodes and nodes[-1]["type"] == "swap":
+            token = nodes[-1]["data"]["config"].get("_outputSymbol", token)
+            chain = nodes[-1]["data"]["config"].get("chain", chain)
+        
         transfer_node = {
             "id": f"node-{node_counter}",
             "type": "transfer",
             "data": {
                 "label": f"Transfer {token}",
                 "config": {
-                    "token": token,
+                    "token": get_token_address(token, chain),
                     "recipient": "",
-                    "amount": ""
+                    "amount": "",
+                    "chain": chain,
+                    "_tokenSymbol": token
                 }
             },
             "position": {"x": x_pos, "y": y_pos}
@@ -658,19 +1298,9 @@ def get_nodes():
     """
     
     try:
-        node_types = ["trigger", "swap", "aave", "transfer", "condition", "ai"]
-        nodes = []
-        
-        for node_type in node_types:
-            capabilities = rag.query_capability(node_type)
-            nodes.append({
-                "type": node_type,
-                "capabilities": capabilities
-            })
-        
         return jsonify({
             "success": True,
-            "nodes": nodes
+            "nodes": list_node_capabilities()
         })
         
     except Exception as e:
@@ -680,30 +1310,45 @@ def get_nodes():
         }), 500
 
 
-def generate_workflow_from_strategy(strategy_result, user_query):
-    """Generate workflow JSON from strategy using knowledge graph"""
+def list_node_capabilities() -> list:
+    """Get the capabilities of every workflow node type in the knowledge graph."""
+    node_types = tuple(nt["type"] for nt in rag.get_all_node_types())
     
-    if not strategy_result or not strategy_result[0]:
-        return None
+    # Fallback to hardcoded types if knowledge graph is empty
+    if not node_types:
+        node_types = ("trigger", "swap", "aave", "transfer", "condition", "ai")
     
-    # Get the node sequence from strategy
-    node_sequence = str(strategy_result[0])
+    # One pass over the capability facts for all types
+    capabilities = rag.query_capabilities(node_types)
     
-    # Clean up the sequence - remove brackets, quotes, and extra whitespace
-    # Handle formats like: '["trigger -> swap"]', '"trigger -> swap"', or 'trigger -> swap'
-    import re
-    node_sequence = re.sub(r'[\[\]"\']', '', node_sequence).strip()
+    return [
+        {"type": node_type, "capabilities": capabilities[node_type]}
+        for node_type in node_types
+    ]
+
+
+def generate_workflow_from_strategy(strategy_result, user_query):
+    """
+    Generate workflow JSON from strategy using knowledge graph.
     
-    print(f"[Debug] Cleaned node sequence: '{node_sequence}'")
+    Args:
+        strategy_result: Strategy record, or a list whose first item is a
+            node sequence string (as returned by rag.query_strategy/query_operation)
+        user_query: User's query
+    """
     
-    # Parse node sequence (format: "trigger -> swap -> aave")
-    node_types = [n.strip() for n in node_sequence.split('->')]
+    if isinstance(strategy_result, Strategy):
+        steps = strategy_result.steps
+    elif strategy_result and strategy_result[0]:
+        steps = parse_sequence(strategy_result[0])
+    else:
+        return None
     
-    print(f"[Debug] Parsed node types: {node_types}")
+    print(f"[Debug] Parsed node sequence: {[step.node_type for step in steps]}")
     
     # Get all available node types from knowledge graph to validate
-    all_node_types = rag.get_all_node_types()
-    valid_types = {nt["type"] for nt in all_node_types}
+    node_info = {nt["type"]: nt for nt in rag.get_all_node_types()}
+    valid_types = set(node_info)
     
     # Fallback to hardcoded types if knowledge graph is empty
     if not valid_types:
@@ -711,6 +1356,12 @@ def generate_workflow_from_strategy(strategy_result, user_query):
     
     print(f"[Debug] Valid node types: {valid_types}")
     
+    # aave(borrow) etc. set the Aave node's action
+    aave_actions = {record.action for record in rag.records(AaveAction)}
+    
+    # Default configs of every node type in the sequence, in one pass
+    configs = rag.get_node_configs(tuple(dict.fromkeys(step.node_type for step in steps if step.node_type in valid_types)))
+    
     nodes = []
     edges = []
     
@@ -718,9 +1369,8 @@ def generate_workflow_from_strategy(strategy_result, user_query):
     y_pos = 100
     x_spacing = 250
     
-    for i, node_type in enumerate(node_types):
-        # Clean node type (remove any prefix/suffix from MeTTa)
-        clean_type = node_type.lower().strip()
+    for i, step in enumerate(steps):
+        clean_type = step.node_type
         
         # Validate node type exists
         if clean_type not in valid_types:
@@ -730,11 +1380,12 @@ def generate_workflow_from_strategy(strategy_result, user_query):
         node_id = f"node-{i+1}"
         
         # Get default config from knowledge graph
-        config = rag.get_node_config(clean_type)
+        config = dict(configs[clean_type])
+        if clean_type == "aave" and step.argument in aave_actions:
+            config["action"] = step.argument
         
         # Get node metadata
-        node_info = next((nt for nt in all_node_types if nt["type"] == clean_type), None)
-        label = node_info["label"] if node_info else clean_type.title()
+        label = node_info[clean_type]["label"] if clean_type in node_info else clean_type.title()
         
         node = {
             "id": node_id,
@@ -783,7 +1434,7 @@ def get_default_config(base_type, full_type=""):
     DEPRECATED: Use rag.get_node_config() instead.
     Kept for backwards compatibility.
     """
-    return rag.get_node_config(base_type)
+    return dict(rag.get_node_config(base_type))
 
 
 # ==================== Agent Query Endpoints ====================
@@ -791,6 +1442,9 @@ def get_default_config(base_type, full_type=""):
 # Global storage for agent responses (simple in-memory queue)
 agent_responses = {}
 
+# Blockscout agent, queried when no agent address is given
+DEFAULT_AGENT_ADDRESS = 'agent1qfwanzm7l94lcd57p9zsl25y4p6clssp8xjjrd0f8f6nc9r3rx8h6978x2r'
+
 @app.route('/api/agents/query', methods=['POST'])
 def query_agent():
     """
@@ -816,7 +1470,7 @@ def query_agent():
     try:
         data = request.get_json()
         query = data.get('query', '')
-        agent_address = data.get('agentAddress', 'agent1qfwanzm7l94lcd57p9zsl25y4p6clssp8xjjrd0f8f6nc9r3rx8h6978x2r')  # Blockscout agent default
+        agent_address = data.get('agentAddress', DEFAULT_AGENT_ADDRESS)
         
         if not query:
             return jsonify({
@@ -824,96 +1478,16 @@ def query_agent():
                 "error": "Query is required"
             }), 400
         
-        print(f"🤖 Agent query request: '{query}'")
-        print(f"   Target agent: {agent_address}")
-        
-        # Import uagents for direct messaging
-        from uagents import Agent, Context, Model
-        from uagents.query import query as uagent_query
-        import asyncio
-        import time
-        
-        # Define message model matching Blockscout agent's BlockchainQuery
-        class BlockchainQuery(Model):
-            query: str
-            chain_id: str = "8453"
-            address: str = ""
-        
-        class BlockchainResponse(Model):
-            success: bool
-            data: dict = {}
-            error: str = ""
-        
-        # Create the query message
-        message = BlockchainQuery(
-            query=query,
-            chain_id="8453",  # Base mainnet
-            address=""
-        )
-        
-        print(f"   Sending message to agent...")
-        start_time = time.time()
-        
-        # Use uagents query function to send message and wait for response
-        async def send_query():
-            try:
-                response = await uagent_query(
-                    destination=agent_address,
-                    message=message,
-                    timeout=30.0  # 30 second timeout
-                )
-                return response
-            except Exception as e:
-                print(f"   Query error: {e}")
-                return None
-        
         # Run the async query
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         try:
-            response = loop.run_until_complete(send_query())
+            payload, status = loop.run_until_complete(send_agent_query(query, agent_address))
         finally:
             loop.close()
         
-        response_time = time.time() - start_time
+        return jsonify(payload), status
         
-        if response:
-            print(f"✅ Agent response received in {response_time:.2f}s")
-            
-            # Parse response (it should be a BlockchainResponse model)
-            if hasattr(response, 'success') and response.success:
-                response_text = json.dumps(response.data) if response.data else "Query successful"
-                return jsonify({
-                    "success": True,
-                    "response": response_text,
-                    "agentAddress": agent_address,
-                    "responseTime": response_time
-                })
-            elif hasattr(response, 'error') and response.error:
-                return jsonify({
-                    "success": False,
-                    "response": response.error,
-                    "error": response.error,
-                    "agentAddress": agent_address
-                }), 500
-            else:
-                # Generic response - convert to string
-                response_text = str(response)
-                return jsonify({
-                    "success": True,
-                    "response": response_text,
-                    "agentAddress": agent_address,
-                    "responseTime": response_time
-                })
-        else:
-            print(f"⏱️  Agent query timed out after {response_time:.2f}s")
-            return jsonify({
-                "success": False,
-                "response": "Agent did not respond within timeout period",
-                "error": "timeout",
-                "agentAddress": agent_address
-            }), 408  # Request Timeout
-            
     except Exception as e:
         print(f"❌ Error: {e}")
         import traceback
@@ -925,6 +1499,97 @@ def query_agent():
         }), 500
 
 
+async def send_agent_query(query: str, agent_address: str):
+    """
+    Send a query to an agent via the uAgents protocol and wait for its reply.
+    
+    Args:
+        query: Natural language query
+        agent_address: Address of the target agent
+        
+    Returns:
+        Tuple of (response payload, HTTP status)
+    """
+    print(f"🤖 Agent query request: '{query}'")
+    print(f"   Target agent: {agent_address}")
+    
+    # Import uagents for direct messaging
+    from uagents import Model
+    from uagents.query import query as uagent_query
+    import time
+    
+    # Define message model matching Blockscout agent's BlockchainQuery
+    class BlockchainQuery(Model):
+        query: str
+        chain_id: str = "8453"
+        address: str = ""
+    
+    class BlockchainResponse(Model):
+        success: bool
+        data: dict = {}
+        error: str = ""
+    
+    # Create the query message
+    message = BlockchainQuery(
+        query=query,
+        chain_id="8453",  # Base mainnet
+        address=""
+    )
+    
+    print(f"   Sending message to agent...")
+    start_time = time.time()
+    
+    # Use uagents query function to send message and wait for response
+    try:
+        response = await uagent_query(
+            destination=agent_address,
+            message=message,
+            timeout=30.0  # 30 second timeout
+        )
+    except Exception as e:
+        print(f"   Query error: {e}")
+        response = None
+    
+    response_time = time.time() - start_time
+    
+    if response:
+        print(f"✅ Agent response received in {response_time:.2f}s")
+        
+        # Parse response (it should be a BlockchainResponse model)
+        if hasattr(response, 'success') and response.success:
+            response_text = json.dumps(response.data) if response.data else "Query successful"
+            return {
+                "success": True,
+                "response": response_text,
+                "agentAddress": agent_address,
+                "responseTime": response_time
+            }, 200
+        elif hasattr(response, 'error') and response.error:
+            return {
+                "success": False,
+                "response": response.error,
+                "error": response.error,
+                "agentAddress": agent_address
+            }, 500
+        else:
+            # Generic response - convert to string
+            response_text = str(response)
+            return {
+                "success": True,
+                "response": response_text,
+                "agentAddress": agent_address,
+                "responseTime": response_time
+            }, 200
+    
+    print(f"⏱️  Agent query timed out after {response_time:.2f}s")
+    return {
+        "success": False,
+        "response": "Agent did not respond within timeout period",
+        "error": "timeout",
+        "agentAddress": agent_address
+    }, 408  # Request Timeout
+
+
 # ==================== MCP Endpoints ====================
 
 @app.route('/api/mcp/tools', methods=['POST'])
@@ -0,0 +1,797 @@
+"""
+ASGI Server - Async serving mode for the Python backend
+
+Serves the same REST API as server.py, but as an ASGI app (Quart) so one
+worker can hold many slow ASI:One, MCP and agent calls open at once
+without a thread per request. Outbound HTTP goes through pooled async
+clients; MeTTa queries still run in worker threads.
+
+The knowledge graph, RAG, response cache and fallback generators are
+shared with server.py, which is imported for them.
+
+Usage:
+    uvicorn server_asgi:app --host 0.0.0.0 --port 8000
+"""
+
+import asyncio
+import json
+import os
+import time
+import traceback
+
+from quart import Quart, Response, g, jsonify, request
+from quart_cors import cors
+
+from server import (
+    SERVER_VERSION,
+    DEFAULT_AGENT_ADDRESS,
+    BATCH_CONCURRENCY,
+    MAX_BATCH_SIZE,
+    FAST_PATH_THRESHOLD,
+    INTENT_CONFIDENCE_THRESHOLD,
+    rag,
+    metta,
+    KNOWLEDGE_SERVICE,
+    reloader,
+    response_cache,
+    context_store,
+    build_rag_context,
+    cached_response,
+    check_token_fields,
+    has_actions,
+    generate_workflow_fallback,
+    plan_query,
+    local_intent_classifier,
+    fast_path_result,
+    cached_events,
+    sse_event,
+    run_knowledge_query,
+    search_agentverse,
+    list_node_capabilities,
+    send_agent_query,
+)
+from metta.context_snapshot import ContextSnapshot
+from utils.asi_one_client import AsyncASIOneClient
+from utils.mcp_client import MCPClient
+from utils.intent_classifier import IntentPrediction
+from utils.metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, current_endpoint, render_metrics
+from utils.pipeline import AsyncStagedPipeline
+from utils.prompt_builder import PromptBuild
+from utils.stream_parser import WorkflowNodeStreamParser
+
+# Initialize Quart app
+app = cors(Quart(__name__))  # Enable CORS for Node.js backend
+
+print("🤖 Initializing async ASI:One Client...")
+asi_client = AsyncASIOneClient()
+
+# Caps how many batch queries call ASI:One at once across all batch requests
+batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+# MCP client is connected on first use, as in server.py
+mcp_client = None
+mcp_lock = asyncio.Lock()
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
+
+async def get_mcp_client() -> MCPClient:
+    """Lazy-load and connect the MCP client on first use."""
+    global mcp_client
+    async with mcp_lock:
+        if mcp_client is None:
+            print("🔌 Creating MCP Client (lazy mode)...")
+            client = MCPClient()
+            await client.initialize()
+            mcp_client = client
+    return mcp_client
+
+
+@app.after_serving
+async def shutdown():
+    """Close pooled HTTP connections."""
+    await asi_client.aclose()
+    if mcp_client is not None:
+        await mcp_client.cleanup()
+
+
+@app.before_request
+async def start_request_timer():
+    """Label everything this request does with its route, and start timing it."""
+    g.request_started = time.perf_counter()
+    current_endpoint.set(request.url_rule.rule if request.url_rule else "unmatched")
+
+
+@app.after_request
+async def record_request_duration(response):
+    """Record how long the request took to produce its response headers."""
+    started = g.get('request_started')
+    if started is not None:
+        outcome = "ok" if response.status_code < 400 else "error"
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, "request", outcome)
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Latency histograms in the Prometheus text format"""
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
+
+
+@app.route('/health', methods=['GET'])
+async def health_check():
+    """Health check endpoint"""
+    return jsonify({
+        "status": "healthy",
+        "service": "DeFi Workflow Python Backend",
+        "mode": "asgi",
+        "metta_loaded": metta is not None or bool(KNOWLEDGE_SERVICE),
+        "asi_one_connected": asi_client is not None,
+        "response_cache": response_cache.stats(),
+        "rag_context": context_store.get().info(),
+        "rag_index": rag.index.info() if rag.index is not None else None,
+        "rag_cache": rag.query_cache.stats() if rag.query_cache is not None else None,
+        "knowledge_service": rag.info() if KNOWLEDGE_SERVICE else None,
+        "knowledge_reload": reloader.info() if reloader is not None else None,
+        "asi_one_pool": asi_client.pool_info()
+    })
+
+
+@app.route('/api/workflow/generate', methods=['POST'])
+async def generate_workflow():
+    """
+    Generate a workflow from natural language description.
+    
+    Same request and response as /api/workflow/generate in server.py.
+    """
+    
+    try:
+        data = await request.get_json()
+        user_query = data.get('query', '')
+        user_address = data.get('userAddress', '')
+        
+        if not user_query:
+            return jsonify({
+                "success": False,
+                "error": "Query is required"
+            }), 400
+        
+        payload, status = await run_generation(user_query, user_address)
+        return jsonify(payload), status
+    
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        traceback.print_exc()
+        
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+async def run_generation(user_query: str, user_address: str = "", context: ContextSnapshot = None):
+    """
+    Generate a workflow for one query.
+    
+    Args:
+        user_query: Natural language workflow description
+        user_address: Address of the requesting user
+        context: RAG context snapshot shared by a batch. Defaults to the
+                 current snapshot.
+        
+    Returns:
+        Tuple of (response payload, HTTP status)
+    """
+    print(f"📝 [v{SERVER_VERSION}] Workflow generation request: '{user_query}'")
+    
+    pipeline = AsyncStagedPipeline()
+    
+    # Serve near-identical queries from the response cache
+    cached = await pipeline.run('cache', cached_response, user_query, user_address)
+    if cached:
+        print("⚡ Serving workflow from response cache")
+        return {
+            "success": True,
+            **cached,
+            "cached": True,
+            "path": "cache",
+            "timings": pipeline.report()
+        }, 200
+    
+    # Simple requests the rule-based generator fully understood skip ASI:One
+    plan = await pipeline.run('plan', plan_query, user_query)
+    if plan.confidence >= FAST_PATH_THRESHOLD:
+        print(f"🏎️  Serving rule-based workflow (confidence {plan.confidence:.2f})")
+        return {
+            "success": True,
+            **fast_path_result(plan),
+            "cached": False,
+            "path": "fast",
+            "fastPath": plan.info(),
+            "timings": pipeline.report()
+        }, 200
+    print(f"🧭 Fast path confidence {plan.confidence:.2f} below {FAST_PATH_THRESHOLD}: {'; '.join(plan.reasons)}")
+    
+    # Step 1: Classify intent in the background
+    pipeline.submit('intent', classify_query_intent, user_query)
+    
+    # Step 2: Start ASI:One generation against the prebuilt context snapshot
+    if context is None:
+        context = await pipeline.run('context', build_rag_context)
+    with pipeline.stage('prompt'):
+        prompt = asi_client.build_workflow_prompt(user_query, context)
+    pipeline.submit('generate', generate_with_asi, context, user_query, prompt)
+    
+    classification = await pipeline.result('intent')
+    intent, keyword = classification.intent, classification.keyword
+    print(f"   Intent: {intent}, Keyword: {keyword} ({classification.source}, {classification.confidence:.2f})")
+    
+    try:
+        workflow_json = await pipeline.result('generate')
+    except Exception as e:
+        print(f"[ASI] Skipping ASI:One generation: {e}")
+        workflow_json = None
+    
+    # Step 3: Fallback to rule-based generation and knowledge graph lookups
+    strategy_used = ""
+    used_fallback = not workflow_json
+    if used_fallback:
+        workflow_json, strategy_used = await pipeline.run(
+            'fallback', generate_workflow_fallback, user_query, intent, keyword
+        )
+    
+    if not workflow_json:
+        return {
+            "error": "Failed to generate workflow",
+            "message": "Could not generate a valid workflow from your request. Please try rephrasing.",
+            "timings": pipeline.report()
+        }, 400
+    
+    # Step 4: Generate explanation
+    explanation = await pipeline.run('explain', asi_client.explain_workflow, workflow_json)
+    
+    result = {
+        "workflow": workflow_json,
+        "explanation": explanation,
+        "strategy": strategy_used,
+        "intent": intent,
+        "keyword": keyword
+    }
+    
+    if not used_fallback:
+        response_cache.put(user_query, user_address, result)
+    
+    timings = pipeline.report()
+    print(f"✅ Workflow generated successfully in {timings['totalMs']:.0f}ms!")
+    
+    return {
+        "success": True,
+        **result,
+        "cached": False,
+        "path": "fallback" if used_fallback else "asi",
+        "fastPath": plan.info(),
+        "classification": classification.info(),
+        "prompt": prompt.info(),
+        "timings": timings
+    }, 200
+
+
+@app.route('/api/workflow/generate/batch', methods=['POST'])
+async def generate_workflow_batch():
+    """
+    Generate workflows for many queries in one request.
+    
+    Same request body and NDJSON response as
+    /api/workflow/generate/batch in server.py.
+    """
+    
+    data = await request.get_json() or {}
+    queries = data.get('queries', [])
+    user_address = data.get('userAddress', '')
+    
+    if not isinstance(queries, list) or not queries or \
+            not all(isinstance(query, str) and query.strip() for query in queries):
+        return jsonify({
+            "success": False,
+            "error": "queries must be a non-empty list of strings"
+        }), 400
+    
+    if len(queries) > MAX_BATCH_SIZE:
+        return jsonify({
+            "success": False,
+            "error": f"At most {MAX_BATCH_SIZE} queries per batch"
+        }), 400
+    
+    # Dedupe identical queries, remembering every position they appear at
+    positions = {}
+    for index, query in enumerate(queries):
+        positions.setdefault(query.strip(), []).append(index)
+    
+    print(f"📦 [v{SERVER_VERSION}] Batch workflow generation: {len(queries)} queries ({len(positions)} unique)")
+    
+    pipeline = AsyncStagedPipeline()
+    
+    async def run_item(query: str, context: ContextSnapshot):
+        async with batch_semaphore:
+            try:
+                payload, status = await run_generation(query, user_address, context)
+            except Exception as e:
+                print(f"❌ Batch query '{query}' failed: {e}")
+                payload, status = {"success": False, "error": str(e)}, 500
+        return query, payload, status
+    
+    async def lines():
+        # One RAG context snapshot for the whole batch
+        try:
+            context = await pipeline.run('context', build_rag_context)
+        except Exception as e:
+            print(f"[RAG] Error building batch context, building per query: {e}")
+            context = None
+        
+        tasks = [asyncio.ensure_future(run_item(query, context)) for query in positions]
+        try:
+            with pipeline.stage('generate'):
+                for next_done in asyncio.as_completed(tasks):
+                    query, payload, status = await next_done
+                    yield json.dumps({
+                        "indices": positions[query],
+                        "query": query,
+                        "status": status,
+                        **payload
+                    }) + "\n"
+        finally:
+            # Drop queries that are still waiting if the client went away
+            for task in tasks:
+                task.cancel()
+        
+        print(f"✅ Batch of {len(positions)} workflows generated")
+        yield json.dumps({
+            "done": True,
+            "total": len(queries),
+            "unique": len(positions),
+            "timings": pipeline.report()
+        }) + "\n"
+    
+    return Response(lines(), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/api/workflow/generate/stream', methods=['POST'])
+async def generate_workflow_stream():
+    """
+    Stream workflow generation as Server-Sent Events.
+    
+    Same request body and event sequence as
+    /api/workflow/generate/stream in server.py.
+    """
+    
+    data = await request.get_json() or {}
+    user_query = data.get('query', '')
+    user_address = data.get('userAddress', '')
+    
+    if not user_query:
+        return jsonify({
+            "success": False,
+            "error": "Query is required"
+        }), 400
+    
+    print(f"📝 [v{SERVER_VERSION}] Streaming workflow generation request: '{user_query}'")
+    
+    pipeline = AsyncStagedPipeline()
+    
+    cached = await pipeline.run('cache', cached_response, user_query, user_address)
+    if cached:
+        print("⚡ Streaming workflow from response cache")
+        return Response(replay(cached_events(cached, pipeline)), mimetype='text/event-stream', headers=SSE_HEADERS)
+    
+    plan = await pipeline.run('plan', plan_query, user_query)
+    if plan.confidence >= FAST_PATH_THRESHOLD:
+        print(f"🏎️  Streaming rule-based workflow (confidence {plan.confidence:.2f})")
+        events = cached_events(fast_path_result(plan), pipeline, source="fast")
+        return Response(replay(events), mimetype='text/event-stream', headers=SSE_HEADERS)
+    
+    node_queue = asyncio.Queue()
+    
+    context = await pipeline.run('context', build_rag_context)
+    pipeline.submit('intent', classify_query_intent, user_query)
+    with pipeline.stage('prompt'):
+        prompt = asi_client.build_workflow_prompt(user_query, context)
+    pipeline.submit('generate', stream_with_asi, context, user_query, node_queue, prompt)
+    pipeline.tasks['generate'].add_done_callback(lambda _: node_queue.put_nowait(None))
+    
+    async def events():
+        try:
+            classification = await pipeline.result('intent')
+            intent, keyword = classification.intent, classification.keyword
+            yield sse_event('intent', {"intent": intent, "keyword": keyword})
+            
+            yield sse_event('context', {
+                "version": context.version,
+                "strategies": len(context['strategies']),
+                "protocols": len(context['protocols']),
+                "chains": list(context['token_addresses'].keys())
+            })
+            
+            # Forward nodes as the generation stage parses them
+            while True:
+                node = await node_queue.get()
+                if node is None:
+                    break
+                yield sse_event('node', node)
+            
+            try:
+                workflow_json = await pipeline.result('generate')
+            except Exception as e:
+                print(f"[ASI] Skipping ASI:One generation: {e}")
+                workflow_json = None
+            
+            source = "asi"
+            strategy_used = ""
+            if not workflow_json:
+                source = "fallback"
+                workflow_json, strategy_used = await pipeline.run(
+                    'fallback', generate_workflow_fallback, user_query, intent, keyword
+                )
+                if not workflow_json:
+                    yield sse_event('error', {
+                        "error": "Failed to generate workflow",
+                        "message": "Could not generate a valid workflow from your request. Please try rephrasing."
+                    })
+                    return
+                for node in workflow_json.get('nodes', []):
+                    yield sse_event('node', node)
+            
+            yield sse_event('workflow', {
+                "workflow": workflow_json,
+                "strategy": strategy_used,
+                "source": source
+            })
+            
+            explanation = ""
+            with pipeline.stage('explain'):
+                try:
+                    async for token in asi_client.explain_workflow_stream(workflow_json):
+                        explanation += token
+                        yield sse_event('explanation', {"token": token})
+                except Exception as e:
+                    print(f"Error streaming explanation: {e}")
+                if not explanation:
+                    explanation = await asi_client.explain_workflow(workflow_json)
+                    yield sse_event('explanation', {"token": explanation})
+            
+            if source == "asi":
+                response_cache.put(user_query, user_address, {
+                    "workflow": workflow_json,
+                    "explanation": explanation,
+                    "strategy": strategy_used,
+                    "intent": intent,
+                    "keyword": keyword
+                })
+            
+            yield sse_event('done', {"timings": pipeline.report(), "prompt": prompt.info()})
+        
+        except Exception as e:
+            print(f"❌ Streaming error: {e}")
+            yield sse_event('error', {"error": str(e)})
+    
+    return Response(events(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+
+async def classify_query_intent(user_query: str) -> IntentPrediction:
+    """Classify a query's intent locally, escalating to ASI:One when unsure."""
+    prediction = local_intent_classifier().classify(user_query)
+    if prediction.confidence >= INTENT_CONFIDENCE_THRESHOLD:
+        return prediction
+    
+    print(f"🔍 Local intent confidence {prediction.confidence:.2f}, asking ASI:One...")
+    prediction.intent, prediction.keyword = await asi_client.get_intent_and_keyword(user_query)
+    prediction.source = "asi"
+    return prediction
+
+
+async def replay(events):
+    """Adapt a prebuilt event sequence to an async response body."""
+    for event in events:
+        yield event
+
+
+async def generate_with_asi(context: ContextSnapshot, user_query: str, prompt: PromptBuild = None):
+    """Generate a workflow with ASI:One. Returns None if nothing usable came back."""
+    try:
+        asi_result = await asi_client.generate_workflow_from_intent(user_query, context, prompt)
+        
+        if has_actions(asi_result):
+            check_token_fields(context, asi_result)
+            print(f"✅ Generated workflow with {len(asi_result.get('nodes', []))} nodes from ASI:One")
+            return asi_result
+    except Exception as e:
+        print(f"[ASI] Error generating with ASI:One: {e}")
+        print(f"[ASI] Traceback: {traceback.format_exc()}")
+    
+    return None
+
+
+async def stream_with_asi(context: ContextSnapshot, user_query: str, node_queue: asyncio.Queue,
+                          prompt: PromptBuild = None):
+    """
+    Generate a workflow with ASI:One in streaming mode.
+    
+    Each node is pushed onto node_queue as soon as it has been parsed.
+    Returns the complete workflow, or None if nothing usable came back.
+    """
+    parser = WorkflowNodeStreamParser()
+    try:
+        async for chunk in asi_client.generate_workflow_stream(user_query, context, prompt):
+            for node in parser.feed(chunk):
+                for problem in context.tokens.validate_node(node):
+                    print(f"🪙 Token field: {problem}")
+                node_queue.put_nowait(node)
+    except Exception as e:
+        print(f"[ASI] Error streaming from ASI:One: {e}")
+    
+    workflow_json = parser.result()
+    if has_actions(workflow_json):
+        print(f"✅ Streamed workflow with {len(workflow_json['nodes'])} nodes from ASI:One")
+        return workflow_json
+    
+    return None
+
+
+@app.route('/api/knowledge/query', methods=['POST'])
+async def query_knowledge():
+    """Query the MeTTa knowledge graph."""
+    
+    try:
+        data = await request.get_json()
+        query_type = data.get('type', '')
+        query = data.get('query', '')
+        
+        if not query_type or not query:
+            return jsonify({
+                "success": False,
+                "error": "Both type and query are required"
+            }), 400
+        
+        try:
+            result = await asyncio.to_thread(run_knowledge_query, query_type, query)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        
+        return jsonify({
+            "success": True,
+            "result": result
+        })
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/api/knowledge/reload', methods=['POST'])
+async def reload_knowledge():
+    """Reload the knowledge files and swap the new graph in."""
+    
+    if reloader is None:
+        return jsonify({
+            "success": False,
+            "error": "Knowledge is served by the knowledge service; it reloads its own files"
+        }), 409
+    
+    try:
+        data = await request.get_json(silent=True) or {}
+        report = await asyncio.to_thread(reloader.reload, bool(data.get('force', False)))
+        return jsonify({
+            "success": True,
+            **report
+        })
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/api/agents/search', methods=['POST'])
+async def search_agents():
+    """Search for agents on Agentverse."""
+    
+    try:
+        data = await request.get_json()
+        
+        return jsonify({
+            "success": True,
+            "agents": search_agentverse(data.get('query', ''), data.get('semantic', False))
+        })
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/api/asi/classify', methods=['POST'])
+async def classify_intent():
+    """Classify user intent, locally or with ASI:One when unsure."""
+    
+    try:
+        data = await request.get_json()
+        text = data.get('text', '')
+        
+        if not text:
+            return jsonify({
+                "success": False,
+                "error": "Text is required"
+            }), 400
+        
+        prediction = await classify_query_intent(text)
+        
+        return jsonify({
+            "success": True,
+            **prediction.info()
+        })
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/api/knowledge/strategies', methods=['GET'])
+async def get_strategies():
+    """Get all available DeFi strategies from the knowledge graph."""
+    
+    try:
+        strategies = await asyncio.to_thread(rag.query_all_strategies)
+        
+        return jsonify({
+            "success": True,
+            "strategies": strategies
+        })
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/api/knowledge/nodes', methods=['GET'])
+async def get_nodes():
+    """Get all available node types and their capabilities."""
+    
+    try:
+        return jsonify({
+            "success": True,
+            "nodes": await asyncio.to_thread(list_node_capabilities)
+        })
+    
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/api/agents/query', methods=['POST'])
+async def query_agent():
+    """Query a specific agent via uAgents protocol and wait for response."""
+    
+    try:
+        data = await request.get_json()
+        query = data.get('query', '')
+        agent_address = data.get('agentAddress', DEFAULT_AGENT_ADDRESS)
+        
+        if not query:
+            return jsonify({
+                "success": False,
+                "error": "Query is required"
+            }), 400
+        
+        payload, status = await send_agent_query(query, agent_address)
+        return jsonify(payload), status
+    
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        traceback.print_exc()
+        
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/api/mcp/tools', methods=['POST'])
+async def get_mcp_tools():
+    """Get MCP tool definitions for the specified servers."""
+    
+    try:
+        data = await request.get_json()
+        servers = data.get('servers', [])
+        
+        if not servers:
+            return jsonify({
+                "success": False,
+                "error": "No servers specified"
+            }), 400
+        
+        print(f"🔌 Getting MCP tools for servers: {servers}")
+        
+        client = await get_mcp_client()
+        
+        all_tools = []
+        
+        for server_type in servers:
+            try:
+                tools = client.get_tools_for_server(server_type)
+                all_tools.extend(tools)
+                print(f"   ✓ Loaded {len(tools)} tools from {server_type}")
+            except Exception as e:
+                print(f"   ✗ Error loading tools from {server_type}: {e}")
+        
+        return jsonify({
+            "success": True,
+            "tools": all_tools
+        })
+    
+    except Exception as e:
+        print(f"❌ MCP tools error: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/api/mcp/execute', methods=['POST'])
+async def execute_mcp_tool():
+    """Execute an MCP tool."""
+    
+    try:
+        data = await request.get_json()
+        server_type = data.get('server', '')
+        tool_name = data.get('tool', '')
+        arguments = data.get('arguments', {})
+        
+        if not server_type or not tool_name:
+            return jsonify({
+                "success": False,
+                "error": "Server and tool name are required"
+            }), 400
+        
+        print(f"🔌 Executing MCP tool: {tool_name} on {server_type}")
+        
+        client = await get_mcp_client()
+        result = await client.execute_tool(tool_name, arguments)
+        
+        return jsonify({
+            "success": True,
+            "result": result
+        })
+    
+    except Exception as e:
+        print(f"❌ MCP execution error: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+if __name__ == '__main__':
+    import uvicorn
+    
+    port = int(os.getenv('FLASK_PORT', 8080))
+    
+    print(f"\n🚀 Starting ASGI server on port {port}...\n")
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -4,26 +4,67 @@ ASI:One API Client
 This module provides integration with ASI:One for LLM-powered
 intent classification and natural language processing.
 
+AsyncASIOneClient makes every call as a coroutine, for the async server
+and the uAgents handlers, sending requests through one keep-alive
+connection pool (utils/http_pool.py). ASIOneClient has the same methods as
+blocking calls; it runs them on an AsyncASIOneClient in a background event
+loop.
+
 Version: 2.0 (Enhanced prompts with chain parsing and token address mappings)
 """
 
+import asyncio
+import concurrent.futures
+import contextvars
 import os
-import requests
-from typing import Dict, Tuple, Any
+import json
+import re
+import threading
+import time
+import weakref
+import httpx
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from utils.http_pool import PoolConfig, PoolStats
+from utils.metrics import ASI_ONE_SECONDS
+from utils.prompt_builder import PromptBuild, WorkflowPromptTemplate
 
 CLIENT_VERSION = "2.0"
 
-class ASIOneClient:
+WORKFLOW_SYSTEM_PROMPT = """You are a DeFi workflow architect. Generate ONLY what the user explicitly requests. 
+
+CRITICAL CHAIN PARSING RULES - MUST FOLLOW EXACTLY:
+- "base sepolia", "basesepolia", or "base-sepolia" in user query → MUST use chain value "basesepolia"
+- "sepolia" alone → use "sepolia" (Ethereum Sepolia, NOT Base Sepolia)
+- These are DIFFERENT chains with DIFFERENT token addresses
+
+CRITICAL TOKEN ADDRESS RULES - MUST FOLLOW EXACTLY:
+- Look up token addresses in the TOKEN ADDRESS MAPPINGS section for the SPECIFIC chain
+{address_examples}
+- DO NOT mix addresses from different chains
+
+CRITICAL TRANSFER NODE RULES - MUST FOLLOW EXACTLY:
+- Transfer nodes MUST have: "token" (token ADDRESS not symbol), "to" (recipient address), "chain", "amount"
+- After a swap, transfer node "token" field MUST use the swap's "toToken" address
+- Transfer node "to" field MUST be the recipient wallet address from user query
+
+Output valid JSON only. Follow the examples EXACTLY."""
+
+class ASIOneBase:
     """
-    Client for interacting with ASI:One API for LLM capabilities.
+    Shared configuration, prompts and response parsing for the ASI:One clients.
+    
+    The transport lives in the subclasses: ASIOneClient (blocking) and
+    AsyncASIOneClient (asyncio).
     """
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, pool: PoolConfig = None):
         """
-        Initialize ASI:One client.
+        Initialize ASI:One client configuration.
         
         Args:
             api_key: ASI:One API key. If not provided, reads from environment.
+            pool: Connection pool settings; read from ASI_ONE_* environment variables if not provided
         """
         self.api_key = api_key or os.getenv('ASI_ONE_API_KEY')
         if not self.api_key:
@@ -34,24 +75,26 @@ class ASIOneClient:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        # (context, WorkflowPromptTemplate) for the last context seen
+        self._prompt_template = None
+        self.pool = pool or PoolConfig.from_env()
+        self.pool_stats = PoolStats(self.pool)
+        self._http = None
     
-    def get_intent_and_keyword(self, user_query: str) -> Tuple[str, str]:
+    def pool_info(self) -> Dict[str, Any]:
+        """Connection pool counters and settings, for health checks."""
+        return self.pool_stats.info(self._http)
+    
+    def _build_intent_messages(self, user_query: str) -> List[Dict[str, str]]:
         """
-        Classify user intent and extract key information.
+        Build the chat messages for intent classification.
         
         Args:
             user_query: Natural language query from user
             
         Returns:
-            Tuple of (intent_type, keyword/subject)
-            
-        Intent types:
-        - 'strategy': User wants to create a DeFi strategy
-        - 'operation': User wants to perform a specific operation
-        - 'question': User has a question about DeFi or workflows
-        - 'modify': User wants to modify an existing workflow
+            List of chat messages (system + user prompt)
         """
-        
         prompt = f"""Analyze this DeFi workflow request and classify the intent.
 
 User Query: "{user_query}"
@@ -67,430 +110,289 @@ Extract the main keyword/subject from the query.
 Respond in this exact format:
 INTENT: <intent_type>
 KEYWORD: <extracted_keyword>"""
-
-        try:
-            url = f"{self.base_url}/chat/completions"
-            payload = {
-                "model": "asi1-mini",
-                "messages": [
-                    {"role": "system", "content": "You are a DeFi workflow assistant that classifies user intents."},
-                    {"role": "user", "content": prompt}
-                ]
-            }
+        
+        return [
+            {"role": "system", "content": "You are a DeFi workflow assistant that classifies user intents."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _parse_intent_content(self, content: str) -> Tuple[str, str]:
+        """
+        Parse an INTENT/KEYWORD response from the model.
+        
+        Args:
+            content: Raw model output
             
-            print(f"[DEBUG ASI:One] URL: {url}")
-            print(f"[DEBUG ASI:One] Headers: {self.headers}")
-            print(f"[DEBUG ASI:One] Payload: {payload}")
+        Returns:
+            Tuple of (intent_type, keyword/subject)
+        """
+        intent = "question"
+        keyword = ""
+        
+        for line in content.split('\n'):
+            line = line.strip()
+            if line.startswith('INTENT:'):
+                intent = line.split(':', 1)[1].strip().lower()
+            elif line.startswith('KEYWORD:'):
+                keyword = line.split(':', 1)[1].strip()
+        
+        return intent, keyword
+    
+    def build_workflow_prompt(self, user_query: str, context: Dict[str, Any] = None) -> PromptBuild:
+        """
+        Render the workflow generation prompt for a query.
+        
+        The static prompt sections are compiled once per context object (a
+        ContextSnapshot is shared until knowledge changes), so per request
+        only the token table for the chains mentioned in the query is assembled.
+        
+        Args:
+            user_query: User's workflow description
+            context: Context from MeTTa knowledge graph (node types, strategies, token addresses, etc.)
+            
+        Returns:
+            PromptBuild with the prompt text and its estimated token count
+        """
+        return self._template(context).render(user_query)
+    
+    def _template(self, context: Dict[str, Any] = None) -> WorkflowPromptTemplate:
+        """Get the prompt template compiled for a context, compiling it on first use."""
+        cached = self._prompt_template
+        if cached is None or cached[0] is not context:
+            cached = (context, WorkflowPromptTemplate(context))
+            self._prompt_template = cached
+        return cached[1]
+    
+    def _build_workflow_messages(self, user_query: str, context: Dict[str, Any] = None,
+                                 prompt: PromptBuild = None) -> List[Dict[str, str]]:
+        """
+        Build the chat messages for workflow generation.
+        
+        Args:
+            user_query: User's workflow description
+            context: Context from MeTTa knowledge graph (node types, strategies, token addresses, etc.)
+            prompt: Prompt already rendered by build_workflow_prompt
             
-            response = requests.post(
-                url,
+        Returns:
+            List of chat messages (system + user prompt)
+        """
+        if prompt is None:
+            prompt = self.build_workflow_prompt(user_query, context)
+        
+        return [
+            {"role": "system", "content": WORKFLOW_SYSTEM_PROMPT.format(
+                address_examples=self._template(context).address_examples)},
+            {"role": "user", "content": prompt.prompt}
+        ]
+    
+    def _parse_workflow_content(self, content: str) -> Dict[str, Any]:
+        """
+        Extract workflow JSON from a model response.
+        
+        Args:
+            content: Raw model output, possibly wrapped in a markdown code block
+            
+        Returns:
+            Parsed workflow JSON
+            
+        Raises:
+            json.JSONDecodeError: If no valid JSON could be parsed
+        """
+        # Try to find JSON in code blocks
+        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', content, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group(1))
+        
+        # Try direct JSON parse
+        return json.loads(content)
+    
+    def _build_explain_prompt(self, workflow_json: Dict[str, Any]) -> str:
+        """Build the prompt used to explain a workflow."""
+        return f"""Explain this DeFi workflow in simple terms.
+
+Workflow:
+{workflow_json}
+
+Provide a clear, concise explanation of what this workflow does,
+in 2-3 sentences. Focus on the user's goal and the steps taken."""
+    
+    def _parse_stream_line(self, line: str) -> str:
+        """
+        Extract the content delta from one line of a streamed chat completion.
+        
+        ASI:One streams OpenAI-style Server-Sent Events: one "data: {...}"
+        line per chunk, terminated by "data: [DONE]".
+        
+        Args:
+            line: Raw SSE line
+            
+        Returns:
+            Content delta, or "" for non-content lines
+        """
+        if not line or not line.startswith('data:'):
+            return ""
+        
+        data_str = line[5:].strip()
+        if data_str == '[DONE]':
+            return ""
+        
+        try:
+            chunk = json.loads(data_str)
+        except json.JSONDecodeError:
+            return ""
+        
+        choices = chunk.get('choices') or [{}]
+        delta = choices[0].get('delta') or choices[0].get('message') or {}
+        return delta.get('content') or ""
+    
+    def _fallback_intent_classification(self, query: str) -> Tuple[str, str]:
+        """Fallback intent classification using simple keyword matching."""
+        query_lower = query.lower()
+        
+        if any(word in query_lower for word in ['yield', 'maximize', 'earn', 'strategy']):
+            return 'strategy', 'maximize_yield'
+        elif any(word in query_lower for word in ['swap', 'exchange', 'trade']):
+            return 'operation', 'swap_tokens'
+        elif any(word in query_lower for word in ['supply', 'deposit', 'lend', 'aave']):
+            return 'operation', 'supply_to_aave'
+        elif any(word in query_lower for word in ['?', 'how', 'what', 'why']):
+            return 'question', query_lower.split()[0] if query_lower.split() else 'general'
+        else:
+            return 'strategy', 'general'
+    
+    def _format_context(self, context: Dict[str, Any]) -> str:
+        """Format context dictionary as readable string."""
+        lines = []
+        for key, value in context.items():
+            if isinstance(value, list):
+                lines.append(f"{key}: {', '.join(str(v) for v in value)}")
+            else:
+                lines.append(f"{key}: {value}")
+        return '\n'.join(lines)
+    
+    def _fallback_workflow(self) -> Dict[str, Any]:
+        """Generate a simple fallback workflow."""
+        return {
+            "nodes": [
+                {
+                    "id": "node-1",
+                    "type": "trigger",
+                    "data": {
+                        "label": "Trigger",
+                        "config": {"triggerType": "manual"}
+                    },
+                    "position": {"x": 100, "y": 100}
+                }
+            ],
+            "edges": []
+        }
+
+
+class AsyncASIOneClient(ASIOneBase):
+    """
+    Asyncio client for the ASI:One API.
+    
+    Sends requests through one pooled httpx.AsyncClient, so many slow LLM
+    calls can be in flight at once on a single event loop (the ASGI server,
+    uAgents handlers). ASIOneClient wraps it for blocking callers.
+    """
+    
+    def __init__(self, api_key: str = None, pool: PoolConfig = None):
+        """
+        Initialize async ASI:One client.
+        
+        Args:
+            api_key: ASI:One API key. If not provided, reads from environment.
+            pool: Connection pool settings; read from ASI_ONE_* environment variables if not provided
+        """
+        super().__init__(api_key, pool)
+        self._http: Optional[httpx.AsyncClient] = None
+    
+    def _client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use inside the event loop."""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
                 headers=self.headers,
-                json=payload,
-                timeout=30
+                limits=self.pool.limits(),
+                http2=self.pool.http2,
             )
+        return self._http
+    
+    async def aclose(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+    
+    async def get_intent_and_keyword(self, user_query: str) -> Tuple[str, str]:
+        """
+        Classify user intent and extract key information.
+        
+        Args:
+            user_query: Natural language query from user
             
-            print(f"[DEBUG ASI:One] Response Status: {response.status_code}")
-            print(f"[DEBUG ASI:One] Response Headers: {dict(response.headers)}")
-            print(f"[DEBUG ASI:One] Response Text: {response.text[:500]}")
+        Returns:
+            Tuple of (intent_type, keyword/subject)
             
-            response.raise_for_status()
-            result = response.json()
+        Intent types:
+        - 'strategy': User wants to create a DeFi strategy
+        - 'operation': User wants to perform a specific operation
+        - 'question': User has a question about DeFi or workflows
+        - 'modify': User wants to modify an existing workflow
+        """
+        
+        try:
+            result = await self._chat({
+                "model": "asi1-mini",
+                "messages": self._build_intent_messages(user_query)
+            }, timeout=30, stage="intent")
             
             # ASI:One response format: choices[0].message.content
             content = result['choices'][0]['message']['content']
             
-            # Parse response
-            intent = "question"
-            keyword = ""
-            
-            for line in content.split('\n'):
-                line = line.strip()
-                if line.startswith('INTENT:'):
-                    intent = line.split(':', 1)[1].strip().lower()
-                elif line.startswith('KEYWORD:'):
-                    keyword = line.split(':', 1)[1].strip()
-            
-            return intent, keyword
+            return self._parse_intent_content(content)
             
         except Exception as e:
             print(f"Error calling ASI:One API: {e}")
             # Fallback to simple keyword extraction
             return self._fallback_intent_classification(user_query)
     
-    def generate_workflow_from_intent(self, user_query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    async def generate_workflow_from_intent(self, user_query: str, context: Dict[str, Any] = None,
+                                            prompt: PromptBuild = None) -> Dict[str, Any]:
         """
         Generate a complete workflow JSON from natural language description.
         
         Args:
             user_query: User's workflow description
             context: Context from MeTTa knowledge graph (node types, strategies, token addresses, etc.)
+            prompt: Prompt already rendered by build_workflow_prompt
             
         Returns:
             Workflow JSON structure
         """
         
-        # Build node types description from context
-        node_types_desc = ""
-        if context and "node_types" in context:
-            node_types_desc = "\nAvailable node types:\n"
-            for nt in context["node_types"]:
-                node_types_desc += f"- {nt['type']}: {nt['description']}\n"
-        else:
-            node_types_desc = "\nAvailable node types: trigger, swap, aave, transfer, condition, ai\n"
-        
-        # Build examples from strategies - safely handle empty or malformed data
-        examples_desc = ""
-        if context and "strategies" in context and context["strategies"]:
-            # Filter out empty lists and non-dict items
-            valid_strategies = [s for s in context["strategies"] if isinstance(s, dict) and 'description' in s and 'sequence' in s]
-            if valid_strategies:
-                examples_desc = "\nExample workflows:\n"
-                for strat in valid_strategies[:3]:  # Show first 3
-                    examples_desc += f"- {strat['description']}: {strat['sequence']}\n"
-        
-        # Build comprehensive token address mappings - always include this data
-        token_mappings = """
-TOKEN ADDRESS MAPPINGS BY NETWORK (ALWAYS USE THESE EXACT ADDRESSES):
-
-BASESEPOLIA (Base Testnet - Chain ID: 84532):
-- ETH: 0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE (18 decimals)
-- WETH: 0x4200000000000000000000000000000000000006 (18 decimals)
-- USDC: 0x036CbD53842c5426634e7929541eC2318f3dCF7e (6 decimals)
-
-SEPOLIA (Ethereum Testnet - Chain ID: 11155111):
-- ETH: 0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE (18 decimals)
-- WETH: 0xfFf9976782d46CC05630D1f6eBAb18b2324d6B14 (18 decimals)
-- USDC: 0x1c7D4B196Cb0C7B01d743Fbc6116a902379C7238 (6 decimals)
-- DAI: 0xFF34B3d4Aee8ddCd6F9AFFFB6Fe49bD371b8a357 (18 decimals)
-
-BASE (Base Mainnet - Chain ID: 8453):
-- ETH: 0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE (18 decimals)
-- WETH: 0x4200000000000000000000000000000000000006 (18 decimals)
-- USDC: 0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913 (6 decimals)
-
-ETHEREUM (Ethereum Mainnet - Chain ID: 1):
-- ETH: 0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE (18 decimals)
-- WETH: 0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2 (18 decimals)
-- USDC: 0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48 (6 decimals)
-- USDT: 0xdAC17F958D2ee523a2206206994597C13D831ec7 (6 decimals)
-- DAI: 0x6B175474E89094C44Da98b954EedeAC495271d0F (18 decimals)
-
-ARBITRUM (Arbitrum One - Chain ID: 42161):
-- ETH: 0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE (18 decimals)
-- WETH: 0x82aF49447D8a07e3bd95BD0d56f35241523fBab1 (18 decimals)
-- USDC: 0xaf88d065e77c8cC2239327C5EDb3A432268e5831 (6 decimals)
-
-OPTIMISM (Optimism - Chain ID: 10):
-- ETH: 0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE (18 decimals)
-- WETH: 0x4200000000000000000000000000000000000006 (18 decimals)
-- USDC: 0x0b2C639c533813f4Aa9D7837CAf62653d097Ff85 (6 decimals)
-
-POLYGON (Polygon - Chain ID: 137):
-- MATIC: 0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE (18 decimals)
-- WMATIC: 0x0d500B1d8E8eF31E21C99d1Db9A6444d3ADf1270 (18 decimals)
-- USDC: 0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359 (6 decimals)
-
-ARBITRUMSEPOLIA (Arbitrum Sepolia - Chain ID: 421614):
-- ETH: 0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE (18 decimals)
-- WETH: 0x980B62Da83eFf3D4576C647993b0c1D7faf17c73 (18 decimals)
-
-OPTIMISMSEPOLIA (Optimism Sepolia - Chain ID: 11155420):
-- ETH: 0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE (18 decimals)
-- WETH: 0x4200000000000000000000000000000000000006 (18 decimals)
-
-CHAIN NAME REFERENCE (use these EXACT names in "chain" field):
-Mainnets: ethereum, base, arbitrum, optimism, polygon, avalanche, bnb, celo
-Testnets: sepolia, basesepolia, arbitrumsepolia, optimismsepolia, avalanchefuji, polygonmumbai
-"""
-        
-        # Add context data if available
-        if context and "token_addresses" in context and len(context["token_addresses"]) > 0:
-            token_mappings += "\n[Additional token addresses from context]:\n"
-            for chain, tokens in list(context["token_addresses"].items())[:3]:
-                token_mappings += f"\n{chain.upper()} (from RAG):\n"
-                for token in tokens[:3]:
-                    token_mappings += f"- {token['symbol']}: {token['address']}\n"
-        
-        prompt = f"""Create a DeFi workflow based on this request: "{user_query}"
-
-{node_types_desc}
-{examples_desc}
-
-CRITICAL REQUIREMENTS:
-1. ONLY generate the EXACT operations the user requested - DO NOT add extra helpful steps
-2. If user asks for "swap X to Y", generate ONLY: trigger + swap nodes
-3. If user asks for "swap and supply", generate: trigger + swap + aave nodes
-4. DO NOT assume the user wants to transfer tokens unless explicitly asked
-5. Use ONLY these exact node type values: trigger, swap, aave, transfer, condition, ai
-
-FIELD NAMING REQUIREMENTS:
-- Swap nodes MUST use: "fromToken" (address), "toToken" (address), "fromTokenDecimals", "chain", "protocol", "amount", "slippage"
-- Aave nodes MUST use: "asset" (symbol like "USDC"), "amount", "action" (supply/borrow/withdraw/repay), "useAsCollateral", "chain"
-- Transfer nodes MUST use: "token" (address), "to" (address), "amount", "chain"
-  * CRITICAL: Transfer node "token" field MUST be the TOKEN ADDRESS being transferred (NOT the symbol)
-  * CRITICAL: Transfer node MUST include "chain" field with the same chain as previous nodes
-  * CRITICAL: Transfer node "to" field MUST be the recipient wallet address from user query
-- DO NOT use "tokenIn" or "tokenOut" - use "fromToken" and "toToken" instead
-- DO NOT use "recipient" - use "to" for transfer nodes
-
-CHAIN NAME PARSING RULES:
-1. User mentions "base sepolia", "basesepolia", "base-sepolia", "base testnet" → use "basesepolia"
-2. User mentions "sepolia" alone → use "sepolia" (Ethereum Sepolia testnet, NOT Base Sepolia)
-3. User mentions "base" alone, "base mainnet" → use "base"
-4. User mentions "ethereum", "eth mainnet" → use "ethereum"
-5. User mentions "arbitrum sepolia" → use "arbitrumsepolia"
-6. User mentions "optimism sepolia" → use "optimismsepolia"
-7. Parse chain BEFORE looking up token addresses
-8. Default to "basesepolia" ONLY if absolutely NO chain is mentioned
-
-SUPPORTED CHAIN NAMES (use these EXACT strings in "chain" field):
-Mainnets: ethereum, base, arbitrum, optimism, polygon, avalanche, bnb, celo
-Testnets: sepolia, basesepolia, arbitrumsepolia, optimismsepolia, avalanchefuji, polygonmumbai
-
-CRITICAL: "sepolia" and "basesepolia" are DIFFERENT chains with DIFFERENT token addresses!
-
-AMOUNT FIELD REQUIREMENTS:
-- If a node (swap, aave, transfer) comes AFTER another node that produces an output amount, leave the "amount" field as an empty string ""
-- The backend will automatically infer the amount from the previous node's output
-- ONLY set a specific amount value if the user explicitly specifies an amount AND it's the first operation in the chain
-- Examples:
-  * "swap 100 USDC to ETH then transfer to 0x123..." -> swap amount: "100", transfer amount: "" (inferred from swap output)
-  * "swap 0.01 ETH to USDC then transfer to 0x123..." -> swap amount: "0.01", transfer amount: "" (inferred from swap output)
-  * "swap ETH to USDC then supply to Aave" -> swap amount: "", aave amount: "" (both inferred from user's wallet/previous outputs)
-
-{token_mappings}
-
-TOKEN ADDRESS LOOKUP - CRITICAL:
-For each token symbol mentioned (ETH, USDC, USDT, WETH, DAI, etc.), you MUST:
-1. Identify the target chain from user query FIRST
-   - "base sepolia", "basesepolia", "base-sepolia" → chain = "basesepolia"
-   - "sepolia" alone → chain = "sepolia" (Ethereum Sepolia, NOT Base Sepolia!)
-   - "base" alone → chain = "base" (mainnet)
-2. Look up the EXACT token address for that symbol on that SPECIFIC chain from TOKEN ADDRESS MAPPINGS above
-3. DO NOT mix addresses from different chains - each chain has different addresses!
-4. For transfer nodes after a swap: use the swap's toToken address as the transfer token address
-
-EXAMPLES OF CORRECT CHAIN & TOKEN MAPPING:
-
-Example 1 - Base Sepolia (CORRECT):
-User: "swap eth to usdc on base sepolia"
-Step 1: Parse chain → "base sepolia" → "basesepolia"
-Step 2: Look up ETH on basesepolia → 0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE
-Step 3: Look up USDC on basesepolia → 0x036CbD53842c5426634e7929541eC2318f3dCF7e
-Result: chain="basesepolia", fromToken=ETH address, toToken=USDC basesepolia address
-
-Example 2 - Sepolia (DIFFERENT FROM BASE SEPOLIA):
-User: "swap eth to usdc on sepolia"
-Step 1: Parse chain → "sepolia" → "sepolia"  
-Step 2: Look up USDC on sepolia → 0x1c7D4B196Cb0C7B01d743Fbc6116a902379C7238
-Result: chain="sepolia", toToken=USDC sepolia address (NOT basesepolia USDC!)
-
-COMMON MISTAKE TO AVOID:
-❌ WRONG: User says "base sepolia" but you use sepolia USDC address (0x1c7D...)
-✅ RIGHT: User says "base sepolia" so use basesepolia USDC address (0x036C...)
-
-SWAP + TRANSFER EXAMPLE:
-User: "swap 0.01 eth to usdc and then transfer it to 0x0fCe963885b15a12832813798980bDadc9744705 on base sepolia"
-Chain parsing: "base sepolia" → "basesepolia"
-Token lookup: USDC on basesepolia → 0x036CbD53842c5426634e7929541eC2318f3dCF7e (NOT sepolia USDC 0x94a9...)
-
-Correct output:
-{{
-  "nodes": [
-    {{
-      "id": "node-1",
-      "type": "trigger",
-      "data": {{
-        "label": "Trigger",
-        "config": {{"triggerType": "manual"}}
-      }},
-      "position": {{"x": 100, "y": 100}}
-    }},
-    {{
-      "id": "node-2",
-      "type": "swap",
-      "data": {{
-        "label": "Swap ETH to USDC",
-        "config": {{
-          "fromToken": "0x4200000000000000000000000000000000000006",
-          "toToken": "0x036CbD53842c5426634e7929541eC2318f3dCF7e",
-          "fromTokenDecimals": "18",
-          "amount": "0.01",
-          "chain": "basesepolia",
-          "protocol": "uniswap",
-          "slippage": "1"
-        }}
-      }},
-      "position": {{"x": 300, "y": 100}}
-    }},
-    {{
-      "id": "node-3",
-      "type": "transfer",
-      "data": {{
-        "label": "Transfer USDC",
-        "config": {{
-          "token": "0x036CbD53842c5426634e7929541eC2318f3dCF7e",
-          "to": "0x0fCe963885b15a12832813798980bDadc9744705",
-          "amount": "",
-          "chain": "basesepolia"
-        }}
-      }},
-      "position": {{"x": 500, "y": 100}}
-    }}
-  ],
-  "edges": [
-    {{
-      "id": "edge-1",
-      "source": "node-1",
-      "target": "node-2",
-      "sourceHandle": "output",
-      "targetHandle": "input"
-    }},
-    {{
-      "id": "edge-2",
-      "source": "node-2",
-      "target": "node-3",
-      "sourceHandle": "output",
-      "targetHandle": "input"
-    }}
-  ]
-}}
-
-REQUIRED WORKFLOW STRUCTURE:
-- USDT: 0xfde4C96c8593536E31F229EA8f37b2ADa2699bb2
-- DAI: 0x50c5725949A6F0c72E6C4a641F24049A917DB0Cb
-- WETH: 0x4200000000000000000000000000000000000006
-
-6. Each node MUST have:
-   - id: string (e.g., "node-1", "node-2")
-   - type: string (MUST be one of: trigger, swap, aave, transfer, condition, ai)
-   - data: object with "label" (string) and "config" (object)
-   - position: object with "x" and "y" (numbers)
-7. Each edge MUST have:
-   - id: string (e.g., "edge-1")
-   - source: string (source node id)
-   - target: string (target node id)
-   - sourceHandle: "output"
-   - targetHandle: "input"
-8. ALWAYS start with a "trigger" node
-9. Do NOT use brackets [] or quotes in type field - use plain string values
-
-Example valid workflow:
-{{
-  "nodes": [
-    {{
-      "id": "node-1",
-      "type": "trigger",
-      "data": {{
-        "label": "Trigger",
-        "config": {{"triggerType": "manual"}}
-      }},
-      "position": {{"x": 100, "y": 100}}
-    }},
-    {{
-      "id": "node-2",
-      "type": "swap",
-      "data": {{
-        "label": "Swap ETH to USDC",
-        "config": {{
-          "protocol": "uniswap",
-          "fromToken": "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE",
-          "toToken": "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913",
-          "fromTokenDecimals": "18",
-          "amount": "",
-          "slippage": "0.5",
-          "chain": "basesepolia"
-        }}
-      }},
-      "position": {{"x": 350, "y": 100}}
-    }}
-  ],
-  "edges": [
-    {{
-      "id": "edge-1",
-      "source": "node-1",
-      "target": "node-2",
-      "sourceHandle": "output",
-      "targetHandle": "input"
-    }}
-  ]
-}}
-
-Respond with ONLY valid JSON, no markdown code blocks, no explanations."""
+        if prompt is None:
+            prompt = self.build_workflow_prompt(user_query, context)
+        messages = self._build_workflow_messages(user_query, context, prompt)
 
         try:
             # Log the prompt for debugging
-            import sys
             print(f"🔍 [ASI Client v{CLIENT_VERSION}] Generating workflow for query: {user_query}", flush=True)
-            print(f"📊 [ASI Client v{CLIENT_VERSION}] Prompt length: {len(prompt)} characters", flush=True)
-            print(f"🗺️  [ASI Client v{CLIENT_VERSION}] Chain context included: {'token_addresses' in context if context else 'No context'}", flush=True)
-            if context and 'token_addresses' in context:
-                chains = list(context['token_addresses'].keys())
-                print(f"🌐 [ASI Client v{CLIENT_VERSION}] Available chains: {', '.join(chains[:5])}", flush=True)
-            
-            # Debug: Print portion of prompt with token mappings
-            if "BASESEPOLIA" in prompt:
-                print(f"✅ [ASI] Prompt includes BASESEPOLIA token mappings", flush=True)
-                # Find and print the USDC line for basesepolia
-                for line in prompt.split('\n'):
-                    if 'basesepolia' in line.lower() and 'usdc' in line.lower():
-                        print(f"   📍 {line.strip()}", flush=True)
-                        break
-            else:
-                print(f"❌ [ASI] WARNING: Prompt missing BASESEPOLIA token mappings!", flush=True)
+            print(f"📊 [ASI Client v{CLIENT_VERSION}] Prompt tokens: ~{prompt.tokens} (saved ~{prompt.saved_tokens})", flush=True)
+            print(f"🌐 [ASI Client v{CLIENT_VERSION}] Token table: {'all chains' if prompt.full_table else ', '.join(prompt.chains)}", flush=True)
             
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers=self.headers,
-                json={
-                    "model": "asi1-mini",
-                    "messages": [
-                        {"role": "system", "content": """You are a DeFi workflow architect. Generate ONLY what the user explicitly requests. 
-
-CRITICAL CHAIN PARSING RULES - MUST FOLLOW EXACTLY:
-- "base sepolia", "basesepolia", or "base-sepolia" in user query → MUST use chain value "basesepolia"
-- "sepolia" alone → use "sepolia" (Ethereum Sepolia, NOT Base Sepolia)
-- These are DIFFERENT chains with DIFFERENT token addresses
-
-CRITICAL TOKEN ADDRESS RULES - MUST FOLLOW EXACTLY:
-- Look up token addresses in the TOKEN ADDRESS MAPPINGS section for the SPECIFIC chain
-- Base Sepolia USDC: 0x036CbD53842c5426634e7929541eC2318f3dCF7e
-- Sepolia USDC: 0x94a9D9AC8a22534E3FaCa9F4e7F2E2cf85d5E4C8
-- DO NOT mix addresses from different chains
-
-CRITICAL TRANSFER NODE RULES - MUST FOLLOW EXACTLY:
-- Transfer nodes MUST have: "token" (token ADDRESS not symbol), "to" (recipient address), "chain", "amount"
-- After a swap, transfer node "token" field MUST use the swap's "toToken" address
-- Transfer node "to" field MUST be the recipient wallet address from user query
-
-Output valid JSON only. Follow the examples EXACTLY."""},
-                        {"role": "user", "content": prompt}
-                    ]
-                },
-                timeout=30
-            )
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            print(f"📦 [ASI Client v{CLIENT_VERSION}] Full API response: {result}", flush=True)
+            result = await self._chat({
+                "model": "asi1-mini",
+                "messages": messages
+            }, timeout=30, stage="generate")
             
             # ASI:One response format
             content = result['choices'][0]['message']['content']
             
             print(f"🤖 [ASI Client v{CLIENT_VERSION}] Raw AI response (first 500 chars): {content[:500]}", flush=True)
             
-            # Extract JSON from response (might be wrapped in code blocks)
-            import json
-            import re
-            
-            # Try to find JSON in code blocks
-            json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', content, re.DOTALL)
-            if json_match:
-                workflow_json = json.loads(json_match.group(1))
-            else:
-                # Try direct JSON parse
-                workflow_json = json.loads(content)
+            workflow_json = self._parse_workflow_content(content)
             
             # Log what chain was generated
             if workflow_json and 'nodes' in workflow_json:
@@ -516,7 +418,7 @@ Output valid JSON only. Follow the examples EXACTLY."""},
             print(f"   Traceback: {traceback.format_exc()}", flush=True)
             return self._fallback_workflow()
     
-    def explain_workflow(self, workflow_json: Dict[str, Any]) -> str:
+    async def explain_workflow(self, workflow_json: Dict[str, Any]) -> str:
         """
         Generate a human-readable explanation of a workflow.
         
@@ -527,29 +429,15 @@ Output valid JSON only. Follow the examples EXACTLY."""},
             Plain English explanation
         """
         
-        prompt = f"""Explain this DeFi workflow in simple terms.
-
-Workflow:
-{workflow_json}
-
-Provide a clear, concise explanation of what this workflow does,
-in 2-3 sentences. Focus on the user's goal and the steps taken."""
+        prompt = self._build_explain_prompt(workflow_json)
 
         try:
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers=self.headers,
-                json={
-                    "model": "asi1-mini",
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ]
-                },
-                timeout=20
-            )
-            
-            response.raise_for_status()
-            result = response.json()
+            result = await self._chat({
+                "model": "asi1-mini",
+                "messages": [
+                    {"role": "user", "content": prompt}
+                ]
+            }, timeout=20, stage="explain")
             
             return result['choices'][0]['message']['content']
             
@@ -557,13 +445,49 @@ in 2-3 sentences. Focus on the user's goal and the steps taken."""
             print(f"Error explaining workflow: {e}")
             return "This workflow automates your DeFi operations."
     
-    def query_with_mcp_tools(self, 
-                             prompt: str, 
-                             mcp_tools: list = None,
-                             context: str = None,
-                             system_prompt: str = None,
-                             temperature: float = 0.7,
-                             max_tokens: int = 500) -> Dict[str, Any]:
+    async def generate_workflow_stream(self, user_query: str, context: Dict[str, Any] = None,
+                                       prompt: PromptBuild = None) -> AsyncIterator[str]:
+        """
+        Stream the raw model output for workflow generation.
+        
+        Uses the same prompt as generate_workflow_from_intent, but yields
+        content chunks as they arrive so callers can parse nodes incrementally.
+        
+        Args:
+            user_query: User's workflow description
+            context: Context from MeTTa knowledge graph
+            prompt: Prompt already rendered by build_workflow_prompt
+            
+        Yields:
+            Content chunks of the model response
+        """
+        messages = self._build_workflow_messages(user_query, context, prompt)
+        async for chunk in self._stream_chat({"model": "asi1-mini", "messages": messages}, timeout=30,
+                                             stage="generate_stream"):
+            yield chunk
+    
+    async def explain_workflow_stream(self, workflow_json: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Stream a human-readable explanation of a workflow token by token.
+        
+        Args:
+            workflow_json: The workflow structure
+            
+        Yields:
+            Explanation tokens as they arrive
+        """
+        messages = [{"role": "user", "content": self._build_explain_prompt(workflow_json)}]
+        async for chunk in self._stream_chat({"model": "asi1-mini", "messages": messages}, timeout=20,
+                                             stage="explain_stream"):
+            yield chunk
+    
+    async def query_with_mcp_tools(self, 
+                                   prompt: str, 
+                                   mcp_tools: list = None,
+                                   context: str = None,
+                                   system_prompt: str = None,
+                                   temperature: float = 0.7,
+                                   max_tokens: int = 500) -> Dict[str, Any]:
         """
         Query ASI:One with MCP tools available for function calling.
         
@@ -607,15 +531,7 @@ in 2-3 sentences. Focus on the user's goal and the steps taken."""
             request_body["tool_choice"] = "auto"  # Let AI decide when to use tools
         
         try:
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers=self.headers,
-                json=request_body,
-                timeout=30
-            )
-            
-            response.raise_for_status()
-            result = response.json()
+            result = await self._chat(request_body, timeout=30, stage="mcp_tools")
             
             message = result['choices'][0]['message']
             
@@ -633,11 +549,11 @@ in 2-3 sentences. Focus on the user's goal and the steps taken."""
                 "finish_reason": "error"
             }
     
-    def query_agent_with_retry(self, 
-                                prompt: str, 
-                                agent_address: str,
-                                max_wait_seconds: int = 30,
-                                poll_interval: float = 1.0) -> Dict[str, Any]:
+    async def query_agent_with_retry(self, 
+                                     prompt: str, 
+                                     agent_address: str,
+                                     max_wait_seconds: int = 30,
+                                     poll_interval: float = 1.0) -> Dict[str, Any]:
         """
         Query an agent via ASI:One and wait for the complete response.
         
@@ -646,6 +562,9 @@ in 2-3 sentences. Focus on the user's goal and the steps taken."""
         2. Checking if it delegated to an agent
         3. Polling for the agent's response with timeout
         
+        The polls sleep with asyncio.sleep, so other calls on the event loop
+        keep running while the agent works.
+        
         Args:
             prompt: User's query
             agent_address: Target agent address (e.g., Blockscout agent)
@@ -655,7 +574,6 @@ in 2-3 sentences. Focus on the user's goal and the steps taken."""
         Returns:
             Dictionary with the final response from the agent
         """
-        import time
         
         # First, send the query to ASI:One
         messages = [
@@ -672,15 +590,7 @@ in 2-3 sentences. Focus on the user's goal and the steps taken."""
         
         try:
             # Initial query
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers=self.headers,
-                json=request_body,
-                timeout=30
-            )
-            
-            response.raise_for_status()
-            result = response.json()
+            result = await self._chat(request_body, timeout=30, stage="agent")
             
             initial_content = result['choices'][0]['message'].get('content', '')
             
@@ -694,7 +604,7 @@ in 2-3 sentences. Focus on the user's goal and the steps taken."""
                 
                 while (time.time() - start_time) < max_wait_seconds:
                     attempts += 1
-                    time.sleep(poll_interval)
+                    await asyncio.sleep(poll_interval)
                     
                     # Re-query to check if response is complete
                     # We can add the initial response to conversation history
@@ -703,18 +613,10 @@ in 2-3 sentences. Focus on the user's goal and the steps taken."""
                         {"role": "user", "content": "Please provide the complete response."}
                     ]
                     
-                    poll_response = requests.post(
-                        f"{self.base_url}/chat/completions",
-                        headers=self.headers,
-                        json={
-                            **request_body,
-                            "messages": poll_messages
-                        },
-                        timeout=30
-                    )
-                    
-                    poll_response.raise_for_status()
-                    poll_result = poll_response.json()
+                    poll_result = await self._chat({
+                        **request_body,
+                        "messages": poll_messages
+                    }, timeout=30, stage="agent_poll")
                     poll_content = poll_result['choices'][0]['message'].get('content', '')
                     
                     # Check if we got actual data (not another "waiting" message)
@@ -753,47 +655,265 @@ in 2-3 sentences. Focus on the user's goal and the steps taken."""
                 "error": str(e)
             }
     
-    def _fallback_intent_classification(self, query: str) -> Tuple[str, str]:
-        """Fallback intent classification using simple keyword matching."""
-        query_lower = query.lower()
+    async def _chat(self, payload: Dict[str, Any], timeout: int = 30, stage: str = "chat") -> Dict[str, Any]:
+        """
+        Call the chat completions endpoint and return the decoded response.
         
-        if any(word in query_lower for word in ['yield', 'maximize', 'earn', 'strategy']):
-            return 'strategy', 'maximize_yield'
-        elif any(word in query_lower for word in ['swap', 'exchange', 'trade']):
-            return 'operation', 'swap_tokens'
-        elif any(word in query_lower for word in ['supply', 'deposit', 'lend', 'aave']):
-            return 'operation', 'supply_to_aave'
-        elif any(word in query_lower for word in ['?', 'how', 'what', 'why']):
-            return 'question', query_lower.split()[0] if query_lower.split() else 'general'
-        else:
-            return 'strategy', 'general'
+        Args:
+            payload: Chat completion request body
+            timeout: Request timeout in seconds
+            stage: Label for the asi_one_request_duration_seconds histogram
+            
+        Returns:
+            Response JSON
+        """
+        with ASI_ONE_SECONDS.time(stage):
+            response = await self._client().post("/chat/completions", json=payload,
+                                                 timeout=self.pool.timeout(timeout),
+                                                 extensions={"trace": self.pool_stats.async_tracer()})
+            response.raise_for_status()
+            return response.json()
     
-    def _format_context(self, context: Dict[str, Any]) -> str:
-        """Format context dictionary as readable string."""
-        lines = []
-        for key, value in context.items():
-            if isinstance(value, list):
-                lines.append(f"{key}: {', '.join(str(v) for v in value)}")
-            else:
-                lines.append(f"{key}: {value}")
-        return '\n'.join(lines)
+    async def _stream_chat(self, payload: Dict[str, Any], timeout: int = 30,
+                           stage: str = "chat_stream") -> AsyncIterator[str]:
+        """
+        Call the chat completions endpoint in streaming mode.
+        
+        Args:
+            payload: Chat completion request body (without "stream")
+            timeout: Request timeout in seconds
+            stage: Label for the asi_one_request_duration_seconds histogram
+            
+        Yields:
+            Content deltas from the response
+        """
+        with ASI_ONE_SECONDS.time(stage):
+            async with self._client().stream(
+                "POST", "/chat/completions", json={**payload, "stream": True},
+                timeout=self.pool.timeout(timeout), extensions={"trace": self.pool_stats.async_tracer()}
+            ) as response:
+                response.raise_for_status()
+                # Read to the end of the body after [DONE], so the connection
+                # goes back to the pool instead of being closed
+                done = False
+                async for line in response.aiter_lines():
+                    if done or (line.startswith('data:') and line[5:].strip() == '[DONE]'):
+                        done = True
+                        continue
+                    content = self._parse_stream_line(line)
+                    if content:
+                        yield content
+
+
+class ASIOneClient(ASIOneBase):
+    """
+    Blocking client for the ASI:One API.
     
-    def _fallback_workflow(self) -> Dict[str, Any]:
-        """Generate a simple fallback workflow."""
-        return {
-            "nodes": [
-                {
-                    "id": "node-1",
-                    "type": "trigger",
-                    "data": {
-                        "label": "Trigger",
-                        "config": {"triggerType": "manual"}
-                    },
-                    "position": {"x": 100, "y": 100}
-                }
-            ],
-            "edges": []
-        }
+    A thin wrapper around AsyncASIOneClient: each call runs as a coroutine
+    on the client's own event loop, in a background thread started on first
+    use, and the calling thread waits for the result. All threads of a sync
+    server therefore share one async connection pool. In async code (uAgents
+    handlers, the ASGI server) use AsyncASIOneClient directly.
+    """
+    
+    def __init__(self, api_key: str = None, pool: PoolConfig = None):
+        """
+        Initialize ASI:One client.
+        
+        Args:
+            api_key: ASI:One API key. If not provided, reads from environment.
+            pool: Connection pool settings; read from ASI_ONE_* environment variables if not provided
+        """
+        super().__init__(api_key, pool)
+        self.aio = AsyncASIOneClient(self.api_key, self.pool)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        _SYNC_CLIENTS.add(self)
+    
+    def get_intent_and_keyword(self, user_query: str) -> Tuple[str, str]:
+        """
+        Classify user intent and extract key information.
+        
+        Args:
+            user_query: Natural language query from user
+            
+        Returns:
+            Tuple of (intent_type, keyword/subject)
+        """
+        return self._run(self.aio.get_intent_and_keyword(user_query))
+    
+    def generate_workflow_from_intent(self, user_query: str, context: Dict[str, Any] = None,
+                                      prompt: PromptBuild = None) -> Dict[str, Any]:
+        """
+        Generate a complete workflow JSON from natural language description.
+        
+        Args:
+            user_query: User's workflow description
+            context: Context from MeTTa knowledge graph (node types, strategies, token addresses, etc.)
+            prompt: Prompt already rendered by build_workflow_prompt
+            
+        Returns:
+            Workflow JSON structure
+        """
+        return self._run(self.aio.generate_workflow_from_intent(user_query, context, prompt))
+    
+    def explain_workflow(self, workflow_json: Dict[str, Any]) -> str:
+        """
+        Generate a human-readable explanation of a workflow.
+        
+        Args:
+            workflow_json: The workflow structure
+            
+        Returns:
+            Plain English explanation
+        """
+        return self._run(self.aio.explain_workflow(workflow_json))
+    
+    def generate_workflow_stream(self, user_query: str, context: Dict[str, Any] = None,
+                                 prompt: PromptBuild = None) -> Iterator[str]:
+        """
+        Stream the raw model output for workflow generation.
+        
+        Args:
+            user_query: User's workflow description
+            context: Context from MeTTa knowledge graph
+            prompt: Prompt already rendered by build_workflow_prompt
+            
+        Yields:
+            Content chunks of the model response
+        """
+        return self._iterate(self.aio.generate_workflow_stream(user_query, context, prompt))
+    
+    def explain_workflow_stream(self, workflow_json: Dict[str, Any]) -> Iterator[str]:
+        """
+        Stream a human-readable explanation of a workflow token by token.
+        
+        Args:
+            workflow_json: The workflow structure
+            
+        Yields:
+            Explanation tokens as they arrive
+        """
+        return self._iterate(self.aio.explain_workflow_stream(workflow_json))
+    
+    def query_with_mcp_tools(self, 
+                             prompt: str, 
+                             mcp_tools: list = None,
+                             context: str = None,
+                             system_prompt: str = None,
+                             temperature: float = 0.7,
+                             max_tokens: int = 500) -> Dict[str, Any]:
+        """
+        Query ASI:One with MCP tools available for function calling.
+        
+        See AsyncASIOneClient.query_with_mcp_tools.
+        
+        Returns:
+            Dictionary with response text and any tool calls made
+        """
+        return self._run(self.aio.query_with_mcp_tools(
+            prompt, mcp_tools, context, system_prompt, temperature, max_tokens
+        ))
+    
+    def query_agent_with_retry(self, 
+                                prompt: str, 
+                                agent_address: str,
+                                max_wait_seconds: int = 30,
+                                poll_interval: float = 1.0) -> Dict[str, Any]:
+        """
+        Query an agent via ASI:One and wait for the complete response.
+        
+        See AsyncASIOneClient.query_agent_with_retry.
+        
+        Returns:
+            Dictionary with the final response from the agent
+        """
+        return self._run(self.aio.query_agent_with_retry(prompt, agent_address, max_wait_seconds, poll_interval))
+    
+    def pool_info(self) -> Dict[str, Any]:
+        """Connection pool counters and settings, for health checks."""
+        return self.aio.pool_info()
+    
+    def close(self) -> None:
+        """Close the connection pool and stop the client's event loop."""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self.aio.aclose(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+    
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the client's event loop, starting its thread on first use."""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="asi-one-client", daemon=True).start()
+                self._loop = loop
+            return self._loop
+    
+    def _after_fork(self) -> None:
+        """
+        Drop state inherited from the parent process.
+        
+        Only the forking thread survives a fork, so the loop thread is gone,
+        the lock may be held forever and the pooled connections belong to the
+        parent. The next call starts a fresh loop and pool in this process.
+        """
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self.aio = AsyncASIOneClient(self.api_key, self.pool)
+    
+    def _run(self, coroutine) -> Any:
+        """
+        Run a coroutine on the client's event loop and wait for its result.
+        
+        The coroutine runs in a copy of the caller's context, so context
+        variables such as the metrics endpoint label carry over.
+        """
+        loop = self._event_loop()
+        context = contextvars.copy_context()
+        result: concurrent.futures.Future = concurrent.futures.Future()
+        
+        def start():
+            task = context.run(loop.create_task, coroutine)
+            task.add_done_callback(lambda done: _copy_outcome(done, result))
+        
+        loop.call_soon_threadsafe(start)
+        return result.result()
+    
+    def _iterate(self, stream: AsyncIterator[str]) -> Iterator[str]:
+        """Iterate an async generator of the async client from this thread."""
+        try:
+            while True:
+                try:
+                    yield self._run(stream.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Closes the HTTP response if the caller stops early
+            self._run(stream.aclose())
+
+
+# Blocking clients whose event loop must be restarted in a forked child
+_SYNC_CLIENTS: "weakref.WeakSet[ASIOneClient]" = weakref.WeakSet()
+
+
+def _reset_after_fork() -> None:
+    for client in list(_SYNC_CLIENTS):
+        client._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _copy_outcome(task: asyncio.Task, result: concurrent.futures.Future) -> None:
+    if task.cancelled():
+        result.cancel()
+    elif task.exception() is not None:
+        result.set_exception(task.exception())
+    else:
+        result.set_result(task.result())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,252 @@
+"""
+Deterministic Fast Path
+
+The rule-based generator (generate_workflow_from_query in server.py)
+builds swap, supply, borrow and transfer workflows without any network
+calls. This module scores how well it understood a query, so that simple
+requests it fully understood can be answered directly instead of going
+through intent classification, ASI:One generation and explanation.
+
+The score starts at 1.0 and is multiplied down for everything the rule
+generator cannot express or may have got wrong (conditions and schedules,
+chains it does not know, tokens it did not pick up, missing recipients,
+...). Every penalty is recorded as a reason so the threshold can be tuned
+from the responses.
+"""
+
+import copy
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.response_cache import DEFAULT_TOKENS, normalize_query
+
+
+# Words that trigger each operation in the rule-based generator
+OPERATION_WORDS = {
+    "swap": ("swap", "exchange", "trade", "convert"),
+    "supply": ("supply", "lend", "deposit", "aave"),
+    "borrow": ("borrow",),
+    "transfer": ("send", "transfer"),
+}
+
+# Knowledge graph operation keyword reported as the intent keyword
+OPERATION_KEYWORDS = {
+    "swap": "swap_tokens",
+    "supply": "supply_to_aave",
+    "borrow": "borrow_from_aave",
+    "transfer": "transfer_tokens",
+}
+
+# Requests the rule-based generator cannot express: conditions, schedules,
+# strategies, AI steps and operations it has no node for
+UNSUPPORTED_WORDS = {
+    "if", "when", "whenever", "unless", "until", "once", "after", "before",
+    "every", "daily", "weekly", "monthly", "hourly", "schedule", "recurring",
+    "price", "above", "below", "drops", "falls", "rises", "reaches", "exceeds",
+    "maximize", "maximise", "optimize", "optimise", "best", "yield", "earn", "strategy",
+    "rebalance", "leverage", "loop", "hedge", "dca", "average",
+    "monitor", "alert", "notify", "analyze", "analyse", "ai", "agent", "predict",
+    "withdraw", "repay", "bridge", "stake", "unstake", "claim", "mint", "burn",
+    "split", "half", "all", "percent",
+}
+
+# Chains the rule-based generator can detect and resolve addresses on
+RULE_CHAINS = {"basesepolia", "sepolia", "ethereum", "base"}
+
+
+@dataclass
+class FastPathPlan:
+    """The rule-based workflow for a query and how confident we are in it."""
+    workflow: Optional[Dict[str, Any]]
+    confidence: float
+    operations: List[str] = field(default_factory=list)
+    chain: str = ""
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def intent(self) -> str:
+        return "operation"
+
+    @property
+    def keyword(self) -> str:
+        return OPERATION_KEYWORDS.get(self.operations[0], "") if self.operations else ""
+
+    def info(self) -> Dict[str, Any]:
+        """Summary for API responses and logs."""
+        return {
+            "confidence": self.confidence,
+            "operations": self.operations,
+            "reasons": self.reasons,
+        }
+
+
+def plan_fast_path(user_query: str, workflow: Optional[Dict[str, Any]],
+                   known_tokens: Iterable[str] = DEFAULT_TOKENS) -> FastPathPlan:
+    """
+    Score a rule-based workflow against the query it was generated from.
+
+    Amounts and the transfer recipient are filled in from the query, since
+    the rule-based generator leaves them blank.
+
+    Args:
+        user_query: Raw user query
+        workflow: Output of generate_workflow_from_query (may be None)
+        known_tokens: Token symbols to recognize in the query
+
+    Returns:
+        FastPathPlan with the completed workflow and a confidence in [0, 1]
+    """
+    normalized = normalize_query(user_query, known_tokens)
+    words = normalized.key.split()
+
+    operations = _query_operations(words)
+    if not workflow or not operations:
+        return FastPathPlan(workflow=None, confidence=0.0, reasons=["no supported operation"])
+
+    workflow = copy.deepcopy(workflow)
+    steps = [node for node in workflow.get("nodes", []) if node.get("type") != "trigger"]
+    reasons = []
+    confidence = 1.0
+
+    def penalize(factor: float, reason: str) -> None:
+        nonlocal confidence
+        confidence *= factor
+        reasons.append(reason)
+
+    unsupported = sorted({word for word in words if word in UNSUPPORTED_WORDS})
+    if unsupported:
+        penalize(0.2, f"unsupported: {', '.join(unsupported)}")
+
+    # The generator always emits swap -> supply -> borrow -> transfer and
+    # matches keywords as substrings, so check it built what was asked for
+    built = [_step_operation(node) for node in steps]
+    if built != operations:
+        penalize(0.3, f"built {' -> '.join(built)} for {' -> '.join(operations)}")
+
+    chains = list(dict.fromkeys(normalized.chains))
+    chain = chains[0] if chains else ""
+    if len(chains) > 1:
+        penalize(0.3, f"multiple chains: {', '.join(chains)}")
+    elif chain and chain not in RULE_CHAINS:
+        penalize(0.2, f"chain not supported by rules: {chain}")
+    elif not chain:
+        penalize(0.9, "no chain named")
+
+    for node in steps:
+        node_chain = node["data"]["config"].get("chain")
+        if chain and node_chain and node_chain != chain:
+            penalize(0.4, f"{node['type']} node on {node_chain}, query names {chain}")
+            break
+
+    _check_tokens(normalized.tokens, operations, steps, penalize)
+    _fill_amounts(normalized.amounts, steps, penalize)
+
+    if "transfer" in operations:
+        if len(normalized.addresses) == 1:
+            steps[-1]["data"]["config"]["recipient"] = normalized.addresses[0]
+        else:
+            penalize(0.5, "no single recipient address")
+
+    return FastPathPlan(
+        workflow=workflow,
+        confidence=round(confidence, 4),
+        operations=operations,
+        chain=chain or (steps[0]["data"]["config"].get("chain", "") if steps else ""),
+        reasons=reasons,
+    )
+
+
+def explain_fast_path(plan: FastPathPlan) -> str:
+    """
+    Describe a fast-path workflow without calling ASI:One.
+
+    Args:
+        plan: FastPathPlan with a workflow
+
+    Returns:
+        Plain English explanation
+    """
+    steps = []
+    for node in plan.workflow.get("nodes", []):
+        if node.get("type") == "trigger":
+            continue
+        config = node["data"]["config"]
+        label = node["data"]["label"]
+        step = label[0].lower() + label[1:]
+        if config.get("amount"):
+            step += f" (amount: {config['amount']})"
+        if config.get("recipient"):
+            step += f" to {config['recipient']}"
+        steps.append(step)
+
+    where = f" on {plan.chain}" if plan.chain else ""
+    return f"When you run it, this workflow will {', then '.join(steps)}{where}."
+
+
+def _query_operations(words: List[str]) -> List[str]:
+    """Operations named in the query, in the order they are named."""
+    operations = []
+    for word in words:
+        for operation, triggers in OPERATION_WORDS.items():
+            if word in triggers and operation not in operations:
+                operations.append(operation)
+    return operations
+
+
+def _step_operation(node: Dict[str, Any]) -> str:
+    if node.get("type") == "aave":
+        return node["data"]["config"].get("action", "supply")
+    return node.get("type", "")
+
+
+def _check_tokens(tokens: List[str], operations: List[str], steps: List[Dict[str, Any]], penalize) -> None:
+    """Check the generator picked up the tokens named in the query."""
+    tokens = list(dict.fromkeys(tokens))
+    swapped = ""
+
+    for node in steps:
+        config = node["data"]["config"]
+        symbol = config.get("asset") or config.get("_tokenSymbol") or config.get("token")
+        if swapped and _consumes_input(node) and symbol != swapped:
+            penalize(0.3, f"{node['type']} uses {symbol} after a swap to {swapped}")
+
+        if node["type"] == "swap":
+            swapped = config.get("_outputSymbol", "")
+            if len(tokens) < 2:
+                penalize(0.4, "swap does not name both tokens")
+            elif node["data"]["label"] != f"Swap {tokens[0]} to {tokens[1]}":
+                penalize(0.3, f"{node['data']['label']} for {tokens[0]} -> {tokens[1]}")
+            if not config.get("fromToken") or not config.get("toToken"):
+                penalize(0.1, "swap token address unknown on this chain")
+        elif "swap" not in operations:
+            if not tokens:
+                penalize(0.6, f"{node['type']} token not named, defaulted to {symbol}")
+            elif symbol != tokens[0]:
+                penalize(0.3, f"{node['type']} uses {symbol}, query names {tokens[0]}")
+
+        if node["type"] == "transfer" and not (config.get("chain") and config.get("token", "").startswith("0x")):
+            penalize(0.1, "transfer token address unknown on this chain")
+
+    used = 2 if "swap" in operations else 1
+    if len(tokens) > used:
+        penalize(0.6, f"unused tokens: {', '.join(tokens[used:])}")
+
+
+def _consumes_input(node: Dict[str, Any]) -> bool:
+    """Whether a node spends the token the node before it produced (supply, transfer)."""
+    if node.get("type") == "aave":
+        return node["data"]["config"].get("action", "supply") == "supply"
+    return node.get("type") == "transfer"
+
+
+def _fill_amounts(amounts: List[str], steps: List[Dict[str, Any]], penalize) -> None:
+    """Put the query's amounts into the nodes' amount fields."""
+    if not amounts:
+        penalize(0.9, "no amount")
+        return
+
+    if len(amounts) > len(steps):
+        penalize(0.7, "more amounts than steps")
+
+    for node, amount in zip(steps, amounts):
+        node["data"]["config"]["amount"] = amount
@@ -0,0 +1,173 @@
+"""
+Pooled HTTP Transport
+
+Settings and statistics for the keep-alive connection pools of the ASI:One
+clients. Each client holds one httpx pool for its lifetime, so only the
+first request to api.asi1.ai (and the first after an idle connection
+expires) pays for the TCP and TLS handshakes; later requests reuse an open
+connection. With HTTP/2 (ASI_ONE_HTTP2=1, needs the h2 package) concurrent
+requests share a single connection.
+
+Settings come from the environment:
+- ASI_ONE_CONNECT_TIMEOUT: seconds to open a connection (default 5)
+- ASI_ONE_READ_TIMEOUT: seconds to wait for response data; by default each
+  call keeps its own timeout (30s for generation, 20s for explanations)
+- ASI_ONE_MAX_CONNECTIONS: connections open at once (default 20)
+- ASI_ONE_MAX_KEEPALIVE: idle connections kept open (default 10)
+- ASI_ONE_KEEPALIVE_EXPIRY: seconds an idle connection is kept (default 60)
+- ASI_ONE_HTTP2: "1" to negotiate HTTP/2
+
+Every request carries an httpcore trace hook, so the pool counts requests
+and new connections, and the handshakes are recorded in the
+asi_one_connect_duration_seconds histogram (stage "tcp" or "tls").
+"""
+
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from utils.metrics import ASI_ONE_CONNECT_SECONDS
+
+
+# httpcore trace events that end a handshake, and their histogram stage
+HANDSHAKES = {
+    "connection.connect_tcp": "tcp",
+    "connection.start_tls": "tls",
+}
+
+
+def http2_available() -> bool:
+    """Whether the h2 package httpx needs for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """Connection pool limits, timeouts and protocol for one HTTP client."""
+    connect_timeout: float = 5.0
+    # None: each call's own timeout
+    read_timeout: Optional[float] = None
+    max_connections: int = 20
+    max_keepalive: int = 10
+    keepalive_expiry: float = 60.0
+    http2: bool = False
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        """Read the settings from the ASI_ONE_* environment variables."""
+        http2 = os.getenv("ASI_ONE_HTTP2", "").lower() in ("1", "true", "yes")
+        if http2 and not http2_available():
+            print("⚠️  ASI_ONE_HTTP2 is set but the h2 package is missing (pip install h2); using HTTP/1.1")
+            http2 = False
+        return cls(
+            connect_timeout=_env_float("ASI_ONE_CONNECT_TIMEOUT", cls.connect_timeout),
+            read_timeout=_env_float("ASI_ONE_READ_TIMEOUT", None),
+            max_connections=int(os.getenv("ASI_ONE_MAX_CONNECTIONS", cls.max_connections)),
+            max_keepalive=int(os.getenv("ASI_ONE_MAX_KEEPALIVE", cls.max_keepalive)),
+            keepalive_expiry=_env_float("ASI_ONE_KEEPALIVE_EXPIRY", cls.keepalive_expiry),
+            http2=http2,
+        )
+
+    def limits(self) -> httpx.Limits:
+        """Pool limits for httpx.Client / httpx.AsyncClient."""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self, seconds: float) -> httpx.Timeout:
+        """
+        Timeouts for one call.
+
+        Args:
+            seconds: The call's own timeout, used unless read_timeout is set
+        """
+        read = self.read_timeout or seconds
+        return httpx.Timeout(read, connect=self.connect_timeout)
+
+
+class PoolStats:
+    """Requests and new connections of one pool, counted through httpcore trace hooks."""
+
+    def __init__(self, config: PoolConfig):
+        self.config = config
+        self.requests = 0
+        self.connections = 0
+        self.handshake_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def tracer(self) -> Callable[[str, Dict[str, Any]], None]:
+        """Trace hook for one request of a sync client (extensions={"trace": ...})."""
+        started: Dict[str, float] = {}
+        with self._lock:
+            self.requests += 1
+
+        def trace(event: str, info: Dict[str, Any]) -> None:
+            self._event(started, event)
+
+        return trace
+
+    def async_tracer(self) -> Callable[[str, Dict[str, Any]], Awaitable[None]]:
+        """Trace hook for one request of an async client."""
+        started: Dict[str, float] = {}
+        with self._lock:
+            self.requests += 1
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            self._event(started, event)
+
+        return trace
+
+    def info(self, client: Optional[Any] = None) -> Dict[str, Any]:
+        """
+        Counters, the pool's current connections and its settings, for health checks.
+
+        Args:
+            client: The httpx client, to count its open and idle connections
+        """
+        with self._lock:
+            requests, connections, handshakes = self.requests, self.connections, self.handshake_seconds
+        info = {
+            "requests": requests,
+            "connectionsOpened": connections,
+            "reused": max(0, requests - connections),
+            "reuseRate": round(1 - connections / requests, 4) if requests else 0.0,
+            "handshakeMs": round(handshakes * 1000, 1),
+            "settings": asdict(self.config),
+        }
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        if pool is not None:
+            # httpcore's pool; not public API, so only read when present
+            open_connections = list(getattr(pool, "connections", []))
+            info["open"] = len(open_connections)
+            info["idle"] = sum(1 for connection in open_connections if connection.is_idle())
+        return info
+
+    def _event(self, started: Dict[str, float], event: str) -> None:
+        step, _, phase = event.rpartition(".")
+        stage = HANDSHAKES.get(step)
+        if stage is None:
+            return
+        if phase == "started":
+            started[step] = time.perf_counter()
+        elif phase in ("complete", "failed") and step in started:
+            seconds = time.perf_counter() - started.pop(step)
+            ASI_ONE_CONNECT_SECONDS.observe(seconds, stage, "ok" if phase == "complete" else "error")
+            with self._lock:
+                self.handshake_seconds += seconds
+                if stage == "tcp" and phase == "complete":
+                    self.connections += 1
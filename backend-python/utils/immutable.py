@@ -0,0 +1,55 @@
+"""
+Immutable Containers
+
+Read-only views of query results that are shared between requests, so
+one caller cannot corrupt the data every other caller sees.
+
+FrozenDict is a dict subclass and tuples are used for sequences, so
+frozen values still serialize with json.dumps / jsonify unchanged.
+"""
+
+from typing import Any
+
+
+class FrozenDict(dict):
+    """A dict that raises TypeError on any attempt to modify it."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is immutable")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """
+    Recursively convert dicts to FrozenDicts and lists to tuples.
+
+    Args:
+        value: Value to freeze
+
+    Returns:
+        An immutable copy of value (other objects are returned as-is)
+    """
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
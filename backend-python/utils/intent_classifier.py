@@ -0,0 +1,328 @@
+"""
+Local Intent Classifier
+
+Classifies a workflow request into one of the four intents used by the
+generation pipeline (strategy, operation, question, modify) without a
+chat-completion round trip.
+
+Features are stemmed unigrams and bigrams. A request naming several
+steps ("swap ... then supply ...", "every monday buy ...", "if the price
+drops sell ...") is a strategy, so the operation score is divided by the
+number of distinct steps it names. Each knowledge graph operation
+and strategy is a class whose features come from its keyword and
+description, plus a few synonyms per operation verb; question and modify
+are classes built from cue words. Features are weighted by how few classes
+share them (IDF), so "swap" counts for more than "token".
+
+Each intent is scored by its best-matching class, and the intent scores
+go through a softmax that includes a "no match" logit, so a query with
+nothing recognizable gets low confidence rather than a confident guess.
+The softmax temperature and the "no match" logit are fitted once at
+construction against CALIBRATION_EXAMPLES (held out from the features),
+which keeps the reported confidence close to the observed accuracy.
+"""
+
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+from utils.response_cache import CHAIN_NAMES, DEFAULT_TOKENS, normalize_query
+
+
+INTENTS = ("strategy", "operation", "question", "modify")
+
+STOPWORDS = {
+    "a", "an", "the", "to", "for", "of", "on", "in", "into", "from", "with", "by", "at",
+    "and", "or", "my", "me", "i", "it", "its", "is", "be", "using", "use", "via",
+    "want", "would", "like", "please", "some", "any", "this", "that", "one", "another",
+    "<amount>", "<address>",
+    # Tokens and chains are parameters of a request, not evidence of its intent
+    *(symbol.lower() for symbol in DEFAULT_TOKENS),
+    *CHAIN_NAMES,
+}
+
+# Synonyms for the leading verb of an operation keyword ("swap_tokens" -> "swap")
+OPERATION_SYNONYMS = {
+    "swap": ["swap", "exchange", "trade", "convert", "sell", "buy"],
+    "supply": ["supply", "deposit", "lend", "aave"],
+    "borrow": ["borrow", "loan", "against collateral"],
+    "withdraw": ["withdraw", "redeem", "take out"],
+    "repay": ["repay", "pay back", "debt"],
+    "transfer": ["transfer", "send", "pay"],
+    "check": ["condition", "threshold", "compare"],
+    "ai": ["ai", "decide", "decision"],
+    "connect": ["mcp", "external data", "tool"],
+}
+
+# Words that mark a whole strategy rather than a single operation
+STRATEGY_CUES = ["maximize", "optimize", "strategy", "yield", "earn", "apy", "automatically",
+                 "rebalance", "dca", "dollar cost average", "portfolio", "best"]
+
+# Words that schedule a request, turning a single operation into a strategy
+SCHEDULE_CUES = ["every", "daily", "weekly", "monthly", "hourly", "recurring", "schedule",
+                 "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# Words that mark a conditional strategy (one whose sequence has a condition node)
+CONDITION_CUES = ["if", "when", "whenever", "above", "below", "drop", "fall", "rise", "reach", "price"]
+
+QUESTION_CUES = ["how", "what", "why", "which", "who", "explain", "does", "should",
+                 "difference", "mean", "tell", "<question>"]
+
+MODIFY_CUES = ["modify", "change", "update", "edit", "remove", "delete", "replace", "instead",
+               "increase", "decrease", "existing", "current workflow", "add step", "add node"]
+
+# Labelled phrasings used only to fit the calibration. The ambiguous ones
+# matter most: they are what keeps the confidence from saturating at 1.0
+CALIBRATION_EXAMPLES = [
+    ("swap 1 eth for usdc on base", "operation"),
+    ("convert my dai into eth", "operation"),
+    ("trade usdt to weth", "operation"),
+    ("deposit 500 usdc into aave", "operation"),
+    ("lend my eth on aave", "operation"),
+    ("borrow 100 dai", "operation"),
+    ("take out a loan of usdc against my eth", "operation"),
+    ("send 20 usdc to my friend", "operation"),
+    ("pay back my aave debt", "operation"),
+    ("withdraw my usdc from aave", "operation"),
+    ("maximize my usdc yield", "strategy"),
+    ("earn the best apy on my stablecoins", "strategy"),
+    ("dollar cost average into eth every week", "strategy"),
+    ("rebalance my portfolio when prices move", "strategy"),
+    ("swap eth to usdc and supply it to aave for yield", "strategy"),
+    ("automatically optimize my lending position", "strategy"),
+    ("buy eth with usdc every monday", "strategy"),
+    ("if eth falls below 2000 swap it to usdc", "strategy"),
+    ("swap eth to usdc then lend it on aave", "strategy"),
+    ("supply eth as collateral and borrow usdc", "strategy"),
+    ("can you swap 1 eth to usdc", "operation"),
+    ("what's the best way to earn yield on eth?", "question"),
+    ("what is aave?", "question"),
+    ("how does a swap node work", "question"),
+    ("why did my transaction fail", "question"),
+    ("explain the difference between supply and borrow", "question"),
+    ("change the amount to 5 eth", "modify"),
+    ("replace the swap with a transfer", "modify"),
+    ("update my current workflow to use base", "modify"),
+    ("remove the last step", "modify"),
+]
+
+_WORD = re.compile(r"[a-z0-9<>]+")
+
+
+def _stem(word: str) -> str:
+    """Strip common English suffixes ("supplying" -> "supply", "tokens" -> "token")."""
+    for suffix in ("ing", "ed", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith("ss"):
+            word = word[:-len(suffix)]
+            if suffix != "s" and word[-1] == word[-2]:
+                word = word[:-1]
+            break
+    return word
+
+
+def extract_features(text: str) -> List[str]:
+    """
+    Extract stemmed unigram and bigram features from text.
+
+    Args:
+        text: Query, description or cue phrase
+
+    Returns:
+        Features in order of appearance (unigrams, then bigrams)
+    """
+    normalized = normalize_query(text).key
+    if "?" in text:
+        normalized += " <question>"
+    words = [_stem(word) for word in _WORD.findall(normalized) if word not in STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+@dataclass
+class IntentPrediction:
+    """Result of classifying one query."""
+    intent: str
+    keyword: str
+    confidence: float
+    matched: List[str] = field(default_factory=list)
+    source: str = "local"
+
+    def info(self) -> Dict[str, Any]:
+        """Summary for API responses and logs."""
+        return {
+            "intent": self.intent,
+            "keyword": self.keyword,
+            "keywords": self.matched,
+            "confidence": self.confidence,
+            "source": self.source,
+        }
+
+
+class IntentClassifier:
+    """
+    Weighted keyword/n-gram intent classifier built from the knowledge graph.
+
+    Usage:
+        classifier = IntentClassifier.from_context(context)
+        prediction = classifier.classify("swap 1 ETH to USDC on base")
+        prediction.intent, prediction.keyword, prediction.confidence
+    """
+
+    def __init__(self, operations: Sequence[Mapping[str, str]], strategies: Sequence[Mapping[str, str]]):
+        """
+        Build the feature index and fit the confidence calibration.
+
+        Args:
+            operations: {"keyword", "description"} rows from get_all_operations
+            strategies: {"name", "description"} rows from get_all_strategies
+        """
+        classes: List[Tuple[str, str, Dict[str, float]]] = []
+        # Single-word feature -> step it names, for counting steps
+        self.steps: Dict[str, str] = {}
+        for cue in SCHEDULE_CUES:
+            self.steps[_stem(cue)] = "schedule"
+        for cue in CONDITION_CUES:
+            self.steps[_stem(cue)] = "condition"
+
+        for operation in operations:
+            keyword = operation["keyword"]
+            verb = keyword.split("_")[0]
+            for word in [verb, *OPERATION_SYNONYMS.get(verb, [])]:
+                if " " not in word:
+                    self.steps[_stem(word)] = verb
+            features = self._weigh([
+                (keyword.replace("_", " "), 2.0),
+                (operation.get("description", ""), 1.0),
+                *((synonym, 1.5) for synonym in OPERATION_SYNONYMS.get(verb, [])),
+            ])
+            classes.append(("operation", keyword, features))
+
+        for strategy in strategies:
+            name = strategy["name"]
+            # Strategy names are weighted below operation keywords so a lone
+            # verb ("swap ...") reads as the operation, not a strategy using it
+            features = self._weigh([
+                (name.replace("_", " "), 0.75),
+                (strategy.get("description", ""), 0.75),
+                *((cue, 1.0) for cue in STRATEGY_CUES + SCHEDULE_CUES),
+                *((cue, 2.0) for cue in CONDITION_CUES if "condition" in strategy.get("sequence", "")),
+            ])
+            classes.append(("strategy", name, features))
+
+        classes.append(("question", "", self._weigh([(cue, 2.0) for cue in QUESTION_CUES])))
+        classes.append(("modify", "", self._weigh([(cue, 2.0) for cue in MODIFY_CUES])))
+
+        # IDF across classes: a feature shared by every class carries no signal
+        document_frequency: Dict[str, int] = defaultdict(int)
+        for _, _, features in classes:
+            for feature in features:
+                document_frequency[feature] += 1
+
+        self.labels = [(intent, keyword) for intent, keyword, _ in classes]
+        self.index: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for position, (_, _, features) in enumerate(classes):
+            for feature, weight in features.items():
+                idf = math.log(1 + len(classes) / document_frequency[feature])
+                self.index[feature].append((position, weight * idf))
+
+        self.temperature, self.no_match = self._calibrate(CALIBRATION_EXAMPLES)
+
+    @classmethod
+    def from_context(cls, context: Mapping[str, Any]) -> "IntentClassifier":
+        """Build a classifier from a context snapshot's operations and strategies."""
+        return cls(context.get("operations") or [], context.get("strategies") or [])
+
+    def classify(self, user_query: str) -> IntentPrediction:
+        """
+        Classify a query.
+
+        Args:
+            user_query: Raw user query
+
+        Returns:
+            IntentPrediction with the calibrated confidence of the chosen intent
+        """
+        scores, matched = self._scores(user_query)
+        intent_scores, best_class = self._intent_scores(scores, matched)
+        probabilities = self._softmax(intent_scores)
+
+        intent, confidence = max(zip(INTENTS, probabilities), key=lambda item: item[1])
+        keyword = self.labels[best_class[intent]][1] if intent in best_class else ""
+        if intent == "question":
+            words = user_query.lower().split()
+            keyword = words[0] if words else "general"
+
+        return IntentPrediction(
+            intent=intent,
+            keyword=keyword,
+            confidence=round(confidence, 4),
+            matched=matched,
+        )
+
+    def _scores(self, user_query: str) -> Tuple[List[float], List[str]]:
+        scores = [0.0] * len(self.labels)
+        matched = []
+        for feature in dict.fromkeys(extract_features(user_query)):
+            postings = self.index.get(feature)
+            if postings:
+                matched.append(feature)
+                for position, weight in postings:
+                    scores[position] += weight
+        return scores, matched
+
+    def _intent_scores(self, scores: List[float], matched: List[str]) -> Tuple[List[float], Dict[str, int]]:
+        """Score each intent by its best class; also return that class's index."""
+        best: Dict[str, int] = {}
+        for position, (intent, _) in enumerate(self.labels):
+            if intent not in best or scores[position] > scores[best[intent]]:
+                best[intent] = position
+
+        intent_scores = {intent: scores[position] for intent, position in best.items()}
+        steps = len({self.steps[feature] for feature in matched if feature in self.steps})
+        if steps > 1 and "operation" in intent_scores:
+            intent_scores["operation"] /= steps
+
+        return [intent_scores.get(intent, 0.0) for intent in INTENTS], best
+
+    def _softmax(self, intent_scores: List[float], temperature: float = None,
+                 no_match: float = None) -> List[float]:
+        temperature = temperature or self.temperature
+        no_match = self.no_match if no_match is None else no_match
+        # Intents with no matching feature at all get no probability; the
+        # "no match" logit is what absorbs uncertainty when little matched
+        logits = [score / temperature if score > 0 else -math.inf for score in intent_scores] + [no_match]
+        peak = max(logits)
+        exps = [math.exp(logit - peak) for logit in logits]
+        total = sum(exps)
+        return [value / total for value in exps[:-1]]
+
+    def _calibrate(self, examples: Iterable[Tuple[str, str]]) -> Tuple[float, float]:
+        """Fit the softmax temperature and "no match" logit by minimizing log loss."""
+        labelled = []
+        for query, intent in examples:
+            intent_scores, _ = self._intent_scores(*self._scores(query))
+            labelled.append((intent_scores, INTENTS.index(intent)))
+
+        best, best_loss = (1.0, 0.0), math.inf
+        # The grid starts at 1.0: with this few examples a sharper softmax
+        # just memorizes them and reports 1.0 for everything
+        for temperature in (step * 0.25 for step in range(4, 41)):
+            for no_match in (step * 0.5 for step in range(-4, 11)):
+                loss = -sum(
+                    math.log(max(self._softmax(scores, temperature, no_match)[target], 1e-9))
+                    for scores, target in labelled
+                )
+                if loss < best_loss:
+                    best, best_loss = (temperature, no_match), loss
+
+        return best
+
+    @staticmethod
+    def _weigh(sources: Iterable[Tuple[str, float]]) -> Dict[str, float]:
+        """Merge the features of several texts, keeping the highest weight per feature."""
+        features: Dict[str, float] = {}
+        for text, weight in sources:
+            for feature in extract_features(text):
+                features[feature] = max(features.get(feature, 0.0), weight)
+        return features
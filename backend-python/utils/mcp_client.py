@@ -6,14 +6,23 @@ Supports:
 - Official Blockscout MCP server (https://mcp.blockscout.com/mcp)
 - Official CoinGecko MCP server (https://mcp.pro-api.coingecko.com/mcp)
 - Direct API fallbacks for reliability
+
+All HTTP calls go through a pooled httpx.AsyncClient, so tool calls do
+not block the event loop they run on.
 """
 
-import requests
+import httpx
 from typing import Dict, Any, List, Optional
 import json
 import asyncio
 from contextlib import AsyncExitStack
 
+from utils.metrics import MCP_TOOL_SECONDS
+
+
+# Tool results are strings; these prefixes mark a failed call
+ERROR_PREFIXES = ("Error", "HTTP Error", "Unknown", "Not connected", "Tool definition not found", "No valid result")
+
 
 class MCPClient:
     """
@@ -30,6 +39,10 @@ class MCPClient:
         self.exit_stack = AsyncExitStack()
         self.initialized = False
         
+        # Pooled HTTP client, bound to the event loop that created it
+        self._http: Optional[httpx.AsyncClient] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        
         # Tool definitions and mappings
         self.tool_definitions: Dict[str, Dict[str, Any]] = {}
         self.tool_server_map: Dict[str, str] = {}
@@ -42,6 +55,20 @@ class MCPClient:
         # Initialize fallback tools (will be replaced if MCP connection succeeds)
         self._setup_blockscout_direct_api()
     
+    def _client(self) -> httpx.AsyncClient:
+        """
+        Get the pooled HTTP client for the running event loop.
+        
+        httpx connections cannot be shared across event loops, and
+        MCPClientSync runs each call in a fresh loop, so a new client is
+        created whenever the loop changes.
+        """
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http.is_closed or self._http_loop is not loop:
+            self._http = httpx.AsyncClient()
+            self._http_loop = loop
+        return self._http
+    
     async def initialize(self) -> None:
         """Initialize connections to all MCP servers."""
         if self.initialized:
@@ -77,17 +104,18 @@ class MCPClient:
                 "params": {}
             }
             
-            response = requests.post(
+            async with self._client().stream(
+                "POST",
                 self.blockscout_mcp_url,
                 json=list_tools_request,
                 headers=headers,
-                timeout=30,
-                stream=True  # Enable streaming for SSE
-            )
-            
-            if response.status_code == 200:
+                timeout=30
+            ) as response:
+                status_code = response.status_code
                 # Parse SSE stream to extract JSON-RPC result
-                result = self._parse_sse_stream(response)
+                result = await self._parse_sse_stream(response) if status_code == 200 else None
+            
+            if status_code == 200:
                 
                 if result and 'result' in result and 'tools' in result['result']:
                     tools = result['result']['tools']
@@ -122,13 +150,13 @@ class MCPClient:
                 else:
                     raise Exception("No tools in MCP response")
             else:
-                raise Exception(f"HTTP {response.status_code}")
+                raise Exception(f"HTTP {status_code}")
             
         except Exception as e:
             print(f"⚠️  Blockscout MCP unavailable: {e}")
             print(f"   Using direct API fallback")
     
-    def _parse_sse_stream(self, response) -> dict:
+    async def _parse_sse_stream(self, response: httpx.Response) -> dict:
         """
         Parse Server-Sent Events stream and extract final JSON-RPC result.
         
@@ -138,7 +166,7 @@ class MCPClient:
         """
         final_result = None
         
-        for line in response.iter_lines(decode_unicode=True):
+        async for line in response.aiter_lines():
             if not line:
                 continue
             
@@ -169,21 +197,22 @@ class MCPClient:
                 'User-Agent': 'Mozilla/5.0 (compatible; DeFi-Workflow/1.0)'
             }
             
-            # Simple GET request with timeout
-            response = requests.get(
+            # Simple GET request with timeout (only the headers are read)
+            async with self._client().stream(
+                "GET",
                 self.coingecko_mcp_url,
                 headers=headers,
-                timeout=10,
-                stream=True
-            )
+                timeout=10
+            ) as response:
+                status_code = response.status_code
             
-            if response.status_code == 200:
+            if status_code == 200:
                 print(f"✅ Connected to CoinGecko MCP (using HTTP fallback)")
                 print(f"   Using direct API tools for pricing")
             else:
-                print(f"⚠️  CoinGecko MCP returned status {response.status_code}")
+                print(f"⚠️  CoinGecko MCP returned status {status_code}")
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"⚠️  CoinGecko MCP unavailable: {e}")
         except Exception as e:
             print(f"⚠️  CoinGecko MCP error: {e}")
@@ -199,6 +228,9 @@ class MCPClient:
     async def cleanup(self):
         """Close all MCP connections."""
         await self.exit_stack.aclose()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
     
     def get_blockscout_direct_tools(self) -> List[Dict[str, Any]]:
         """
@@ -294,6 +326,17 @@ class MCPClient:
         Returns:
             Tool execution result as string
         """
+        # Label only registered tools; callers choose the name, and every
+        # distinct label value is a new metrics series
+        label = tool_name if tool_name in self.tool_server_map else "unknown"
+        with MCP_TOOL_SECONDS.time(label) as timer:
+            result = await self._dispatch_tool(tool_name, arguments)
+            if isinstance(result, str) and result.startswith(ERROR_PREFIXES):
+                timer.outcome = "error"
+            return result
+    
+    async def _dispatch_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
+        """Route a tool call to its MCP server or direct API."""
         server_type = self.tool_server_map.get(tool_name)
         
         if not server_type:
@@ -306,7 +349,7 @@ class MCPClient:
             return await self._execute_mcp_tool('coingecko', tool_name, arguments)
         # Execute via direct API
         elif server_type == 'blockscout_direct':
-            return self._execute_blockscout_direct(tool_name, arguments)
+            return await self._execute_blockscout_direct(tool_name, arguments)
         else:
             return f"Unknown server type: {server_type}"
     
@@ -338,38 +381,38 @@ class MCPClient:
                     'Content-Type': 'application/json'
                 }
                 
-                response = requests.post(
+                async with self._client().stream(
+                    "POST",
                     self.blockscout_mcp_url,
                     json=request,
                     headers=headers,
-                    timeout=60,  # Longer timeout for tool execution
-                    stream=True  # Enable SSE parsing
-                )
-                
-                if response.status_code == 200:
-                    # Parse SSE stream to get final result
-                    result = self._parse_sse_stream(response)
+                    timeout=60  # Longer timeout for tool execution
+                ) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        return f"HTTP Error {response.status_code}: {response.text[:200]}"
                     
-                    if result and 'result' in result:
-                        # Extract the content from the result
-                        content = result['result'].get('content', [])
-                        if isinstance(content, list) and len(content) > 0:
-                            # Get text from first content item
-                            text = content[0].get('text', '')
-                            return text
-                        return str(result['result'])
-                    elif result and 'error' in result:
-                        return f"Error: {result['error'].get('message', result['error'])}"
-                    return f"No valid result in response"
-                else:
-                    return f"HTTP Error {response.status_code}: {response.text[:200]}"
+                    # Parse SSE stream to get final result
+                    result = await self._parse_sse_stream(response)
+                
+                if result and 'result' in result:
+                    # Extract the content from the result
+                    content = result['result'].get('content', [])
+                    if isinstance(content, list) and len(content) > 0:
+                        # Get text from first content item
+                        text = content[0].get('text', '')
+                        return text
+                    return str(result['result'])
+                elif result and 'error' in result:
+                    return f"Error: {result['error'].get('message', result['error'])}"
+                return f"No valid result in response"
             else:
                 return f"Not connected to {server} MCP server"
             
         except Exception as e:
             return f"Error executing {tool_name} via MCP: {str(e)}"
     
-    def _execute_blockscout_direct(self, tool_name: str, arguments: Dict[str, Any]) -> str:
+    async def _execute_blockscout_direct(self, tool_name: str, arguments: Dict[str, Any]) -> str:
         """Execute Blockscout tool via direct API."""
         try:
             # Extract chain ID
@@ -386,25 +429,25 @@ class MCPClient:
             base_url = blockscout_urls.get(chain_id, 'https://base.blockscout.com/api')
             
             if tool_name == "blockscout_get_transactions":
-                return self._get_transactions(base_url, arguments)
+                return await self._get_transactions(base_url, arguments)
             elif tool_name == "blockscout_get_balance":
-                return self._get_balance(base_url, arguments)
+                return await self._get_balance(base_url, arguments)
             elif tool_name == "blockscout_get_token_info":
-                return self._get_token_info(base_url, arguments)
+                return await self._get_token_info(base_url, arguments)
             else:
                 return f"Unknown tool: {tool_name}"
                 
         except Exception as e:
             return f"Error executing {tool_name}: {str(e)}"
     
-    def _get_transactions(self, base_url: str, args: Dict[str, Any]) -> str:
+    async def _get_transactions(self, base_url: str, args: Dict[str, Any]) -> str:
         """Get transaction history via direct API."""
         address = args.get('address')
         limit = args.get('limit', 10)
         
         try:
             # Blockscout API doesn't accept limit in query params
-            response = requests.get(
+            response = await self._client().get(
                 f"{base_url}/v2/addresses/{address}/transactions",
                 timeout=10
             )
@@ -444,12 +487,12 @@ class MCPClient:
         except Exception as e:
             return f"Error fetching transactions: {str(e)}"
     
-    def _get_balance(self, base_url: str, args: Dict[str, Any]) -> str:
+    async def _get_balance(self, base_url: str, args: Dict[str, Any]) -> str:
         """Get token balances via direct API."""
         address = args.get('address')
         
         try:
-            response = requests.get(
+            response = await self._client().get(
                 f"{base_url}/v2/addresses/{address}",
                 timeout=10
             )
@@ -481,12 +524,12 @@ class MCPClient:
         except Exception as e:
             return f"Error fetching balance: {str(e)}"
     
-    def _get_token_info(self, base_url: str, args: Dict[str, Any]) -> str:
+    async def _get_token_info(self, base_url: str, args: Dict[str, Any]) -> str:
         """Get token information via direct API."""
         token_address = args.get('tokenAddress')
         
         try:
-            response = requests.get(
+            response = await self._client().get(
                 f"{base_url}/v2/tokens/{token_address}",
                 timeout=10
             )
@@ -0,0 +1,232 @@
+"""
+Latency Metrics
+
+Histograms of how long each part of a request takes, exposed in the
+Prometheus text format on /metrics.
+
+Every histogram is labelled by endpoint, stage and outcome:
+- endpoint: the API route being served (set per request with
+  current_endpoint; work done outside a request is labelled "none")
+- stage: the pipeline stage, RAG method, ASI:One call or MCP tool
+- outcome: "ok", "error" or "timeout"
+
+The endpoint label is held in a context variable, so it follows a request
+into worker threads started with contextvars.copy_context() (which
+StagedPipeline does), asyncio tasks and asyncio.to_thread.
+"""
+
+import asyncio
+import contextvars
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LABELS = ("endpoint", "stage", "outcome")
+
+# Seconds; from sub-millisecond cache and classifier hits up to LLM timeouts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+current_endpoint: contextvars.ContextVar = contextvars.ContextVar("metrics_endpoint", default="none")
+
+
+class Timer:
+    """Handle yielded by Histogram.time(); set outcome to override the default."""
+
+    def __init__(self):
+        self.outcome: Optional[str] = None
+
+
+class Histogram:
+    """A Prometheus histogram labelled by endpoint, stage and outcome."""
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Args:
+            name: Metric name, e.g. "rag_query_duration_seconds"
+            documentation: HELP text
+            buckets: Upper bounds of the buckets, in seconds
+        """
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, str, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, stage: str, outcome: str = "ok", endpoint: str = None) -> None:
+        """
+        Record one observation.
+
+        Args:
+            seconds: Duration to record
+            stage: Stage label
+            outcome: Outcome label
+            endpoint: Endpoint label, defaults to the current request's endpoint
+        """
+        key = (endpoint or current_endpoint.get(), stage, outcome)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for position, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[position] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, stage: str, endpoint: str = None) -> Iterator[Timer]:
+        """
+        Time a block of code.
+
+        The outcome is "ok" unless the block raises ("error", or "timeout"
+        for timeout exceptions) or sets timer.outcome itself.
+
+        Args:
+            stage: Stage label
+            endpoint: Endpoint label, defaults to the current request's endpoint
+        """
+        timer = Timer()
+        start = time.perf_counter()
+        try:
+            yield timer
+        except Exception as e:
+            timer.outcome = timer.outcome or _outcome_for(e)
+            raise
+        finally:
+            self.observe(time.perf_counter() - start, stage, timer.outcome or "ok", endpoint)
+
+    def render(self) -> List[str]:
+        """Render the histogram in the Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+
+        for key, values in sorted(series.items()):
+            labels = ",".join(f'{label}="{_escape(value)}"' for label, value in zip(LABELS, key))
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{labels},le="{_format_bound(bound)}"}} {int(count)}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {int(values[-1])}')
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-2]}")
+            lines.append(f"{self.name}_count{{{labels}}} {int(values[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """The set of histograms rendered on /metrics."""
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+
+    def histogram(self, name: str, documentation: str, **kwargs) -> Histogram:
+        """Create and register a histogram (or return the existing one)."""
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(name, documentation, **kwargs)
+        return self.histograms[name]
+
+    def render(self) -> str:
+        """Render all histograms in the Prometheus text format."""
+        lines = []
+        for histogram in self.histograms.values():
+            lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time to produce the response headers of an API request.",
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "workflow_stage_duration_seconds",
+    "Duration of each stage of workflow generation.",
+)
+RAG_QUERY_SECONDS = REGISTRY.histogram(
+    "rag_query_duration_seconds",
+    "Duration of DeFiWorkflowRAG knowledge graph queries.",
+)
+ASI_ONE_SECONDS = REGISTRY.histogram(
+    "asi_one_request_duration_seconds",
+    "Duration of ASI:One API calls (streamed calls until the stream ends).",
+)
+ASI_ONE_CONNECT_SECONDS = REGISTRY.histogram(
+    "asi_one_connect_duration_seconds",
+    "TCP connects and TLS handshakes of new ASI:One connections (reused ones skip them).",
+)
+MCP_TOOL_SECONDS = REGISTRY.histogram(
+    "mcp_tool_call_duration_seconds",
+    "Duration of MCP tool calls.",
+)
+
+
+def timed(histogram: Histogram, stage: str = None) -> Callable:
+    """
+    Decorator that records each call of a function (or coroutine function).
+
+    Args:
+        histogram: Histogram to record into
+        stage: Stage label, defaults to the function name
+    """
+    def decorator(fn: Callable) -> Callable:
+        label = stage or fn.__name__
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time(label):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with histogram.time(label):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def time_methods(histogram: Histogram) -> Callable:
+    """
+    Class decorator that applies timed() to every public method.
+
+    Args:
+        histogram: Histogram to record into, with the method name as stage
+    """
+    def decorator(cls: type) -> type:
+        for name, member in list(vars(cls).items()):
+            if not name.startswith("_") and callable(member):
+                setattr(cls, name, timed(histogram, name)(member))
+        return cls
+
+    return decorator
+
+
+def render_metrics() -> str:
+    """Render every registered histogram in the Prometheus text format."""
+    return REGISTRY.render()
+
+
+def _outcome_for(error: BaseException) -> str:
+    return "timeout" if isinstance(error, TimeoutError) or "Timeout" in type(error).__name__ else "error"
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound)) if math.isfinite(bound) else "+Inf"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
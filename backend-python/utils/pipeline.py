@@ -0,0 +1,229 @@
+"""
+Staged Request Pipeline
+
+Runs the stages of a single request on a shared thread pool so that
+independent stages (e.g. intent classification and RAG context building)
+overlap instead of running back to back.
+
+Each stage records when it started (relative to the start of the request)
+and how long it ran, so the critical path of a request can be read
+straight from the response. Durations are also recorded in the
+workflow_stage_duration_seconds histogram for /metrics.
+
+StagedPipeline runs stages on a thread pool; AsyncStagedPipeline runs
+them as tasks on the current event loop for the async server.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable
+
+from utils.metrics import STAGE_SECONDS, current_endpoint
+
+
+class StageTimer:
+    """Records per-stage start offsets and durations for one request."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.endpoint = current_endpoint.get()
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time a block of code as a stage.
+
+        Useful for stages that cannot be expressed as a single call,
+        such as streaming a response chunk by chunk.
+
+        Args:
+            name: Stage name
+        """
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            end = time.perf_counter()
+            STAGE_SECONDS.observe(end - start, name, outcome, self.endpoint)
+            with self._lock:
+                self.timings[name] = {
+                    "startMs": round((start - self.started_at) * 1000, 2),
+                    "durationMs": round((end - start) * 1000, 2),
+                }
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the timings of all finished stages.
+
+        Returns:
+            Dictionary with per-stage start/duration and the total elapsed time
+        """
+        with self._lock:
+            stages = dict(self.timings)
+        return {
+            "stages": stages,
+            "totalMs": round((time.perf_counter() - self.started_at) * 1000, 2),
+        }
+
+
+class StagedPipeline(StageTimer):
+    """
+    Schedules the stages of one request on a shared executor.
+
+    A stage may depend on other stages. It is only submitted to the
+    executor once all of its dependencies have finished, so waiting on
+    a dependency never ties up a worker thread.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        """
+        Initialize the pipeline.
+
+        Args:
+            executor: Shared thread pool the stages run on
+        """
+        super().__init__()
+        self.executor = executor
+        self.futures: Dict[str, Future] = {}
+
+    def submit(self, name: str, fn: Callable[..., Any], *args, after: Iterable[str] = ()) -> Future:
+        """
+        Schedule a stage to run in the background.
+
+        Args:
+            name: Stage name, used for timings and as a dependency key
+            fn: Stage function
+            *args: Extra arguments passed after the dependency results
+            after: Names of stages whose results are passed to fn first
+
+        Returns:
+            Future resolving to the stage result
+        """
+        deps = [self.futures[dep] for dep in after]
+        future: Future = Future()
+        self.futures[name] = future
+        # Run the stage in a copy of the caller's context, so it keeps the
+        # request's metrics labels in the worker thread
+        context = contextvars.copy_context()
+
+        def launch():
+            try:
+                dep_results = [dep.result() for dep in deps]
+            except Exception as e:
+                future.set_exception(e)
+                return
+            inner = self.executor.submit(context.run, self.run, name, fn, *dep_results, *args)
+            inner.add_done_callback(lambda done: _copy_future(done, future))
+
+        if not deps:
+            launch()
+            return future
+
+        remaining = [len(deps)]
+
+        def on_dep_done(_):
+            with self._lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                launch()
+
+        for dep in deps:
+            dep.add_done_callback(on_dep_done)
+
+        return future
+
+    def run(self, name: str, fn: Callable[..., Any], *args) -> Any:
+        """
+        Run a stage in the calling thread and record its timing.
+
+        Args:
+            name: Stage name
+            fn: Stage function
+            *args: Arguments for fn
+
+        Returns:
+            The stage result
+        """
+        with self.stage(name):
+            return fn(*args)
+
+    def result(self, name: str, timeout: float = None) -> Any:
+        """Wait for a background stage and return its result."""
+        return self.futures[name].result(timeout=timeout)
+
+
+class AsyncStagedPipeline(StageTimer):
+    """
+    Schedules the stages of one request as tasks on the running event loop.
+
+    Coroutine functions are awaited directly; plain functions (such as
+    MeTTa queries) are run in a worker thread so they do not block the
+    loop. Dependencies work as in StagedPipeline.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, name: str, fn: Callable[..., Any], *args, after: Iterable[str] = ()) -> asyncio.Task:
+        """
+        Schedule a stage to run in the background.
+
+        Args:
+            name: Stage name, used for timings and as a dependency key
+            fn: Stage function or coroutine function
+            *args: Extra arguments passed after the dependency results
+            after: Names of stages whose results are passed to fn first
+
+        Returns:
+            Task resolving to the stage result
+        """
+        deps = [self.tasks[dep] for dep in after]
+
+        async def launch():
+            dep_results = [await dep for dep in deps]
+            return await self.run(name, fn, *dep_results, *args)
+
+        task = asyncio.ensure_future(launch())
+        self.tasks[name] = task
+        return task
+
+    async def run(self, name: str, fn: Callable[..., Any], *args) -> Any:
+        """
+        Run a stage now and record its timing.
+
+        Args:
+            name: Stage name
+            fn: Stage function or coroutine function
+            *args: Arguments for fn
+
+        Returns:
+            The stage result
+        """
+        with self.stage(name):
+            if asyncio.iscoroutinefunction(fn):
+                return await fn(*args)
+            return await asyncio.to_thread(fn, *args)
+
+    async def result(self, name: str, timeout: float = None) -> Any:
+        """Wait for a background stage and return its result."""
+        return await asyncio.wait_for(asyncio.shield(self.tasks[name]), timeout)
+
+
+def _copy_future(source: Future, target: Future) -> None:
+    """Propagate the outcome of source onto target."""
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
@@ -0,0 +1,423 @@
+"""
+Workflow Prompt Builder
+
+Assembles the workflow generation prompt from sections compiled once from
+the knowledge graph, instead of re-rendering the whole multi-kilobyte
+prompt (and a token table covering every chain) on every request.
+
+Only the chains and tokens mentioned in the query are injected into the
+token address table. If the query names no chain, or names a token that
+is not known on the chains it names, the full table is used instead.
+
+Token counts are estimates (the ASI:One tokenizer is not available
+locally) but are consistent between requests, which is what matters for
+tracking the savings.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from metta.token_registry import TokenRegistry, default_registry
+from utils.response_cache import normalize_query
+
+
+WORKFLOW_PROMPT_HEAD = 'Create a DeFi workflow based on this request: "{user_query}"\n\n{node_types}\n{examples}\n\n'
+
+WORKFLOW_PROMPT_RULES = """CRITICAL REQUIREMENTS:
+1. ONLY generate the EXACT operations the user requested - DO NOT add extra helpful steps
+2. If user asks for "swap X to Y", generate ONLY: trigger + swap nodes
+3. If user asks for "swap and supply", generate: trigger + swap + aave nodes
+4. DO NOT assume the user wants to transfer tokens unless explicitly asked
+5. Use ONLY these exact node type values: trigger, swap, aave, transfer, condition, ai
+
+FIELD NAMING REQUIREMENTS:
+- Swap nodes MUST use: "fromToken" (address), "toToken" (address), "fromTokenDecimals", "chain", "protocol", "amount", "slippage"
+- Aave nodes MUST use: "asset" (symbol like "USDC"), "amount", "action" (supply/borrow/withdraw/repay), "useAsCollateral", "chain"
+- Transfer nodes MUST use: "token" (address), "to" (address), "amount", "chain"
+  * CRITICAL: Transfer node "token" field MUST be the TOKEN ADDRESS being transferred (NOT the symbol)
+  * CRITICAL: Transfer node MUST include "chain" field with the same chain as previous nodes
+  * CRITICAL: Transfer node "to" field MUST be the recipient wallet address from user query
+- DO NOT use "tokenIn" or "tokenOut" - use "fromToken" and "toToken" instead
+- DO NOT use "recipient" - use "to" for transfer nodes
+
+CHAIN NAME PARSING RULES:
+1. User mentions "base sepolia", "basesepolia", "base-sepolia", "base testnet" → use "basesepolia"
+2. User mentions "sepolia" alone → use "sepolia" (Ethereum Sepolia testnet, NOT Base Sepolia)
+3. User mentions "base" alone, "base mainnet" → use "base"
+4. User mentions "ethereum", "eth mainnet" → use "ethereum"
+5. User mentions "arbitrum sepolia" → use "arbitrumsepolia"
+6. User mentions "optimism sepolia" → use "optimismsepolia"
+7. Parse chain BEFORE looking up token addresses
+8. Default to "basesepolia" ONLY if absolutely NO chain is mentioned
+
+SUPPORTED CHAIN NAMES (use these EXACT strings in "chain" field):
+Mainnets: ethereum, base, arbitrum, optimism, polygon, avalanche, bnb, celo
+Testnets: sepolia, basesepolia, arbitrumsepolia, optimismsepolia, avalanchefuji, polygonmumbai
+
+CRITICAL: "sepolia" and "basesepolia" are DIFFERENT chains with DIFFERENT token addresses!
+
+AMOUNT FIELD REQUIREMENTS:
+- If a node (swap, aave, transfer) comes AFTER another node that produces an output amount, leave the "amount" field as an empty string ""
+- The backend will automatically infer the amount from the previous node's output
+- ONLY set a specific amount value if the user explicitly specifies an amount AND it's the first operation in the chain
+- Examples:
+  * "swap 100 USDC to ETH then transfer to 0x123..." -> swap amount: "100", transfer amount: "" (inferred from swap output)
+  * "swap 0.01 ETH to USDC then transfer to 0x123..." -> swap amount: "0.01", transfer amount: "" (inferred from swap output)
+  * "swap ETH to USDC then supply to Aave" -> swap amount: "", aave amount: "" (both inferred from user's wallet/previous outputs)"""
+
+WORKFLOW_PROMPT_EXAMPLES = """TOKEN ADDRESS LOOKUP - CRITICAL:
+For each token symbol mentioned (ETH, USDC, USDT, WETH, DAI, etc.), you MUST:
+1. Identify the target chain from user query FIRST
+   - "base sepolia", "basesepolia", "base-sepolia" → chain = "basesepolia"
+   - "sepolia" alone → chain = "sepolia" (Ethereum Sepolia, NOT Base Sepolia!)
+   - "base" alone → chain = "base" (mainnet)
+2. Look up the EXACT token address for that symbol on that SPECIFIC chain from TOKEN ADDRESS MAPPINGS above
+3. DO NOT mix addresses from different chains - each chain has different addresses!
+4. For transfer nodes after a swap: use the swap's toToken address as the transfer token address
+
+EXAMPLES OF CORRECT CHAIN & TOKEN MAPPING:
+
+Example 1 - Base Sepolia (CORRECT):
+User: "swap eth to usdc on base sepolia"
+Step 1: Parse chain → "base sepolia" → "basesepolia"
+Step 2: Look up ETH on basesepolia → 0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE
+Step 3: Look up USDC on basesepolia → 0x036CbD53842c5426634e7929541eC2318f3dCF7e
+Result: chain="basesepolia", fromToken=ETH address, toToken=USDC basesepolia address
+
+Example 2 - Sepolia (DIFFERENT FROM BASE SEPOLIA):
+User: "swap eth to usdc on sepolia"
+Step 1: Parse chain → "sepolia" → "sepolia"  
+Step 2: Look up USDC on sepolia → 0x1c7D4B196Cb0C7B01d743Fbc6116a902379C7238
+Result: chain="sepolia", toToken=USDC sepolia address (NOT basesepolia USDC!)
+
+COMMON MISTAKE TO AVOID:
+❌ WRONG: User says "base sepolia" but you use sepolia USDC address (0x1c7D...)
+✅ RIGHT: User says "base sepolia" so use basesepolia USDC address (0x036C...)
+
+SWAP + TRANSFER EXAMPLE:
+User: "swap 0.01 eth to usdc and then transfer it to 0x0fCe963885b15a12832813798980bDadc9744705 on base sepolia"
+Chain parsing: "base sepolia" → "basesepolia"
+Token lookup: USDC on basesepolia → 0x036CbD53842c5426634e7929541eC2318f3dCF7e (NOT sepolia USDC 0x94a9...)
+
+Correct output:
+{
+  "nodes": [
+    {
+      "id": "node-1",
+      "type": "trigger",
+      "data": {
+        "label": "Trigger",
+        "config": {"triggerType": "manual"}
+      },
+      "position": {"x": 100, "y": 100}
+    },
+    {
+      "id": "node-2",
+      "type": "swap",
+      "data": {
+        "label": "Swap ETH to USDC",
+        "config": {
+          "fromToken": "0x4200000000000000000000000000000000000006",
+          "toToken": "0x036CbD53842c5426634e7929541eC2318f3dCF7e",
+          "fromTokenDecimals": "18",
+          "amount": "0.01",
+          "chain": "basesepolia",
+          "protocol": "uniswap",
+          "slippage": "1"
+        }
+      },
+      "position": {"x": 300, "y": 100}
+    },
+    {
+      "id": "node-3",
+      "type": "transfer",
+      "data": {
+        "label": "Transfer USDC",
+        "config": {
+          "token": "0x036CbD53842c5426634e7929541eC2318f3dCF7e",
+          "to": "0x0fCe963885b15a12832813798980bDadc9744705",
+          "amount": "",
+          "chain": "basesepolia"
+        }
+      },
+      "position": {"x": 500, "y": 100}
+    }
+  ],
+  "edges": [
+    {
+      "id": "edge-1",
+      "source": "node-1",
+      "target": "node-2",
+      "sourceHandle": "output",
+      "targetHandle": "input"
+    },
+    {
+      "id": "edge-2",
+      "source": "node-2",
+      "target": "node-3",
+      "sourceHandle": "output",
+      "targetHandle": "input"
+    }
+  ]
+}
+
+REQUIRED WORKFLOW STRUCTURE:
+6. Each node MUST have:
+   - id: string (e.g., "node-1", "node-2")
+   - type: string (MUST be one of: trigger, swap, aave, transfer, condition, ai)
+   - data: object with "label" (string) and "config" (object)
+   - position: object with "x" and "y" (numbers)
+7. Each edge MUST have:
+   - id: string (e.g., "edge-1")
+   - source: string (source node id)
+   - target: string (target node id)
+   - sourceHandle: "output"
+   - targetHandle: "input"
+8. ALWAYS start with a "trigger" node
+9. Do NOT use brackets [] or quotes in type field - use plain string values
+
+Example valid workflow:
+{
+  "nodes": [
+    {
+      "id": "node-1",
+      "type": "trigger",
+      "data": {
+        "label": "Trigger",
+        "config": {"triggerType": "manual"}
+      },
+      "position": {"x": 100, "y": 100}
+    },
+    {
+      "id": "node-2",
+      "type": "swap",
+      "data": {
+        "label": "Swap ETH to USDC",
+        "config": {
+          "protocol": "uniswap",
+          "fromToken": "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE",
+          "toToken": "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913",
+          "fromTokenDecimals": "18",
+          "amount": "",
+          "slippage": "0.5",
+          "chain": "basesepolia"
+        }
+      },
+      "position": {"x": 350, "y": 100}
+    }
+  ],
+  "edges": [
+    {
+      "id": "edge-1",
+      "source": "node-1",
+      "target": "node-2",
+      "sourceHandle": "output",
+      "targetHandle": "input"
+    }
+  ]
+}
+
+Respond with ONLY valid JSON, no markdown code blocks, no explanations."""
+
+DEFAULT_NODE_TYPES = "\nAvailable node types: trigger, swap, aave, transfer, condition, ai\n"
+
+# Chains users (and the model) confuse; the system prompt spells out their USDC addresses
+ADDRESS_EXAMPLE_CHAINS = ("basesepolia", "sepolia")
+
+DEFAULT_CHAINS = [
+    {"name": "ethereum", "chainId": "1", "testnet": False},
+    {"name": "base", "chainId": "8453", "testnet": False},
+    {"name": "sepolia", "chainId": "11155111", "testnet": True},
+    {"name": "basesepolia", "chainId": "84532", "testnet": True},
+]
+
+_TOKEN_PIECE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of LLM tokens in a piece of text.
+
+    Counts each punctuation mark as one token and each word as one token
+    per four characters, which tracks BPE tokenizers closely enough for
+    English prompts with hex addresses.
+    """
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_PIECE.findall(text))
+
+
+@dataclass
+class PromptBuild:
+    """A rendered workflow prompt and what went into it."""
+    prompt: str
+    tokens: int
+    chains: Tuple[str, ...] = ()
+    symbols: Tuple[str, ...] = ()
+    full_table: bool = True
+    saved_tokens: int = 0
+
+    def info(self) -> Dict[str, Any]:
+        """Summary for API responses and logs."""
+        return {
+            "tokens": self.tokens,
+            "savedTokens": self.saved_tokens,
+            "chains": list(self.chains),
+            "symbols": list(self.symbols),
+            "fullTable": self.full_table,
+        }
+
+
+class WorkflowPromptTemplate:
+    """
+    Workflow prompt sections compiled once from a knowledge graph context.
+
+    Usage:
+        template = WorkflowPromptTemplate(context)
+        build = template.render("swap 1 ETH to USDC on base")
+        build.prompt, build.tokens
+    """
+
+    def __init__(self, context: Optional[Mapping[str, Any]] = None):
+        """
+        Compile the static prompt sections.
+
+        Args:
+            context: Knowledge graph context (a ContextSnapshot, whose token
+                     registry is used, or a dict with "token_addresses") and
+                     optionally "chains", "node_types" and "strategies"
+        """
+        context = context or {}
+        tokens = getattr(context, "tokens", None)
+        if tokens is None:
+            token_addresses = context.get("token_addresses")
+            tokens = TokenRegistry.from_table(token_addresses) if token_addresses else default_registry()
+        self.tokens = tokens
+        chains = context.get("chains") or DEFAULT_CHAINS
+        chain_info = {chain["name"]: chain for chain in chains}
+
+        self.node_types = self._compile_node_types(context.get("node_types"))
+        self.examples = self._compile_examples(context.get("strategies"))
+
+        # Per-chain token lines, so a subset of the table can be assembled cheaply
+        self.chain_headers: Dict[str, str] = {}
+        self.token_lines: Dict[str, Dict[str, str]] = {}
+        for chain in tokens.chains:
+            info = chain_info.get(chain)
+            if info:
+                network = "Testnet" if info.get("testnet") else "Mainnet"
+                self.chain_headers[chain] = f"{chain.upper()} ({network} - Chain ID: {info['chainId']}):"
+            else:
+                self.chain_headers[chain] = f"{chain.upper()}:"
+            self.token_lines[chain] = {
+                token.symbol: f"- {token.symbol}: {token.address} ({token.decimals} decimals)"
+                for token in tokens.tokens_on(chain)
+            }
+
+        self.symbols = set(tokens.symbols)
+        self.address_examples = "\n".join(
+            f"- {chain} USDC: {tokens.address(chain, 'USDC')}"
+            for chain in ADDRESS_EXAMPLE_CHAINS if tokens.get(chain, "USDC")
+        )
+
+        mainnets = [name for name, info in chain_info.items() if not info.get("testnet")]
+        testnets = [name for name, info in chain_info.items() if info.get("testnet")]
+        self.chain_reference = (
+            'CHAIN NAME REFERENCE (use these EXACT names in "chain" field):\n'
+            f"Mainnets: {', '.join(mainnets)}\n"
+            f"Testnets: {', '.join(testnets)}"
+        )
+
+        self.full_table = self._render_table(
+            "TOKEN ADDRESS MAPPINGS BY NETWORK (ALWAYS USE THESE EXACT ADDRESSES):",
+            {chain: list(lines) for chain, lines in self.token_lines.items()},
+        )
+        self.full_table_tokens = estimate_tokens(self.full_table)
+
+    def render(self, user_query: str) -> PromptBuild:
+        """
+        Render the prompt for a query.
+
+        Args:
+            user_query: User's workflow description
+
+        Returns:
+            PromptBuild with the prompt text and its estimated token count
+        """
+        normalized = normalize_query(user_query, self.symbols)
+        chains = [chain for chain in dict.fromkeys(normalized.chains) if chain in self.token_lines]
+        symbols = list(dict.fromkeys(normalized.tokens))
+
+        selection = self._select(chains, symbols)
+        if selection is None:
+            table = self.full_table
+            saved = 0
+        else:
+            table = self._render_table(
+                "TOKEN ADDRESS MAPPINGS FOR THE REQUESTED NETWORK (ALWAYS USE THESE EXACT ADDRESSES):",
+                selection,
+            )
+            saved = self.full_table_tokens - estimate_tokens(table)
+
+        prompt = (
+            WORKFLOW_PROMPT_HEAD.format(
+                user_query=user_query, node_types=self.node_types, examples=self.examples
+            )
+            + WORKFLOW_PROMPT_RULES
+            + "\n\n" + table + "\n\n"
+            + WORKFLOW_PROMPT_EXAMPLES
+        )
+
+        return PromptBuild(
+            prompt=prompt,
+            tokens=estimate_tokens(prompt),
+            chains=tuple(chains),
+            symbols=tuple(symbols),
+            full_table=selection is None,
+            saved_tokens=max(saved, 0),
+        )
+
+    def _select(self, chains: List[str], symbols: List[str]) -> Optional[Dict[str, List[str]]]:
+        """Pick the token lines to include, or None to use the full table."""
+        if not chains:
+            return None
+
+        selection = {}
+        for chain in chains:
+            available = self.token_lines[chain]
+            if not symbols:
+                selection[chain] = list(available)
+            elif all(symbol in available for symbol in symbols):
+                selection[chain] = symbols
+            else:
+                # A token we cannot resolve on this chain - let the model see everything
+                return None
+        return selection
+
+    def _render_table(self, title: str, selection: Dict[str, List[str]]) -> str:
+        sections = [title]
+        for chain, symbols in selection.items():
+            lines = [self.chain_headers[chain]]
+            lines.extend(self.token_lines[chain][symbol] for symbol in symbols)
+            sections.append("\n".join(lines))
+        sections.append(self.chain_reference)
+        return "\n\n".join(sections)
+
+    @staticmethod
+    def _compile_node_types(node_types: Optional[Sequence[Any]]) -> str:
+        valid = [nt for nt in node_types or [] if isinstance(nt, Mapping) and 'type' in nt and 'description' in nt]
+        if not valid:
+            return DEFAULT_NODE_TYPES
+        return "\nAvailable node types:\n" + "".join(
+            f"- {nt['type']}: {nt['description']}\n" for nt in valid
+        )
+
+    @staticmethod
+    def _compile_examples(strategies: Optional[Sequence[Any]]) -> str:
+        # Filter out empty lists and non-dict items
+        valid = [s for s in strategies or [] if isinstance(s, Mapping) and 'description' in s and 'sequence' in s]
+        if not valid:
+            return ""
+        return "\nExample workflows:\n" + "".join(
+            f"- {strategy['description']}: {strategy['sequence']}\n" for strategy in valid[:3]
+        )
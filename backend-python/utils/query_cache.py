@@ -0,0 +1,169 @@
+"""
+Generation-Counted Query Cache
+
+DeFiWorkflowRAG queries such as get_all_node_types, query_all_strategies
+or get_node_config("swap") return the same answer until the knowledge
+graph changes. QueryCache memoizes them, keyed on the method and its
+arguments, for one knowledge generation at a time: the RAG bumps its
+generation counter whenever knowledge is added, and the first lookup
+under a new generation drops every entry cached under the old one.
+
+Cached results are frozen (utils/immutable.py) and shared between callers,
+so a caller that wants to modify a result must copy it first
+(e.g. dict(rag.get_node_config("aave"))).
+"""
+
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Tuple
+
+from utils.immutable import freeze
+
+
+_MISSING = object()
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of query results for the current knowledge generation.
+
+    Thread-safe; hit/miss/eviction counters are exposed through stats().
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries before the least recently used is evicted
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, generation: int) -> Any:
+        """
+        Look up a cached result.
+
+        Args:
+            key: Method name and arguments
+            generation: Current knowledge generation
+
+        Returns:
+            The cached result, or _MISSING
+        """
+        with self._lock:
+            if generation != self._generation:
+                self._invalidate(generation)
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def put(self, key: Hashable, generation: int, value: Any) -> None:
+        """
+        Store a result computed under a knowledge generation.
+
+        Results computed under a generation that has since been replaced
+        are not stored.
+
+        Args:
+            key: Method name and arguments
+            generation: Knowledge generation the result was computed under
+            value: Frozen result
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _invalidate(self, generation: int) -> None:
+        # Caller holds the lock
+        if self._generation is not None and self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._generation = generation
+
+
+def memoize_methods(exclude: Iterable[str] = ()) -> Callable:
+    """
+    Class decorator that memoizes every public method in the instance's query_cache.
+
+    Instances must have a query_cache attribute (a QueryCache, or None to
+    disable caching) and a generation attribute that changes whenever the
+    data the methods read changes. Results are frozen whether or not the
+    cache is enabled, so callers see the same types either way.
+
+    Args:
+        exclude: Methods not to memoize, e.g. ones that modify the data
+    """
+    excluded = set(exclude)
+
+    def decorator(cls: type) -> type:
+        for name, member in list(vars(cls).items()):
+            if not name.startswith("_") and name not in excluded and callable(member):
+                setattr(cls, name, _memoized(name, member))
+        return cls
+
+    return decorator
+
+
+def _memoized(name: str, fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        cache = self.query_cache
+        key = _key(name, args, kwargs)
+        if cache is None or key is None:
+            return freeze(fn(self, *args, **kwargs))
+
+        generation = self.generation
+        value = cache.get(key, generation)
+        if value is _MISSING:
+            value = freeze(fn(self, *args, **kwargs))
+            cache.put(key, generation, value)
+        return value
+
+    return wrapper
+
+
+def _key(name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+    """Cache key for a call, or None if an argument is unhashable."""
+    key = (name, args, tuple(sorted(kwargs.items()))) if kwargs else (name, args)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
@@ -0,0 +1,305 @@
+"""
+Normalized-Query Response Cache
+
+Caches workflow generation responses keyed on a normalized form of the
+user's query, so near-identical prompts ("Swap 0.1 ETH to USDC on Base",
+"swap 5 eth  to usdc on base") share one cache entry and skip the LLM
+pipeline.
+
+Normalization:
+- lowercases the query and collapses whitespace and punctuation
+- replaces amounts and 0x addresses with placeholders
+- canonicalizes chain aliases ("base sepolia" -> "basesepolia") and
+  token symbols, which are extracted as entities
+
+Cached workflows are re-parameterized with the amounts and addresses of
+the incoming query before being returned, rather than served verbatim.
+An amount repeated in the cached query but given different values in the
+incoming one cannot be mapped back to its fields, so it counts as a miss.
+"""
+
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional
+
+
+ADDRESS_PATTERN = re.compile(r'0x[a-fA-F0-9]{40}')
+AMOUNT_PATTERN = re.compile(r'(?<![\w.])\d[\d,]*(?:\.\d+)?(?![\w.])|(?<![\w.])\.\d+(?![\w.])')
+
+# Multi-word aliases must come before the single words they contain
+CHAIN_ALIASES = [
+    ("base sepolia", "basesepolia"),
+    ("base-sepolia", "basesepolia"),
+    ("base testnet", "basesepolia"),
+    ("arbitrum sepolia", "arbitrumsepolia"),
+    ("arbitrum-sepolia", "arbitrumsepolia"),
+    ("optimism sepolia", "optimismsepolia"),
+    ("optimism-sepolia", "optimismsepolia"),
+    ("avalanche fuji", "avalanchefuji"),
+    ("polygon mumbai", "polygonmumbai"),
+    ("eth mainnet", "ethereum"),
+    ("ethereum mainnet", "ethereum"),
+    ("base mainnet", "base"),
+    ("bsc", "bnb"),
+]
+
+CHAIN_NAMES = {
+    "ethereum", "base", "arbitrum", "optimism", "polygon", "avalanche", "bnb", "celo",
+    "sepolia", "basesepolia", "arbitrumsepolia", "optimismsepolia", "avalanchefuji", "polygonmumbai",
+}
+
+DEFAULT_TOKENS = {"ETH", "WETH", "USDC", "USDT", "DAI", "WBTC", "USDbC", "cbBTC", "MATIC", "AVAX", "BNB"}
+
+
+@dataclass
+class NormalizedQuery:
+    """A query reduced to its cache key plus the entities extracted from it."""
+    key: str
+    amounts: List[str] = field(default_factory=list)
+    addresses: List[str] = field(default_factory=list)
+    tokens: List[str] = field(default_factory=list)
+    chains: List[str] = field(default_factory=list)
+
+
+def canonical_amount(raw: str) -> str:
+    """Canonicalize an amount string ("1,000.50" -> "1000.5", "0.10" -> "0.1")."""
+    try:
+        value = Decimal(raw.replace(',', ''))
+    except InvalidOperation:
+        return raw
+    text = format(value.normalize(), 'f')
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return text or "0"
+
+
+def normalize_query(query: str, known_tokens: Iterable[str] = DEFAULT_TOKENS) -> NormalizedQuery:
+    """
+    Normalize a workflow query for cache lookup.
+
+    Args:
+        query: Raw user query
+        known_tokens: Token symbols to recognize as entities
+
+    Returns:
+        NormalizedQuery with the cache key and extracted entities
+    """
+    token_lookup = {symbol.lower(): symbol for symbol in known_tokens}
+
+    addresses = ADDRESS_PATTERN.findall(query)
+    text = ADDRESS_PATTERN.sub(' <address> ', query)
+
+    amounts = [canonical_amount(raw) for raw in AMOUNT_PATTERN.findall(text)]
+    text = AMOUNT_PATTERN.sub(' <amount> ', text)
+
+    text = ' '.join(re.sub(r'[^\w\s<>\-]', ' ', text.lower()).split())
+    for alias, chain in CHAIN_ALIASES:
+        text = re.sub(rf'\b{re.escape(alias)}\b', chain, text)
+
+    words = text.split()
+    tokens = [token_lookup[word] for word in words if word in token_lookup]
+    chains = [word for word in words if word in CHAIN_NAMES]
+
+    return NormalizedQuery(
+        key=' '.join(words),
+        amounts=amounts,
+        addresses=addresses,
+        tokens=tokens,
+        chains=chains,
+    )
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache of workflow generation responses.
+
+    Thread-safe; hit/miss/eviction counters are exposed through stats().
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600,
+                 known_tokens: Iterable[str] = DEFAULT_TOKENS):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries before the least recently used is evicted
+            ttl_seconds: Time after which an entry expires
+            known_tokens: Token symbols recognized during normalization
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.known_tokens = set(known_tokens)
+        # Knowledge generation the entries were generated from
+        self.knowledge_version: Optional[int] = None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, query: str, user_address: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response for a query.
+
+        Args:
+            query: Raw user query
+            user_address: Address of the requesting user
+
+        Returns:
+            Response re-parameterized for this query, or None on a miss
+            (including when the amounts cannot be mapped unambiguously)
+        """
+        normalized = normalize_query(query, self.known_tokens)
+
+        with self._lock:
+            entry = self._entries.get(normalized.key)
+            if entry is not None and time.monotonic() - entry["stored_at"] > self.ttl_seconds:
+                del self._entries[normalized.key]
+                entry = None
+
+            replacements = None
+            if entry is not None:
+                replacements = _build_replacements(
+                    entry["normalized"], entry["user_address"], normalized, user_address
+                )
+            if replacements is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(normalized.key)
+            self.hits += 1
+
+        return {
+            key: _reparameterize(value, replacements, key)
+            for key, value in entry["response"].items()
+        }
+
+    def put(self, query: str, user_address: str, response: Dict[str, Any]) -> None:
+        """
+        Store a response for a query.
+
+        Args:
+            query: Raw user query
+            user_address: Address of the requesting user
+            response: Response payload (workflow, explanation, strategy, ...)
+        """
+        normalized = normalize_query(query, self.known_tokens)
+
+        with self._lock:
+            self._entries[normalized.key] = {
+                "normalized": normalized,
+                "user_address": user_address,
+                "response": copy.deepcopy(response),
+                "stored_at": time.monotonic(),
+            }
+            self._entries.move_to_end(normalized.key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def set_knowledge(self, version: int, known_tokens: Iterable[str]) -> bool:
+        """
+        Follow the knowledge generation the responses are generated from.
+
+        Cached workflows hold the token addresses and strategies of one
+        generation, so when it changes (reload, add_knowledge) every entry
+        is dropped and the token symbols are replaced.
+
+        Args:
+            version: Current knowledge generation (ContextSnapshot.version)
+            known_tokens: Token symbols of that generation
+
+        Returns:
+            True if entries from an older generation were dropped
+        """
+        if version == self.knowledge_version:
+            return False
+        with self._lock:
+            if version == self.knowledge_version:
+                return False
+            stale = self.knowledge_version is not None
+            self._entries.clear()
+            self.known_tokens = set(known_tokens)
+            self.knowledge_version = version
+            return stale
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "knowledgeVersion": self.knowledge_version,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _build_replacements(cached: NormalizedQuery, cached_user: str,
+                        current: NormalizedQuery, current_user: str) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Map the cached query's parameters onto the current query's.
+
+    Amounts are replaced by value, so an amount that occurs twice in the
+    cached query ("swap 1 ETH ... supply 1 USDC") can only map to one new
+    amount. If the current query gives those occurrences different amounts,
+    the fields they belong to cannot be told apart and None is returned.
+    """
+    amounts = {}
+    for old, new in zip(cached.amounts, current.amounts):
+        if amounts.setdefault(old, new) != new:
+            return None
+    amounts = {old: new for old, new in amounts.items() if old != new}
+    addresses = {
+        old.lower(): new for old, new in zip(cached.addresses, current.addresses)
+        if old.lower() != new.lower()
+    }
+    if cached_user and current_user and cached_user.lower() != current_user.lower():
+        addresses.setdefault(cached_user.lower(), current_user)
+    return {"amounts": amounts, "addresses": addresses}
+
+
+def _reparameterize(value: Any, replacements: Dict[str, Dict[str, str]], key: str = "") -> Any:
+    """
+    Deep-copy a cached value, swapping in the current query's parameters.
+
+    Addresses are replaced wherever they appear. Amounts are only replaced
+    in amount fields (so e.g. a slippage of "0.5" is left alone) and in
+    free text such as the explanation.
+    """
+    if isinstance(value, dict):
+        return {k: _reparameterize(v, replacements, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_reparameterize(v, replacements, key) for v in value]
+
+    addresses = replacements["addresses"]
+    amounts = replacements["amounts"]
+
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool) and 'amount' in key.lower():
+        return amounts.get(canonical_amount(str(value)), value)
+    if not isinstance(value, str):
+        return value
+
+    if value.lower() in addresses:
+        return addresses[value.lower()]
+    if 'amount' in key.lower():
+        return amounts.get(canonical_amount(value), value) if value else value
+    if key in ("explanation", "message") and (addresses or amounts):
+        text = ADDRESS_PATTERN.sub(lambda m: addresses.get(m.group(0).lower(), m.group(0)), value)
+        return AMOUNT_PATTERN.sub(lambda m: amounts.get(canonical_amount(m.group(0)), m.group(0)), text)
+    return value
@@ -0,0 +1,124 @@
+"""
+Incremental Workflow Stream Parser
+
+Parses workflow JSON as it streams in from the LLM and emits each
+workflow node as soon as its JSON object is complete, instead of waiting
+for the whole response.
+
+The parser tracks string/escape state and nesting depth, so braces inside
+string values are ignored. Text outside the top-level JSON object (such as
+markdown code fences) is skipped.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+
+class WorkflowNodeStreamParser:
+    """
+    Emits complete node objects from the "nodes" array of a streamed workflow.
+
+    Usage:
+        parser = WorkflowNodeStreamParser()
+        for chunk in stream:
+            for node in parser.feed(chunk):
+                ...
+        workflow = parser.result()
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = -1
+        self._last_string = None
+        self._pending_key = None
+        self._nodes_depth = None
+        self._node_start = -1
+        self._root_start = -1
+        self._root_end = -1
+        self.nodes: List[Dict[str, Any]] = []
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Add a chunk of streamed text.
+
+        Args:
+            chunk: Next piece of model output
+
+        Returns:
+            Nodes completed by this chunk (possibly empty)
+        """
+        self.buffer += chunk
+        completed = []
+
+        while self._pos < len(self.buffer):
+            ch = self.buffer[self._pos]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = self.buffer[self._string_start + 1:self._pos]
+            elif self._root_end >= 0:
+                pass  # Ignore anything after the top-level object
+            elif ch == '"' and self._depth > 0:
+                self._in_string = True
+                self._string_start = self._pos
+            elif ch == ':':
+                self._pending_key = self._last_string
+            elif ch == ',':
+                self._pending_key = None
+            elif ch in '{[':
+                if self._depth == 0:
+                    if ch == '{':
+                        self._root_start = self._pos
+                        self._depth = 1
+                elif ch == '[' and self._depth == 1 and self._pending_key == 'nodes':
+                    self._depth += 1
+                    self._nodes_depth = self._depth
+                else:
+                    self._depth += 1
+                    if ch == '{' and self._nodes_depth is not None and self._depth == self._nodes_depth + 1:
+                        self._node_start = self._pos
+                self._pending_key = None
+            elif ch in '}]' and self._depth > 0:
+                if ch == '}' and self._node_start >= 0 and self._depth == self._nodes_depth + 1:
+                    node = self._decode(self.buffer[self._node_start:self._pos + 1])
+                    if node is not None:
+                        self.nodes.append(node)
+                        completed.append(node)
+                    self._node_start = -1
+                elif ch == ']' and self._depth == self._nodes_depth:
+                    self._nodes_depth = None
+                self._depth -= 1
+                if self._depth == 0:
+                    self._root_end = self._pos
+
+            self._pos += 1
+
+        return completed
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """
+        Parse the complete workflow once the stream has finished.
+
+        Returns:
+            The full workflow JSON, or None if it is incomplete or invalid
+        """
+        if self._root_start < 0 or self._root_end < 0:
+            return None
+        return self._decode(self.buffer[self._root_start:self._root_end + 1])
+
+    @staticmethod
+    def _decode(text: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        return value if isinstance(value, dict) else None
@@ -9,6 +9,8 @@ import { vincentHandler } from '../config/vincent.js';
 import { getPKPInfo } from '@lit-protocol/vincent-app-sdk/jwt';
 import {
   generateWorkflowFromNL,
+  streamWorkflowFromNL,
+  generateWorkflowBatch,
   queryKnowledgeGraph,
   searchAgents,
   checkPythonBackendHealth,
@@ -54,6 +56,84 @@ router.post('/workflow/generate', vincentHandler(async (req, res) => {
   }
 }));
 
+/**
+ * POST /api/asi/workflow/generate/stream
+ * Stream workflow generation as Server-Sent Events
+ */
+router.post('/workflow/generate/stream', vincentHandler(async (req, res) => {
+  try {
+    const { query } = req.body;
+    const { decodedJWT } = req.vincentUser;
+    const pkpInfo = getPKPInfo(decodedJWT);
+    
+    if (!query) {
+      return res.status(400).json({
+        success: false,
+        message: 'Query is required',
+      });
+    }
+
+    console.log(`[ASI] Streaming workflow for user: ${pkpInfo.ethAddress}`);
+    console.log(`   Query: "${query}"`);
+
+    const stream = await streamWorkflowFromNL(query, pkpInfo.ethAddress);
+
+    res.writeHead(200, {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache',
+      Connection: 'keep-alive',
+      'X-Accel-Buffering': 'no',
+    });
+    stream.pipe(res);
+    req.on('close', () => stream.destroy());
+  } catch (error) {
+    console.error('[ASI] Error streaming workflow:', error);
+    res.status(500).json({
+      success: false,
+      message: 'Failed to stream workflow',
+      error: error.message,
+    });
+  }
+}));
+
+/**
+ * POST /api/asi/workflow/generate/batch
+ * Generate workflows for many queries, streamed back as NDJSON
+ */
+router.post('/workflow/generate/batch', vincentHandler(async (req, res) => {
+  try {
+    const { queries } = req.body;
+    const { decodedJWT } = req.vincentUser;
+    const pkpInfo = getPKPInfo(decodedJWT);
+    
+    if (!Array.isArray(queries) || queries.length === 0) {
+      return res.status(400).json({
+        success: false,
+        message: 'Queries are required',
+      });
+    }
+
+    console.log(`[ASI] Batch generating ${queries.length} workflows for user: ${pkpInfo.ethAddress}`);
+
+    const stream = await generateWorkflowBatch(queries, pkpInfo.ethAddress);
+
+    res.writeHead(200, {
+      'Content-Type': 'application/x-ndjson',
+      'Cache-Control': 'no-cache',
+      'X-Accel-Buffering': 'no',
+    });
+    stream.pipe(res);
+    req.on('close', () => stream.destroy());
+  } catch (error) {
+    console.error('[ASI] Error generating workflow batch:', error);
+    res.status(500).json({
+      success: false,
+      message: 'Failed to generate workflow batch',
+      error: error.message,
+    });
+  }
+}));
+
 /**
  * POST /api/asi/knowledge/query
  * Query the MeTTa knowledge graph
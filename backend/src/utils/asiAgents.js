@@ -62,6 +62,58 @@ async function generateWorkflowFromNL(query, userAddress = '', options = {}) {
   }
 }
 
+/**
+ * Stream workflow generation as Server-Sent Events
+ * @param {string} query - User's natural language workflow description
+ * @param {string} userAddress - User's Ethereum address
+ * @returns {Promise<NodeJS.ReadableStream>} - SSE stream (intent, context, node, workflow, explanation, done)
+ */
+async function streamWorkflowFromNL(query, userAddress = '') {
+  const response = await fetch(`${PYTHON_BACKEND_URL}/api/workflow/generate/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+    },
+    body: JSON.stringify({
+      query,
+      userAddress,
+    }),
+  });
+
+  if (!response.ok) {
+    throw new Error(`Python backend returned ${response.status}: ${response.statusText}`);
+  }
+
+  return response.body;
+}
+
+/**
+ * Generate workflows for many queries in one request
+ * @param {string[]} queries - Natural language workflow descriptions
+ * @param {string} userAddress - User's Ethereum address
+ * @returns {Promise<NodeJS.ReadableStream>} - NDJSON stream, one line per unique query then a summary line
+ */
+async function generateWorkflowBatch(queries, userAddress = '') {
+  const response = await fetch(`${PYTHON_BACKEND_URL}/api/workflow/generate/batch`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'application/x-ndjson',
+    },
+    body: JSON.stringify({
+      queries,
+      userAddress,
+    }),
+  });
+
+  if (!response.ok) {
+    throw new Error(`Python backend returned ${response.status}: ${response.statusText}`);
+  }
+
+  return response.body;
+}
+
 /**
  * Query the MeTTa knowledge graph
  * @param {string} type - Query type (capability, strategy, protocol, solution, consideration)
@@ -158,6 +210,8 @@ async function checkPythonBackendHealth() {
 
 export {
   generateWorkflowFromNL,
+  streamWorkflowFromNL,
+  generateWorkflowBatch,
   queryKnowledgeGraph,
   searchAgents,
   checkPythonBackendHealth,